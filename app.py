@@ -14,8 +14,16 @@ from functools import wraps
 from werkzeug.utils import secure_filename
 from werkzeug.security import check_password_hash, generate_password_hash
 from flask import Flask, render_template, request, jsonify, send_file, redirect, url_for, abort, session, flash
-from utils import process_zip_file, cleanup_old_files
-from models import db, ProcessingJob, UsageStat, Config
+from utils import process_zip_file, cleanup_old_files, ensure_pdf, save_status
+from scheduler import get_scheduler, QueueFullError
+import zipfile
+from models import db, ProcessingJob, UsageStat, Config, add_missing_columns
+from manifest import scan_zip, check_manifest, estimate_seconds
+from chunked_upload import UPLOAD_STATE, UploadFinishedError, create_upload, write_chunk, upload_status, finish_upload
+from upload_storage import UploadRequest, write_stream, upload_stats
+from urllib.parse import unquote
+from capabilities import OVERRIDE_KEYS, get_capabilities, set_overrides
+from conversion_cache import get_conversion_cache
 from datetime import datetime
 from translations import get_translation, get_available_languages
 from dotenv import load_dotenv
@@ -25,6 +33,8 @@ load_dotenv()
 
 # Configuration de l'application
 app = Flask(__name__)
+# Fichiers téléversés écrits directement dans le dossier du job (voir upload_storage)
+app.request_class = UploadRequest
 app.secret_key = os.environ.get("FLASK_SECRET_KEY", "dev_key_for_docxfilesmerger")
 
 # Configuration de l'authentification admin
@@ -32,6 +42,8 @@ ADMIN_USERNAME = os.environ.get('ADMIN_USERNAME', 'admin')
 ADMIN_PASSWORD = os.environ.get('ADMIN_PASSWORD', 'changez_ce_mot_de_passe')
 ADMIN_PASSWORD_HASH = generate_password_hash(ADMIN_PASSWORD)
 app.config['MAX_CONTENT_LENGTH'] = 1024 * 1024 * 500  # 500 MB
+# Taille totale d'un téléversement par morceaux (chaque requête reste sous MAX_CONTENT_LENGTH)
+app.config['MAX_CHUNKED_UPLOAD_SIZE'] = int(os.environ.get('MAX_CHUNKED_UPLOAD_MB', '4096')) * 1024 * 1024
 app.config['UPLOAD_FOLDER'] = os.path.join(os.getcwd(), 'uploads')
 app.config['OUTPUT_FOLDER'] = os.path.join(os.getcwd(), 'outputs')
 app.config['STATUS_FOLDER'] = os.path.join(os.getcwd(), 'status')
@@ -68,10 +80,42 @@ with app.app_context():
         
         # Créer les tables
         db.create_all()
+        add_missing_columns()
     except Exception as e:
         print(f"Database connection error: {str(e)}")
         print("The application will continue, but database operations may fail.")
 
+# Descriptions des chemins d'outils modifiables depuis l'administration
+CONVERTER_CONFIG_DESCRIPTIONS = {
+    'LIBREOFFICE_PATH': "Chemin de LibreOffice (vide : détection automatique, 'none' : désactivé)",
+    'ANTIWORD_PATH': "Chemin d'antiword (vide : détection automatique, 'none' : désactivé)",
+    'CATDOC_PATH': "Chemin de catdoc (vide : détection automatique, 'none' : désactivé)",
+    'QPDF_PATH': "Chemin de qpdf, optimisation du PDF (vide : détection automatique, 'none' : désactivé)",
+}
+
+def load_converter_overrides():
+    """Transmettre les chemins d'outils de la table Config à la détection des convertisseurs"""
+    try:
+        set_overrides({key: Config.get_value(key) for key in OVERRIDE_KEYS.values()})
+    except Exception as e:
+        print(f"Impossible de lire la configuration des convertisseurs: {str(e)}")
+
+with app.app_context():
+    try:
+        # Ajouter les clés de configuration des convertisseurs si elles n'existent pas
+        for key, description in CONVERTER_CONFIG_DESCRIPTIONS.items():
+            if Config.query.filter_by(key=key).first() is None:
+                Config.set_value(key, '', description)
+    except Exception as e:
+        db.session.rollback()
+        print(f"Erreur lors de l'initialisation de la configuration: {str(e)}")
+    load_converter_overrides()
+
+# Détecter les convertisseurs disponibles une seule fois, en arrière-plan
+probe_thread = threading.Thread(target=get_capabilities)
+probe_thread.daemon = True
+probe_thread.start()
+
 # Vérification des extensions de fichiers autorisées
 def allowed_file(filename):
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in app.config['ALLOWED_EXTENSIONS']
@@ -110,73 +154,233 @@ def index():
     
     return render_template('index.html', translations=translations)
 
-# Route pour le téléversement du fichier
-@app.route('/upload', methods=['POST'])
-def upload_file():
-    if 'file' not in request.files:
-        return jsonify({'success': False, 'error': 'Aucun fichier n\'a été téléversé.'}), 400
+def observed_seconds_per_file(sample=20):
+    """Average processing time per document over the most recent completed jobs, or None"""
+    try:
+        jobs = (ProcessingJob.query
+                .filter(ProcessingJob.status == 'completed',
+                        ProcessingJob.processing_time.isnot(None),
+                        ProcessingJob.file_count > 0)
+                .order_by(ProcessingJob.completed_at.desc())
+                .limit(sample).all())
+    except Exception as e:
+        print(f"Historique des traitements indisponible: {str(e)}")
+        return None
+    
+    total_files = sum(job.file_count for job in jobs)
+    if not total_files:
+        return None
+    return sum(job.processing_time for job in jobs) / total_files
+
+def new_upload_id():
+    """Identifier of an upload, also the name of its folders (timestamp first for cleanup_old_files)"""
+    return f"{int(time.time())}_{os.urandom(4).hex()}"
+
+def register_upload(unique_id, filename, zip_path, upload=None):
+    """
+    Check an uploaded archive and register it as a job
+
+    The manifest of the archive is read (see manifest.scan_zip); rejected
+    archives are deleted. upload holds the size, SHA-256 and throughput of
+    the transfer (see upload_storage.upload_stats), recorded on the job.
+    Returns the JSON response of /upload and its status code.
+    """
+    upload = upload or {}
+    session_folder = os.path.dirname(zip_path)
+    output_folder = os.path.join(app.config['OUTPUT_FOLDER'], unique_id)
+    status_folder = os.path.join(app.config['STATUS_FOLDER'], unique_id)
     
-    file = request.files['file']
+    # Lire le répertoire central de l'archive et des archives imbriquées (sans
+    # décompresser les documents) pour refuser les archives invalides, trop
+    # volumineuses ou piégées
+    try:
+        manifest = scan_zip(zip_path)
+        rejection = check_manifest(manifest)
+    except zipfile.BadZipFile:
+        manifest, rejection = None, "Le fichier téléversé n'est pas une archive ZIP valide."
     
-    if file.filename == '':
-        return jsonify({'success': False, 'error': 'Aucun fichier n\'a été sélectionné.'}), 400
+    if rejection:
+        shutil.rmtree(session_folder, ignore_errors=True)
+        print(f"Archive refusée ({filename}): {rejection}")
+        return jsonify({'success': False, 'error': rejection, 'manifest': manifest}), 400
     
-    if not allowed_file(file.filename):
-        return jsonify({'success': False, 'error': 'Seuls les fichiers ZIP sont autorisés.'}), 400
+    os.makedirs(output_folder, exist_ok=True)
+    os.makedirs(status_folder, exist_ok=True)
+    
+    file_count = manifest['file_count']
+    eta_seconds = estimate_seconds(manifest, observed_seconds_per_file())
+    
+    # Initialiser le statut
+    status_file = os.path.join(status_folder, 'status.json')
+    with open(status_file, 'w') as f:
+        json.dump({
+            'percent': 0,
+            'status_text': 'Fichier téléversé avec succès.',
+            'current_step': 'extract',
+            'complete': False,
+            'error': None,
+            'start_time': int(time.time()),
+            'file_count': file_count,
+            'eta_seconds': eta_seconds
+        }, f)
+    
+    # Créer un enregistrement dans la base de données
+    with app.app_context():
+        job = ProcessingJob(
+            job_id=unique_id,
+            status='uploaded',
+            file_count=file_count,
+            original_filename=filename,
+            manifest=json.dumps(manifest),
+            upload_size=upload.get('size'),
+            upload_sha256=upload.get('sha256'),
+            upload_rate=upload.get('rate')
+        )
+        db.session.add(job)
+        db.session.commit()
+    
+    return jsonify({
+        'success': True,
+        'zip_path': zip_path,
+        'output_dir': output_folder,
+        'status_dir': status_folder,
+        'file_count': file_count,
+        'manifest': manifest,
+        'eta_seconds': eta_seconds,
+        'upload': upload
+    }), 200
+
+# Route pour le téléversement du fichier
+@app.route('/upload', methods=['POST'])
+def upload_file():
+    """
+    Receive an archive, either as the raw request body (file name in the
+    X-Filename header) or as the 'file' field of a multipart form
+
+    Both are written straight to the job's upload folder while their
+    SHA-256 is computed (see upload_storage), without a second copy.
+    """
+    unique_id = new_upload_id()
+    session_folder = os.path.join(app.config['UPLOAD_FOLDER'], unique_id)
     
     try:
-        # Sécuriser le nom du fichier et créer un identifiant unique
-        filename = secure_filename(file.filename)
-        timestamp = int(time.time())
-        unique_id = f"{timestamp}_{os.urandom(4).hex()}"
-        
-        # Créer un dossier spécifique pour cette session
-        session_folder = os.path.join(app.config['UPLOAD_FOLDER'], unique_id)
-        output_folder = os.path.join(app.config['OUTPUT_FOLDER'], unique_id)
-        status_folder = os.path.join(app.config['STATUS_FOLDER'], unique_id)
-        
         os.makedirs(session_folder, exist_ok=True)
-        os.makedirs(output_folder, exist_ok=True)
-        os.makedirs(status_folder, exist_ok=True)
-        
-        # Sauvegarder le fichier
-        zip_path = os.path.join(session_folder, filename)
-        file.save(zip_path)
         
-        # Initialiser le statut
-        status_file = os.path.join(status_folder, 'status.json')
-        with open(status_file, 'w') as f:
-            json.dump({
-                'percent': 0,
-                'status_text': 'Fichier téléversé avec succès.',
-                'current_step': 'extract',
-                'complete': False,
-                'error': None,
-                'start_time': timestamp
-            }, f)
-        
-        # Estimer le nombre de fichiers (pour l'interface utilisateur)
-        file_count = 20  # Valeur par défaut
-        
-        # Créer un enregistrement dans la base de données
-        with app.app_context():
-            job = ProcessingJob(
-                job_id=unique_id,
-                status='uploaded',
-                file_count=file_count,
-                original_filename=filename
-            )
-            db.session.add(job)
-            db.session.commit()
+        if request.mimetype == 'multipart/form-data':
+            # Les fichiers du formulaire sont écrits directement dans le dossier du job
+            request.upload_dir = session_folder
+            start = time.perf_counter()
+            file = request.files.get('file')
+            
+            if file is None or file.filename == '':
+                shutil.rmtree(session_folder, ignore_errors=True)
+                return jsonify({'success': False, 'error': 'Aucun fichier n\'a été sélectionné.'}), 400
+            
+            filename = secure_filename(file.filename)
+            if not allowed_file(filename):
+                shutil.rmtree(session_folder, ignore_errors=True)
+                return jsonify({'success': False, 'error': 'Seuls les fichiers ZIP sont autorisés.'}), 400
+            
+            # Le fichier est déjà à sa place: il suffit de le renommer
+            writer = file.stream
+            writer.close()
+            zip_path = os.path.join(session_folder, filename)
+            os.replace(writer.path, zip_path)
+            stats = upload_stats(writer, time.perf_counter() - start)
+        else:
+            filename = secure_filename(unquote(request.headers.get('X-Filename', '')))
+            if not filename or not allowed_file(filename):
+                shutil.rmtree(session_folder, ignore_errors=True)
+                return jsonify({'success': False, 'error': 'Seuls les fichiers ZIP sont autorisés.'}), 400
+            
+            zip_path = os.path.join(session_folder, filename)
+            stats = write_stream(request.stream, zip_path)
         
-        return jsonify({
-            'success': True,
-            'zip_path': zip_path,
-            'output_dir': output_folder,
-            'status_dir': status_folder,
-            'file_count': file_count
-        })
+        print(f"Téléversement de {filename}: {stats['size']} octets, "
+              f"{(stats['rate'] or 0) / (1024 * 1024):.1f} Mo/s, sha256 {stats['sha256']}")
+        return register_upload(unique_id, filename, zip_path, stats)
         
+    except Exception as e:
+        shutil.rmtree(session_folder, ignore_errors=True)
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+def chunked_upload_folder(upload_id):
+    """Folder of a chunked upload in progress, or None for an unknown identifier"""
+    if secure_filename(upload_id) != upload_id:
+        return None
+    folder = os.path.join(app.config['UPLOAD_FOLDER'], upload_id)
+    return folder if os.path.exists(os.path.join(folder, UPLOAD_STATE)) else None
+
+# Téléversement par morceaux: création
+@app.route('/upload/chunks', methods=['POST'])
+def start_chunked_upload():
+    data = request.json or {}
+    filename = secure_filename(data.get('filename', ''))
+    
+    if not filename or not allowed_file(filename):
+        return jsonify({'success': False, 'error': 'Seuls les fichiers ZIP sont autorisés.'}), 400
+    
+    try:
+        size = int(data.get('size', 0))
+    except (TypeError, ValueError):
+        return jsonify({'success': False, 'error': 'Taille de fichier invalide.'}), 400
+    
+    if size > app.config['MAX_CHUNKED_UPLOAD_SIZE']:
+        return jsonify({'success': False, 'error': f"Le fichier dépasse la taille maximale autorisée "
+                                                   f"({app.config['MAX_CHUNKED_UPLOAD_SIZE'] // (1024 * 1024)} Mo)."}), 413
+    
+    unique_id = new_upload_id()
+    try:
+        state = create_upload(os.path.join(app.config['UPLOAD_FOLDER'], unique_id), filename, size)
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+    
+    return jsonify({'success': True, 'upload_id': unique_id, 'chunk_size': state['chunk_size'], 'received': []})
+
+# Téléversement par morceaux: état, pour reprendre après une interruption
+@app.route('/upload/chunks/<upload_id>', methods=['GET'])
+def chunked_upload_status(upload_id):
+    folder = chunked_upload_folder(upload_id)
+    if not folder:
+        return jsonify({'success': False, 'error': 'Téléversement introuvable.'}), 404
+    
+    return jsonify({'success': True, 'upload_id': upload_id, **upload_status(folder)})
+
+# Téléversement par morceaux: envoi d'un morceau (corps brut, position en paramètre)
+@app.route('/upload/chunks/<upload_id>', methods=['PUT'])
+def upload_chunk(upload_id):
+    folder = chunked_upload_folder(upload_id)
+    if not folder:
+        return jsonify({'success': False, 'error': 'Téléversement introuvable.'}), 404
+    
+    try:
+        offset = int(request.args.get('offset', ''))
+        checksum = write_chunk(folder, offset, request.stream, request.headers.get('X-Chunk-SHA256'))
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+    except FileNotFoundError:
+        # Morceau arrivé pendant ou après /complete: le client cesse de réessayer
+        return jsonify({'success': False, 'error': 'Ce téléversement est déjà finalisé.'}), 409
+    
+    return jsonify({'success': True, 'offset': offset, 'sha256': checksum})
+
+# Téléversement par morceaux: fin, l'archive est vérifiée comme avec /upload
+@app.route('/upload/chunks/<upload_id>/complete', methods=['POST'])
+def complete_chunked_upload(upload_id):
+    folder = chunked_upload_folder(upload_id)
+    if not folder:
+        return jsonify({'success': False, 'error': 'Téléversement introuvable.'}), 404
+    
+    try:
+        zip_path, stats = finish_upload(folder)
+    except UploadFinishedError as e:
+        # Requête /complete envoyée deux fois: la première s'en charge
+        return jsonify({'success': False, 'error': str(e)}), 409
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e), **upload_status(folder)}), 409
+    
+    try:
+        return register_upload(upload_id, os.path.basename(zip_path), zip_path, stats)
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
 
@@ -199,22 +403,34 @@ def process_file():
     status_folder = os.path.join(app.config['STATUS_FOLDER'], unique_id)
     
     try:
-        # Mettre à jour l'état du job dans la base de données
-        job = ProcessingJob.query.filter_by(job_id=unique_id).first()
-        if job:
-            job.status = 'processing'
-            db.session.commit()
+        def mark_queued(position):
+            # Appelé avant qu'un emplacement ne puisse démarrer le traitement
+            save_status(status_folder, queued_status(position))
+            job = ProcessingJob.query.filter_by(job_id=unique_id).first()
+            if job:
+                job.status = 'queued'
+                try:
+                    db.session.commit()
+                except Exception:
+                    # Le planificateur retire le traitement de la file
+                    db.session.rollback()
+                    raise
         
-        # Lancer le traitement dans un thread séparé
-        process_thread = threading.Thread(
-            target=process_zip_file,
-            args=(zip_path, output_folder),
-            kwargs={'status_dir': status_folder, 'job_id': unique_id}
-        )
-        process_thread.daemon = True
-        process_thread.start()
+        # Confier le traitement au planificateur (nombre de traitements simultanés borné)
+        try:
+            position = get_scheduler().submit(
+                unique_id,
+                lambda: run_processing_job(zip_path, output_folder, status_folder, unique_id),
+                on_queued=mark_queued
+            )
+        except QueueFullError as e:
+            response = jsonify({'success': False, 'error': str(e)})
+            response.headers['Retry-After'] = '60'
+            return response, 503
+        except ValueError as e:
+            return jsonify({'success': False, 'error': str(e)}), 409
         
-        return jsonify({'success': True})
+        return jsonify({'success': True, 'queue_position': position})
         
     except Exception as e:
         # Enregistrer l'erreur dans le fichier de statut
@@ -240,6 +456,75 @@ def process_file():
         
         return jsonify({'success': False, 'error': str(e)}), 500
 
+def queued_status(position):
+    """Contenu du fichier de statut d'un traitement en attente"""
+    return {
+        'current_step': 'queued',
+        'complete': False,
+        'percent': 0,
+        'queue_position': position,
+        'status_text': f"En attente d'un emplacement de traitement (position {position} dans la file)..."
+    }
+
+def run_processing_job(zip_path, output_folder, status_folder, unique_id):
+    """Exécuter un traitement sur un emplacement du planificateur"""
+    with app.app_context():
+        try:
+            job = ProcessingJob.query.filter_by(job_id=unique_id).first()
+            if job:
+                job.status = 'processing'
+                db.session.commit()
+        except Exception as e:
+            print(f"Erreur lors de la mise à jour du statut du job {unique_id}: {str(e)}")
+    
+    process_zip_file(zip_path, output_folder, status_dir=status_folder, job_id=unique_id, background=False)
+
+# Dossiers dont la dernière génération de PDF a échoué (signalée à la demande suivante)
+failed_pdfs = set()
+
+def request_pdf(job_dir):
+    """
+    Queue the generation of the merged.pdf of a job on the job scheduler and
+    return its position in the queue (0 once a worker runs it)
+
+    A generation already queued or running for the job is not queued again;
+    QueueFullError is raised when the scheduler is full.
+    """
+    scheduler = get_scheduler()
+    pdf_job_id = f"pdf_{os.path.basename(job_dir)}"
+    
+    def generate():
+        if not ensure_pdf(job_dir):
+            failed_pdfs.add(job_dir)
+    
+    try:
+        return scheduler.submit(pdf_job_id, generate)
+    except ValueError:
+        # Génération déjà demandée
+        return scheduler.position(pdf_job_id) or 0
+
+def pdf_pending_response(job_dir):
+    """202 response telling the client to ask again for a PDF being generated"""
+    try:
+        position = request_pdf(job_dir)
+    except QueueFullError as e:
+        response = jsonify({'success': False, 'error': str(e)})
+        response.status_code = 503
+        response.headers['Retry-After'] = '60'
+        return response
+    
+    if position:
+        status_text = f"Génération du PDF en attente (position {position} dans la file)..."
+    else:
+        status_text = "Génération du PDF en cours..."
+    if request.accept_mimetypes.best == 'application/json':
+        response = jsonify({'success': False, 'pending': True, 'queue_position': position, 'status_text': status_text})
+    else:
+        response = app.make_response(render_template('pdf_pending.html', status_text=status_text))
+    response.status_code = 202
+    response.headers['Retry-After'] = '5'
+    return response
+
 # Route pour télécharger les fichiers traités
 @app.route('/download/<file_type>')
 def download_file(file_type):
@@ -250,6 +535,8 @@ def download_file(file_type):
     try:
         # Parcourir le répertoire de sortie de manière récursive
         for root, dirs, files in os.walk(app.config['OUTPUT_FOLDER']):
+            # Ignorer les dossiers cachés (fichiers de travail)
+            dirs[:] = [d for d in dirs if not d.startswith('.')]
             # Chercher les fichiers merged.docx ou merged.pdf
             if 'merged.docx' in files or 'merged.pdf' in files:
                 output_dirs.append(root)
@@ -285,6 +572,15 @@ def download_file(file_type):
     
     print(f"Tentative de téléchargement du fichier: {file_path}")
     
+    # PDF généré à la première demande (PDF_GENERATION=lazy ou background),
+    # par le planificateur: la requête répond tout de suite et le client
+    # redemande le fichier jusqu'à ce qu'il soit prêt
+    if file_type == 'pdf' and not os.path.exists(file_path) and os.path.exists(os.path.join(latest_dir, 'merged.docx')):
+        if latest_dir in failed_pdfs:
+            failed_pdfs.discard(latest_dir)
+        else:
+            return pdf_pending_response(latest_dir)
+    
     # Vérifier si le fichier existe
     if not os.path.exists(file_path):
         print(f"Fichier non trouvé: {file_path}")
@@ -318,6 +614,14 @@ def processing_status():
             with open(status_file, 'r') as f:
                 status_data = json.load(f)
             
+            # Position actuelle dans la file d'attente des traitements
+            if status_data.get('current_step') == 'queued':
+                position = get_scheduler().position(os.path.basename(latest_folder))
+                if position:
+                    status_data.update(queued_status(position))
+                elif position == 0:
+                    status_data.update({'queue_position': 0, 'status_text': "Démarrage du traitement..."})
+            
             # Ajouter des statistiques si le traitement est terminé
             if status_data.get('complete', False):
                 start_time = status_data.get('start_time', 0)
@@ -325,6 +629,7 @@ def processing_status():
                 processing_time = end_time - start_time
                 
                 status_data['stats'] = {
+                    **status_data.get('stats', {}),
                     'processing_time': processing_time,
                     'file_count': status_data.get('file_count', 0)
                 }
@@ -554,11 +859,24 @@ def admin_dashboard():
     # Récupérer les configurations
     configs = Config.query.all()
     
+    # Outils de conversion détectés
+    capabilities = get_capabilities()
+    
+    # Compteurs du cache de conversion (None si désactivé)
+    conversion_cache = get_conversion_cache()
+    cache_stats = conversion_cache.stats() if conversion_cache else None
+    
+    # Occupation des processus de traitement et de la file d'attente
+    queue_stats = get_scheduler().stats()
+    
     return render_template('admin.html', 
                           stats=stats, 
                           recent_jobs=recent_jobs, 
                           daily_stats=daily_stats,
-                          configs=configs)
+                          configs=configs,
+                          capabilities=capabilities,
+                          cache_stats=cache_stats,
+                          queue_stats=queue_stats)
 
 # Mise à jour de la configuration
 @app.route('/admin/config', methods=['POST'])
@@ -571,6 +889,9 @@ def update_config():
                 config.value = value
                 db.session.commit()
         
+        # Relancer la détection des convertisseurs avec les nouveaux chemins
+        load_converter_overrides()
+        
         return redirect(url_for('admin_dashboard'))
     except Exception as e:
         return render_template('error.html', error_code=500, 
@@ -0,0 +1,316 @@
+"""
+DocxFilesMerger - Application de traitement et fusion de documents.
+Développé par MOA Digital Agency LLC (https://myoneart.com)
+Email: moa@myoneart.com
+Copyright © 2025 MOA Digital Agency LLC. Développé par Aisance Kalonji. Tous droits réservés.
+"""
+
+import io
+import os
+import struct
+import zipfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+DOC_EXTENSIONS = ('.doc', '.docx')
+ARCHIVE_EXTENSIONS = ('.zip',)
+
+# En-tête local d'un membre: signature, ..., longueurs du nom et du champ extra
+_LOCAL_HEADER = struct.Struct('<4s22xHH')
+
+
+def list_doc_members(zip_ref):
+    """Return the .doc and .docx members of an open zip file, in archive order"""
+    members = []
+    for file_info in zip_ref.infolist():
+        # Ignorer les dossiers
+        if file_info.filename.endswith('/'):
+            continue
+
+        # Vérifier si le fichier est un .doc ou .docx
+        if file_info.filename.lower().endswith(DOC_EXTENSIONS):
+            members.append(file_info)
+
+    return members
+
+
+def list_archive_members(zip_ref):
+    """Return the .zip members of an open zip file, in archive order"""
+    return [file_info for file_info in zip_ref.infolist()
+            if not file_info.is_dir() and file_info.filename.lower().endswith(ARCHIVE_EXTENSIONS)]
+
+
+def _env_int(name, default):
+    try:
+        return int(os.environ.get(name, default))
+    except ValueError:
+        return default
+
+
+def nested_max_depth():
+    """How many levels of archives nested in the upload are opened (NESTED_ZIP_MAX_DEPTH, 3 by default)"""
+    return max(0, _env_int('NESTED_ZIP_MAX_DEPTH', 3))
+
+
+def extraction_workers(workers=None):
+    """
+    Number of threads extracting archive members in parallel
+
+    Read from the EXTRACT_WORKERS environment variable when not given;
+    0 or 'auto' (the default) means one thread per CPU, up to 8, and 1
+    extracts in the calling thread.
+    """
+    if workers is None:
+        workers = os.environ.get('EXTRACT_WORKERS', 'auto')
+    if str(workers).lower() in ('0', 'auto'):
+        return min(8, os.cpu_count() or 1)
+    try:
+        return max(1, int(workers))
+    except ValueError:
+        return 1
+
+
+def nested_buffer_size():
+    """Largest compressed nested archive held in memory (NESTED_ZIP_BUFFER_MB, 64 by default)"""
+    return max(0, _env_int('NESTED_ZIP_BUFFER_MB', 64)) * 1024 * 1024
+
+
+class _MemberWindow(io.RawIOBase):
+    """Seekable read-only view of a stored (uncompressed) member, read in place from the root archive"""
+
+    def __init__(self, path, start, size):
+        super().__init__()
+        # Descripteur propre: les lectures ne dépendent pas de l'archive parente
+        self._file = open(path, 'rb')
+        self._start = start
+        self._size = size
+        self._position = 0
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def tell(self):
+        return self._position
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        base = {io.SEEK_SET: 0, io.SEEK_CUR: self._position, io.SEEK_END: self._size}[whence]
+        self._position = max(0, base + offset)
+        return self._position
+
+    def readinto(self, buffer):
+        count = max(0, min(len(buffer), self._size - self._position))
+        self._file.seek(self._start + self._position)
+        data = self._file.read(count)
+        buffer[:len(data)] = data
+        self._position += len(data)
+        return len(data)
+
+    def close(self):
+        self._file.close()
+        super().close()
+
+
+class NestedZipFile(zipfile.ZipFile):
+    """
+    An archive stored as a member of another archive, opened without extraction
+
+    root_path is the uploaded archive and nested the names of the members
+    leading to this one, so that another process can reopen it (see
+    open_archive_path). root_offset is the position of its data in the root
+    file when every level is stored uncompressed, None otherwise.
+    """
+
+    def __init__(self, stream, root_path, nested, root_offset=None):
+        # Affecté avant l'ouverture: close() libère le flux même si l'archive est invalide
+        self._stream = stream
+        super().__init__(stream, 'r')
+        self.root_path = root_path
+        self.nested = nested
+        self.root_offset = root_offset
+
+    def close(self):
+        super().close()
+        self._stream.close()
+
+
+def _data_offset(root_path, root_offset, file_info):
+    # Position des données d'un membre: après son en-tête local, nom et champ extra compris
+    with open(root_path, 'rb') as f:
+        f.seek(root_offset + file_info.header_offset)
+        signature, name_length, extra_length = _LOCAL_HEADER.unpack(f.read(_LOCAL_HEADER.size))
+    if signature != b'PK\x03\x04':
+        raise zipfile.BadZipFile(f"En-tête local invalide pour {file_info.filename}")
+    return root_offset + file_info.header_offset + _LOCAL_HEADER.size + name_length + extra_length
+
+
+def open_nested(zip_ref, file_info, buffer_size=None):
+    """
+    Open an archive member of zip_ref as an archive, without writing it to disk
+
+    - stored members (the usual case for archives of archives) are read in
+      place from the root file through their own handle;
+    - compressed members up to buffer_size bytes (NESTED_ZIP_BUFFER_MB by
+      default) are inflated in memory;
+    - larger compressed members are read through a seekable decompressing
+      stream (slower random access, bounded memory).
+    """
+    root_path = getattr(zip_ref, 'root_path', zip_ref.filename)
+    root_offset = getattr(zip_ref, 'root_offset', 0)
+    nested = getattr(zip_ref, 'nested', ()) + (file_info.filename,)
+
+    if (file_info.compress_type == zipfile.ZIP_STORED and not file_info.flag_bits & 0x1
+            and root_offset is not None):
+        start = _data_offset(root_path, root_offset, file_info)
+        return NestedZipFile(_MemberWindow(root_path, start, file_info.file_size), root_path, nested, start)
+
+    if buffer_size is None:
+        buffer_size = nested_buffer_size()
+    if file_info.file_size <= buffer_size:
+        return NestedZipFile(io.BytesIO(zip_ref.read(file_info)), root_path, nested)
+    archive = NestedZipFile(zip_ref.open(file_info), root_path, nested)
+    # Le flux lit les données de l'archive parente, qui doit rester ouverte
+    archive.parent = zip_ref
+    return archive
+
+
+def open_archive_path(zip_path, nested=()):
+    """Open an archive, or an archive nested in it through the given member names"""
+    archive = zipfile.ZipFile(zip_path, 'r')
+    for name in nested:
+        archive = open_nested(archive, archive.getinfo(name))
+    return archive
+
+
+def archive_documents(zip_ref, max_depth=None, max_bytes=None):
+    """
+    List the documents of an archive and of the archives nested in it
+
+    Returns (archive, file_info) pairs in archive order, the documents of a
+    nested archive taking its place in the order. Archives deeper than
+    max_depth (see nested_max_depth) are skipped; a ValueError is raised
+    when the documents add up to more than max_bytes once uncompressed.
+    The nested archives stay open for the caller to read the documents and
+    close (see close_archives).
+    """
+    if max_depth is None:
+        max_depth = nested_max_depth()
+    documents = []
+    total_size = 0
+
+    def walk(archive, depth):
+        nonlocal total_size
+        for file_info in archive.infolist():
+            if file_info.is_dir():
+                continue
+            name = file_info.filename.lower()
+
+            if name.endswith(DOC_EXTENSIONS):
+                total_size += file_info.file_size
+                if max_bytes and total_size > max_bytes:
+                    raise ValueError(f"Les documents de l'archive et des archives imbriquées dépassent "
+                                     f"{max_bytes // (1024 * 1024)} Mo une fois extraits.")
+                documents.append((archive, file_info))
+
+            elif name.endswith(ARCHIVE_EXTENSIONS):
+                if depth >= max_depth:
+                    print(f"Archive imbriquée ignorée (profondeur maximale {max_depth}): {file_info.filename}")
+                    continue
+                try:
+                    nested = open_nested(archive, file_info)
+                except zipfile.BadZipFile as e:
+                    print(f"Archive imbriquée illisible ignorée ({file_info.filename}): {str(e)}")
+                    continue
+                walk(nested, depth + 1)
+
+    walk(zip_ref, 0)
+    return documents
+
+
+def close_archives(documents):
+    """Close the nested archives listed by archive_documents"""
+    for archive in {archive for archive, _ in documents}:
+        if isinstance(archive, NestedZipFile):
+            archive.close()
+
+
+class ArchiveHandles:
+    """
+    One handle per thread on each archive, so that members are read in parallel
+
+    A ZipFile serializes the reads on its file: each thread reopens the
+    archive by path (see open_archive_path). Archives that only exist in
+    memory or as a decompressing stream cannot be reopened cheaply and are
+    shared.
+    """
+
+    def __init__(self):
+        self._local = threading.local()
+        self._opened = []
+        self._lock = threading.Lock()
+
+    def get(self, archive):
+        """Return this thread's handle on archive"""
+        root_path = getattr(archive, 'root_path', archive.filename)
+        if not root_path or getattr(archive, 'root_offset', 0) is None:
+            return archive
+
+        handles = getattr(self._local, 'handles', None)
+        if handles is None:
+            handles = self._local.handles = {}
+        key = (root_path, getattr(archive, 'nested', ()))
+        if key not in handles:
+            handles[key] = open_archive_path(*key)
+            with self._lock:
+                self._opened.append(handles[key])
+        return handles[key]
+
+    def close(self):
+        with self._lock:
+            for handle in self._opened:
+                handle.close()
+            self._opened = []
+
+
+class MemberExtractor:
+    """
+    Run a function over archive members on a pool of threads
+
+    Each thread reads through its own archive handles (see ArchiveHandles),
+    so inflating and writing members proceed in parallel. progress(done,
+    file_info) is called as each member is ready. Handles opened by the
+    threads stay valid until close(), for the ZipMember sources created
+    from them.
+    """
+
+    def __init__(self, workers=None, progress=None):
+        self.workers = extraction_workers(workers)
+        self.done = 0
+        self._progress = progress
+        self._lock = threading.Lock()
+        self._handles = ArchiveHandles()
+        self._executor = ThreadPoolExecutor(self.workers, thread_name_prefix='extract') if self.workers > 1 else None
+
+    def _run(self, function, archive, file_info):
+        if self._executor is not None:
+            archive = self._handles.get(archive)
+        result = function(archive, file_info)
+        with self._lock:
+            self.done += 1
+            done = self.done
+        if self._progress:
+            self._progress(done, file_info)
+        return result
+
+    def map(self, function, documents):
+        """Return [function(archive, file_info)] for (archive, file_info) pairs, in their order"""
+        if self._executor is None:
+            return [self._run(function, archive, file_info) for archive, file_info in documents]
+        return list(self._executor.map(lambda document: self._run(function, *document), documents))
+
+    def close(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+        self._handles.close()
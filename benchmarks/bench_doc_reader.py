@@ -0,0 +1,60 @@
+"""
+DocxFilesMerger - Application de traitement et fusion de documents.
+Développé par MOA Digital Agency LLC (https://myoneart.com)
+Email: moa@myoneart.com
+Copyright © 2025 MOA Digital Agency LLC. Développé par Aisance Kalonji. Tous droits réservés.
+
+Benchmark de l'extraction de texte des .doc Word 97-2003: lecteur intégré
+contre antiword et catdoc (sous-processus dont la sortie est lue au fil de l'eau).
+
+Usage: python benchmarks/bench_doc_reader.py [nombre_de_documents | dossier_de_doc]
+
+Les .doc générés ne contiennent que le strict nécessaire au lecteur intégré:
+pour comparer avec antiword, utiliser un dossier de vrais fichiers.
+"""
+
+import os
+import sys
+import glob
+import time
+import tempfile
+
+from corpus import make_legacy_corpus
+from capabilities import has_tool
+from doc_reader import read_doc_file
+from text_extract import antiword_blocks, catdoc_blocks
+
+
+def main():
+    argument = sys.argv[1] if len(sys.argv) > 1 else '200'
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        if os.path.isdir(argument):
+            files = sorted(glob.glob(os.path.join(argument, '*.doc')))
+        else:
+            files = make_legacy_corpus(os.path.join(work_dir, 'corpus'), int(argument))
+
+        print(f"Corpus: {len(files)} documents .doc")
+        print(f"{'méthode':<16}{'total (s)':>12}{'par doc (ms)':>15}{'échecs':>9}")
+
+        methods = [('lecteur intégré', read_doc_file),
+                   ('antiword', antiword_blocks if has_tool('antiword') else None),
+                   ('catdoc', catdoc_blocks if has_tool('catdoc') else None)]
+        for name, method in methods:
+            if method is None:
+                print(f"{name:<16}{'non disponible':>36}")
+                continue
+
+            failures = 0
+            start = time.perf_counter()
+            for path in files:
+                try:
+                    sum(1 for _ in method(path))
+                except Exception:
+                    failures += 1
+            elapsed = time.perf_counter() - start
+            print(f"{name:<16}{elapsed:>12.2f}{elapsed * 1000 / len(files):>15.2f}{failures:>9}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,48 @@
+"""
+DocxFilesMerger - Application de traitement et fusion de documents.
+Développé par MOA Digital Agency LLC (https://myoneart.com)
+Email: moa@myoneart.com
+Copyright © 2025 MOA Digital Agency LLC. Développé par Aisance Kalonji. Tous droits réservés.
+
+Benchmark de l'extraction des documents d'une archive selon le nombre de
+threads (chacun avec son propre descripteur sur l'archive).
+
+Usage: python benchmarks/bench_extract.py [nombre_de_documents | archive.zip] [taille_par_document_Mo]
+"""
+
+import os
+import sys
+import time
+import shutil
+import tempfile
+
+from corpus import make_large_archive
+from utils import extract_doc_files
+
+
+def main():
+    argument = sys.argv[1] if len(sys.argv) > 1 else '100'
+    member_mb = int(sys.argv[2]) if len(sys.argv) > 2 else 4
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        if os.path.isfile(argument):
+            zip_path = argument
+        else:
+            zip_path = make_large_archive(os.path.join(work_dir, 'archive.zip'), int(argument), member_mb)
+
+        print(f"Archive: {zip_path} ({os.path.getsize(zip_path) / (1024 * 1024):.0f} Mo compressés)")
+        print(f"{'threads':<10}{'total (s)':>12}{'Mo/s':>10}{'documents':>12}")
+
+        counts = sorted({1, 2, 4, os.cpu_count() or 1})
+        for workers in counts:
+            extract_dir = os.path.join(work_dir, f"extract_{workers}")
+            start = time.perf_counter()
+            paths = extract_doc_files(zip_path, extract_dir, policy='all', workers=workers)
+            elapsed = time.perf_counter() - start
+            size_mb = sum(os.path.getsize(path) for path in paths) / (1024 * 1024)
+            print(f"{workers:<10}{elapsed:>12.2f}{size_mb / elapsed:>10.0f}{len(paths):>12}")
+            shutil.rmtree(extract_dir)
+
+
+if __name__ == '__main__':
+    main()
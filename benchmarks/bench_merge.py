@@ -0,0 +1,47 @@
+"""
+DocxFilesMerger - Application de traitement et fusion de documents.
+Développé par MOA Digital Agency LLC (https://myoneart.com)
+Email: moa@myoneart.com
+Copyright © 2025 MOA Digital Agency LLC. Développé par Aisance Kalonji. Tous droits réservés.
+
+Benchmark des moteurs de fusion sur un même corpus.
+
+Usage: python benchmarks/bench_merge.py [nombre_de_documents | dossier_de_docx] [processus]
+"""
+
+import os
+import sys
+import glob
+import time
+import tempfile
+
+from corpus import make_corpus
+from utils import merge_docx_files
+
+MODES = ['rebuild', 'copy', 'stream']
+
+
+def main():
+    argument = sys.argv[1] if len(sys.argv) > 1 else '200'
+    workers = int(sys.argv[2]) if len(sys.argv) > 2 else 1
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        if os.path.isdir(argument):
+            files = sorted(glob.glob(os.path.join(argument, '*.docx')))
+        else:
+            files = make_corpus(os.path.join(work_dir, 'corpus'), int(argument))
+
+        print(f"Corpus: {len(files)} documents, {workers} processus d'analyse")
+        print(f"{'mode':<10}{'total (s)':>12}{'par doc (ms)':>15}{'taille (Ko)':>14}")
+
+        for mode in MODES:
+            output_path = os.path.join(work_dir, f"merged_{mode}.docx")
+            start = time.perf_counter()
+            merge_docx_files(files, output_path, None, mode=mode, workers=workers)
+            elapsed = time.perf_counter() - start
+            size_kb = os.path.getsize(output_path) // 1024
+            print(f"{mode:<10}{elapsed:>12.2f}{elapsed * 1000 / len(files):>15.1f}{size_kb:>14}")
+
+
+if __name__ == '__main__':
+    main()
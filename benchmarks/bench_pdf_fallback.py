@@ -0,0 +1,64 @@
+"""
+DocxFilesMerger - Application de traitement et fusion de documents.
+Développé par MOA Digital Agency LLC (https://myoneart.com)
+Email: moa@myoneart.com
+Copyright © 2025 MOA Digital Agency LLC. Développé par Aisance Kalonji. Tous droits réservés.
+
+Benchmark du rendu PDF de secours (pdf_fallback): pages par seconde et
+mémoire maximale selon la longueur du document. Chaque rendu a lieu dans
+un processus neuf pour que la mémoire mesurée soit la sienne.
+
+Usage: python benchmarks/bench_pdf_fallback.py [comptes_rendus,... | document.docx]
+"""
+
+import os
+import sys
+import time
+import resource
+import tempfile
+import multiprocessing
+
+from corpus import make_long_document
+from pdf_fallback import render_docx_pdf
+
+
+def render(docx_path, pdf_path, results):
+    start = time.perf_counter()
+    pages = render_docx_pdf(docx_path, pdf_path)
+    elapsed = time.perf_counter() - start
+    # ru_maxrss est en kilo-octets sous Linux
+    results.put((pages, elapsed, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024))
+
+
+def measure(docx_path, pdf_path):
+    results = multiprocessing.Queue()
+    process = multiprocessing.Process(target=render, args=(docx_path, pdf_path, results))
+    process.start()
+    outcome = results.get()
+    process.join()
+    return outcome
+
+
+def main():
+    argument = sys.argv[1] if len(sys.argv) > 1 else '50,500,5000'
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        if os.path.isfile(argument):
+            documents = [argument]
+        else:
+            documents = []
+            for reports in (int(count) for count in argument.split(',')):
+                path = os.path.join(work_dir, f"long_{reports}.docx")
+                print(f"Génération d'un document de {reports} comptes rendus...")
+                documents.append(make_long_document(path, reports))
+
+        print(f"{'document (Mo)':<16}{'pages':>8}{'total (s)':>12}{'pages/s':>10}{'RSS max (Mo)':>15}{'PDF (Mo)':>10}")
+        for docx_path in documents:
+            pdf_path = os.path.join(work_dir, 'rendu.pdf')
+            pages, elapsed, peak_rss = measure(docx_path, pdf_path)
+            print(f"{os.path.getsize(docx_path) / (1024 * 1024):<16.1f}{pages:>8}{elapsed:>12.2f}"
+                  f"{pages / elapsed:>10.0f}{peak_rss:>15.0f}{os.path.getsize(pdf_path) / (1024 * 1024):>10.1f}")
+
+
+if __name__ == '__main__':
+    main()
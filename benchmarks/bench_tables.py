@@ -0,0 +1,68 @@
+"""
+DocxFilesMerger - Application de traitement et fusion de documents.
+Développé par MOA Digital Agency LLC (https://myoneart.com)
+Email: moa@myoneart.com
+Copyright © 2025 MOA Digital Agency LLC. Développé par Aisance Kalonji. Tous droits réservés.
+
+Micro-benchmark de la copie de grands tableaux: remplissage cellule par
+cellule (ancien moteur) contre transplantation native du w:tbl.
+
+Usage: python benchmarks/bench_tables.py
+"""
+
+import os
+import time
+import tempfile
+
+from corpus import make_report
+from docx import Document
+from merge_engine import transplant_table, _w
+
+# (lignes, colonnes)
+SHAPES = [(20, 5), (50, 10), (200, 10), (100, 40), (1000, 5), (5000, 3)]
+
+# Au-delà, le remplissage cellule par cellule prend plusieurs minutes
+CELL_BY_CELL_LIMIT = 2000
+
+
+def cell_by_cell(source_doc, target_doc):
+    """Former approach: add_table() then table.cell(i, j).text for every cell"""
+    for element in source_doc.element.body.iter(_w('tbl')):
+        rows = element.findall(_w('tr'))
+        col_count = max(len(row.findall(_w('tc'))) for row in rows)
+        table = target_doc.add_table(rows=len(rows), cols=col_count)
+        table.style = 'Table Grid'
+        for i, row in enumerate(rows):
+            for j, cell in enumerate(row.findall(_w('tc'))):
+                table.cell(i, j).text = ''.join(t.text or '' for t in cell.iter(_w('t')))
+
+
+def native(source_doc, target_doc):
+    for element in list(source_doc.element.body.iter(_w('tbl'))):
+        transplant_table(element, source_doc, target_doc)
+
+
+def main():
+    print(f"{'forme':<12}{'cellule par cellule (s)':>26}{'natif (s)':>12}{'gain':>8}")
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        for rows, cols in SHAPES:
+            path = make_report(os.path.join(work_dir, f"table_{rows}x{cols}.docx"), 0,
+                               paragraphs=0, table_rows=rows, table_cols=cols)
+            methods = [cell_by_cell, native] if rows * cols <= CELL_BY_CELL_LIMIT else [native]
+            timings = []
+            for method in methods:
+                source_doc = Document(path)
+                target_doc = Document()
+                start = time.perf_counter()
+                method(source_doc, target_doc)
+                timings.append(time.perf_counter() - start)
+
+            if len(timings) == 2:
+                print(f"{f'{rows}x{cols}':<12}{timings[0]:>26.3f}{timings[1]:>12.4f}{timings[0] / timings[1]:>7.0f}x")
+            else:
+                print(f"{f'{rows}x{cols}':<12}{'-':>26}{timings[0]:>12.4f}{'-':>8}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,187 @@
+"""
+DocxFilesMerger - Application de traitement et fusion de documents.
+Développé par MOA Digital Agency LLC (https://myoneart.com)
+Email: moa@myoneart.com
+Copyright © 2025 MOA Digital Agency LLC. Développé par Aisance Kalonji. Tous droits réservés.
+
+Génération de corpus synthétiques pour les benchmarks.
+"""
+
+import os
+import sys
+import random
+import zipfile
+
+# Les modules de l'application sont à la racine du dépôt
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from docx import Document
+from merge_engine import build_text_table, append_body_elements, StreamingDocxWriter, text_fragment
+
+
+def make_report(path, index, paragraphs=40, table_rows=10, table_cols=4):
+    """Write a synthetic medical-report-like .docx with formatted runs and a table"""
+    doc = Document()
+    doc.add_heading(f"Compte rendu n°{index}", level=1)
+
+    for i in range(paragraphs):
+        paragraph = doc.add_paragraph(f"Paragraphe {i} du compte rendu {index}. ")
+        run = paragraph.add_run("Observation importante")
+        run.bold = True
+        paragraph.add_run(" suivie d'un commentaire ").italic = True
+        paragraph.add_run("et d'une conclusion.")
+
+    if table_rows and table_cols:
+        rows = [[f"R{row_index}C{col_index}" for col_index in range(table_cols)] for row_index in range(table_rows)]
+        append_body_elements(doc, [build_text_table(rows)])
+
+    doc.save(path)
+    return path
+
+
+def make_corpus(directory, count, **kwargs):
+    """Write count synthetic reports into directory and return their paths in order"""
+    os.makedirs(directory, exist_ok=True)
+    return [make_report(os.path.join(directory, f"rapport_{i:05d}.docx"), i, **kwargs) for i in range(count)]
+
+
+# Constantes du format OLE2 utilisées par make_legacy_doc
+_SECTOR = 512
+_FREE, _END, _FAT_SECTOR = 0xFFFFFFFF, 0xFFFFFFFE, 0xFFFFFFFD
+
+
+def _legacy_text(index, paragraphs, table_rows, table_cols):
+    lines = [f"Compte rendu n°{index}\r"]
+    for i in range(paragraphs):
+        lines.append(f"Paragraphe {i} du compte rendu {index}. Observation importante "
+                     f"suivie d'un commentaire et d'une conclusion.\r")
+    for row_index in range(table_rows):
+        # Chaque cellule se termine par une marque de cellule, la ligne par une marque supplémentaire
+        lines.append(''.join(f"R{row_index}C{col_index}\x07" for col_index in range(table_cols)) + '\x07')
+    lines.append("Fin du compte rendu.\r")
+    return ''.join(lines)
+
+
+def _compound_file(streams):
+    """Pack {name: bytes} into a version 3 OLE2 file (streams padded to skip the mini stream)"""
+    import struct
+
+    streams = [(name, data.ljust(4096, b'\0')) for name, data in streams.items()]
+    stream_sectors = [-(-len(data) // _SECTOR) for _, data in streams]
+    data_sectors = 1 + sum(stream_sectors)  # répertoire + flux
+    fat_sectors = 1
+    while fat_sectors * 128 < fat_sectors + data_sectors:
+        fat_sectors += 1
+
+    fat = [_FAT_SECTOR] * fat_sectors + [_END]
+    starts, sector = [], fat_sectors + 1
+    for count in stream_sectors:
+        starts.append(sector)
+        fat.extend(list(range(sector + 1, sector + count)) + [_END])
+        sector += count
+    fat.extend([_FREE] * (fat_sectors * 128 - len(fat)))
+
+    def entry(name, entry_type, start, size, child=_FREE, right=_FREE):
+        encoded = (name + '\0').encode('utf-16-le')
+        return (encoded.ljust(64, b'\0') + struct.pack('<HBB', len(encoded), entry_type, 1)
+                + struct.pack('<III', _FREE, right, child) + b'\0' * 36
+                + struct.pack('<IIxxxx', start, size))
+
+    directory = entry('Root Entry', 5, _END, 0, child=1)
+    for position, ((name, data), start) in enumerate(zip(streams, starts)):
+        right = position + 2 if position + 1 < len(streams) else _FREE
+        directory += entry(name, 2, start, len(data), right=right)
+    directory = directory.ljust(_SECTOR, b'\0')
+
+    difat = list(range(fat_sectors)) + [_FREE] * (109 - fat_sectors)
+    header = (b'\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1' + b'\0' * 16
+              + struct.pack('<HHHHH', 0x3E, 3, 0xFFFE, 9, 6) + b'\0' * 6
+              + struct.pack('<IIIIIIIII', 0, fat_sectors, fat_sectors, 0, 4096, _END, 0, _END, 0)
+              + struct.pack('<109I', *difat))
+    body = b''.join(struct.pack('<128I', *fat[i:i + 128]) for i in range(0, len(fat), 128))
+    body += directory + b''.join(data.ljust(count * _SECTOR, b'\0')
+                                 for (_, data), count in zip(streams, stream_sectors))
+    return header + body
+
+
+def make_legacy_doc(path, index, paragraphs=40, table_rows=10, table_cols=4):
+    """
+    Write a synthetic Word 97-2003 .doc (text, piece table and a table, no
+    formatting) with the same content as make_report
+
+    Only the structures doc_reader needs are present: real legacy files
+    should be preferred to compare against antiword.
+    """
+    import struct
+
+    text = _legacy_text(index, paragraphs, table_rows, table_cols)
+    fib_size = 32 + 2 + 14 * 2 + 2 + 22 * 4 + 2 + 93 * 8
+    text_offset = -(-fib_size // 512) * 512
+    try:
+        encoded, fc = text.encode('cp1252'), (text_offset * 2) | 0x40000000
+    except UnicodeEncodeError:
+        encoded, fc = text.encode('utf-16-le'), text_offset
+
+    # FIB Word 97: FibBase, fibRgW, fibRgLw (ccpText), fibRgFcLcb (fcClx/lcbClx)
+    clx = b'\x02' + struct.pack('<I', 16) + struct.pack('<II', 0, len(text)) + struct.pack('<HIH', 0, fc, 0)
+    fib_base = struct.pack('<HHHHHH', 0xA5EC, 0xC1, 0, 0x0409, 0, 0x0200).ljust(32, b'\0')
+    rg_lw = [0] * 22
+    rg_lw[3] = len(text)
+    rg_fc_lcb = [0] * (93 * 2)
+    rg_fc_lcb[66], rg_fc_lcb[67] = 0, len(clx)
+    fib = (fib_base + struct.pack('<H', 14) + b'\0' * 28 + struct.pack('<H', 22) + struct.pack('<22i', *rg_lw)
+           + struct.pack('<H', 93) + struct.pack(f'<{93 * 2}I', *rg_fc_lcb))
+
+    word_document = fib.ljust(text_offset, b'\0') + encoded
+    with open(path, 'wb') as f:
+        f.write(_compound_file({'WordDocument': word_document, '1Table': clx}))
+    return path
+
+
+def make_legacy_corpus(directory, count, **kwargs):
+    """Write count synthetic .doc files into directory and return their paths in order"""
+    os.makedirs(directory, exist_ok=True)
+    return [make_legacy_doc(os.path.join(directory, f"rapport_{i:05d}.doc"), i, **kwargs) for i in range(count)]
+
+
+def make_large_archive(path, count, member_mb=4):
+    """
+    Write a zip of count compressible text documents of member_mb MB each (named .doc)
+
+    The content is made of pseudo-random words so that inflating it costs
+    about as much as real documents.
+    """
+    rng = random.Random(0)
+    words = ["patient", "examen", "compte", "rendu", "observation", "traitement", "résultat",
+             "consultation", "analyse", "conclusion", "suivi", "antécédents", "prescription"]
+    block = ' '.join(rng.choice(words) + str(rng.randrange(1000)) for _ in range(40000)).encode('utf-8')
+    size = member_mb * 1024 * 1024
+
+    with zipfile.ZipFile(path, 'w', zipfile.ZIP_DEFLATED) as zip_ref:
+        for index in range(count):
+            # Rotation du bloc pour que les membres ne soient pas identiques
+            shift = (index * 7919) % len(block)
+            rotated = block[shift:] + block[:shift]
+            data = (rotated * (size // len(rotated) + 1))[:size]
+            zip_ref.writestr(f"dossier_{index % 10}/rapport_{index:05d}.doc", data)
+    return path
+
+
+def make_long_document(path, reports, paragraphs=40, table_rows=10, table_cols=4):
+    """
+    Write a single .docx holding reports synthetic reports one after the other,
+    like a merged document (about two pages per report)
+
+    The document is streamed to disk, so very long documents can be written
+    in bounded memory.
+    """
+    writer = StreamingDocxWriter(path)
+    for index in range(reports):
+        blocks = [('paragraph', f"Paragraphe {i} du compte rendu {index}. Observation importante suivie "
+                                f"d'un commentaire détaillé sur l'examen, le traitement en cours et le suivi "
+                                f"prévu, puis d'une conclusion.") for i in range(paragraphs)]
+        blocks.append(('table', [[f"R{row}C{col}" for col in range(table_cols)] for row in range(table_rows)]))
+        writer.add_heading(f"rapport_{index:05d}.docx{'.' * 100}")
+        writer.append_fragment(text_fragment(f"rapport_{index:05d}.docx", f"Compte rendu n°{index}", blocks))
+    writer.close()
+    return path
@@ -0,0 +1,158 @@
+"""
+DocxFilesMerger - Application de traitement et fusion de documents.
+Développé par MOA Digital Agency LLC (https://myoneart.com)
+Email: moa@myoneart.com
+Copyright © 2025 MOA Digital Agency LLC. Développé par Aisance Kalonji. Tous droits réservés.
+"""
+
+import os
+import sys
+import shutil
+import threading
+import subprocess
+import importlib.util
+
+# Chemins possibles vers LibreOffice
+LIBREOFFICE_PATHS = [
+    'libreoffice',
+    '/nix/store/i0x2skvhs1wbr5vffhhc53kd9jg2bp5q-libreoffice-7.6.4/bin/libreoffice',
+    '/usr/bin/libreoffice',
+    '/usr/local/bin/libreoffice',
+    '/opt/libreoffice/program/soffice'
+]
+
+# Clés de configuration (variables d'environnement ou table Config) permettant
+# d'imposer le chemin d'un outil; 'none' désactive l'outil
+OVERRIDE_KEYS = {
+    'libreoffice': 'LIBREOFFICE_PATH',
+    'antiword': 'ANTIWORD_PATH',
+    'catdoc': 'CATDOC_PATH',
+    'qpdf': 'QPDF_PATH',
+}
+
+DISABLED_VALUES = ('none', 'off', 'disabled', 'false', '0')
+
+_capabilities = None
+_overrides = {}
+_lock = threading.Lock()
+
+
+def set_overrides(overrides):
+    """
+    Set tool path overrides coming from the Config table, forget the cached
+    probe and stop the LibreOffice pool started with the previous paths
+
+    overrides maps OVERRIDE_KEYS values to paths; empty values are ignored and
+    the environment variable of the same name applies instead.
+    """
+    global _capabilities, _overrides
+    with _lock:
+        _overrides = {key: value for key, value in (overrides or {}).items() if value}
+        _capabilities = None
+
+    # Le pool LibreOffice a été lancé avec l'ancien chemin
+    from libreoffice import reset_libreoffice_pool
+    reset_libreoffice_pool()
+
+
+def _override(tool):
+    key = OVERRIDE_KEYS[tool]
+    if key in _overrides:
+        return _overrides[key], 'config'
+    if os.environ.get(key):
+        return os.environ[key], 'env'
+    return None, 'probe'
+
+
+def _unavailable(source='probe'):
+    return {'available': False, 'path': None, 'version': None, 'source': source}
+
+
+def _probe_libreoffice():
+    from libreoffice import find_uno_python
+
+    override, source = _override('libreoffice')
+    if override and override.lower() in DISABLED_VALUES:
+        return _unavailable(source)
+
+    for path in [override] if override else LIBREOFFICE_PATHS:
+        try:
+            result = subprocess.run([path, '--version'], stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+                                    check=False, timeout=60)
+        except (FileNotFoundError, PermissionError, subprocess.SubprocessError):
+            continue
+
+        version = result.stdout.decode('utf-8', errors='replace').strip().splitlines()
+        return {
+            'available': True,
+            'path': path,
+            'version': version[0] if version else None,
+            'source': source,
+            'uno_python': find_uno_python(path)
+        }
+
+    return _unavailable(source)
+
+
+def _probe_command(tool):
+    override, source = _override(tool)
+    if override and override.lower() in DISABLED_VALUES:
+        return _unavailable(source)
+
+    path = shutil.which(override or tool)
+    if not path:
+        return _unavailable(source)
+    return {'available': True, 'path': path, 'version': None, 'source': source}
+
+
+def _probe_module(module_name, platforms=None):
+    if importlib.util.find_spec(module_name) is None:
+        return _unavailable()
+    if platforms and sys.platform not in platforms:
+        # docx2pdf pilote Microsoft Word: inutilisable ailleurs que sous Windows/macOS
+        return _unavailable()
+
+    try:
+        from importlib.metadata import version
+        module_version = version(module_name)
+    except Exception:
+        module_version = None
+    return {'available': True, 'path': None, 'version': module_version, 'source': 'probe'}
+
+
+def get_capabilities(refresh=False):
+    """
+    Return the converters available on this machine, probed once per process
+
+    The result maps each tool (libreoffice, antiword, catdoc, qpdf, docx2pdf,
+    reportlab, PyPDF2) to a dict with 'available', 'path', 'version' and
+    'source' ('probe', 'env' or 'config').
+    """
+    global _capabilities
+
+    if _capabilities is not None and not refresh:
+        return _capabilities
+
+    with _lock:
+        if _capabilities is None or refresh:
+            _capabilities = {
+                'libreoffice': _probe_libreoffice(),
+                'antiword': _probe_command('antiword'),
+                'catdoc': _probe_command('catdoc'),
+                'qpdf': _probe_command('qpdf'),
+                'docx2pdf': _probe_module('docx2pdf', platforms=('win32', 'darwin')),
+                'reportlab': _probe_module('reportlab'),
+                'PyPDF2': _probe_module('PyPDF2'),
+            }
+            available = [name for name, tool in _capabilities.items() if tool['available']]
+            print(f"Outils de conversion disponibles: {', '.join(available) or 'aucun'}")
+        return _capabilities
+
+
+def tool_path(tool):
+    """Path of an external tool if it is available, None otherwise"""
+    return get_capabilities()[tool]['path']
+
+
+def has_tool(tool):
+    return get_capabilities()[tool]['available']
@@ -0,0 +1,160 @@
+"""
+DocxFilesMerger - Application de traitement et fusion de documents.
+Développé par MOA Digital Agency LLC (https://myoneart.com)
+Email: moa@myoneart.com
+Copyright © 2025 MOA Digital Agency LLC. Développé par Aisance Kalonji. Tous droits réservés.
+"""
+
+import os
+import json
+import time
+import shutil
+import hashlib
+
+# Fichier décrivant un téléversement par morceaux en cours, dans son dossier
+UPLOAD_STATE = 'upload.json'
+# Dossier des marqueurs de morceaux reçus (un fichier par position)
+CHUNKS_DIR = '.chunks'
+# Taille des blocs lus dans le corps de la requête
+WRITE_BLOCK = 1024 * 1024
+
+
+class UploadFinishedError(Exception):
+    """Raised by finish_upload when another request already finished the upload"""
+
+
+def upload_chunk_size(size_mb=None):
+    """Size of the chunks clients send, in bytes (UPLOAD_CHUNK_MB, 8 by default)"""
+    if size_mb is None:
+        size_mb = os.environ.get('UPLOAD_CHUNK_MB', '8')
+    try:
+        return max(1, int(size_mb)) * 1024 * 1024
+    except ValueError:
+        return 8 * 1024 * 1024
+
+
+def create_upload(upload_dir, filename, size, chunk_size=None):
+    """
+    Start a chunked upload of size bytes into upload_dir/filename
+
+    The destination file is created at its final size (sparse) so that
+    chunks can be written at their offset in any order, from several
+    requests at once.
+    """
+    if size <= 0:
+        raise ValueError("La taille du fichier doit être positive.")
+
+    os.makedirs(os.path.join(upload_dir, CHUNKS_DIR), exist_ok=True)
+    with open(os.path.join(upload_dir, filename), 'wb') as f:
+        f.truncate(size)
+
+    state = {'filename': filename, 'size': size, 'chunk_size': chunk_size or upload_chunk_size(),
+             'created': time.time()}
+    with open(os.path.join(upload_dir, UPLOAD_STATE), 'w') as f:
+        json.dump(state, f)
+    return state
+
+
+def load_upload(upload_dir):
+    """Return the description of a chunked upload (FileNotFoundError when there is none)"""
+    with open(os.path.join(upload_dir, UPLOAD_STATE)) as f:
+        return json.load(f)
+
+
+def _chunk_length(state, offset):
+    if offset < 0 or offset >= state['size'] or offset % state['chunk_size']:
+        raise ValueError(f"Position de morceau invalide: {offset}.")
+    return min(state['chunk_size'], state['size'] - offset)
+
+
+def received_offsets(upload_dir):
+    """Offsets of the chunks received and verified so far"""
+    return sorted(int(name) for name in os.listdir(os.path.join(upload_dir, CHUNKS_DIR)) if name.isdigit())
+
+
+def write_chunk(upload_dir, offset, stream, checksum=None):
+    """
+    Write the chunk starting at offset from a binary stream, straight into the destination file
+
+    checksum is the SHA-256 (hex) of the chunk as computed by the client;
+    the chunk only counts as received once its length and checksum match,
+    so a failed or corrupted chunk is simply sent again. Returns the SHA-256
+    of the chunk.
+    """
+    state = load_upload(upload_dir)
+    length = _chunk_length(state, offset)
+    digest = hashlib.sha256()
+
+    fd = os.open(os.path.join(upload_dir, state['filename']), os.O_WRONLY)
+    try:
+        position, remaining = offset, length
+        while remaining:
+            block = stream.read(min(WRITE_BLOCK, remaining))
+            if not block:
+                break
+            # Écriture positionnelle: les morceaux envoyés en parallèle ne se gênent pas
+            os.pwrite(fd, block, position)
+            digest.update(block)
+            position += len(block)
+            remaining -= len(block)
+    finally:
+        os.close(fd)
+
+    if remaining or stream.read(1):
+        raise ValueError(f"Taille de morceau incorrecte à la position {offset} (attendu: {length} octets).")
+    if checksum and checksum.lower() != digest.hexdigest():
+        raise ValueError(f"Somme de contrôle incorrecte pour le morceau à la position {offset}.")
+
+    # Le marqueur n'est écrit qu'une fois le morceau complet et vérifié
+    with open(os.path.join(upload_dir, CHUNKS_DIR, str(offset)), 'w') as f:
+        f.write(digest.hexdigest())
+    return digest.hexdigest()
+
+
+def upload_status(upload_dir):
+    """Progress of a chunked upload, for a client resuming it"""
+    state = load_upload(upload_dir)
+    received = received_offsets(upload_dir)
+    received_bytes = sum(min(state['chunk_size'], state['size'] - offset) for offset in received)
+    return {
+        'filename': state['filename'],
+        'size': state['size'],
+        'chunk_size': state['chunk_size'],
+        'received': received,
+        'received_bytes': received_bytes,
+        'complete': received_bytes == state['size'],
+    }
+
+
+def finish_upload(upload_dir):
+    """
+    Check that every chunk was received and return (path, stats) for the uploaded file
+
+    stats has the size and average throughput of the upload, like
+    upload_storage.upload_stats (the chunks were checked one by one, there
+    is no hash of the whole file). The upload bookkeeping is removed;
+    ValueError lists what is missing. The upload is claimed first by
+    renaming its state file, so when /complete is sent twice at once only
+    one request finishes it and the other gets UploadFinishedError.
+    """
+    state_path = os.path.join(upload_dir, UPLOAD_STATE)
+    claimed_path = f"{state_path}.complete"
+    try:
+        os.rename(state_path, claimed_path)
+    except FileNotFoundError:
+        raise UploadFinishedError("Ce téléversement est déjà finalisé.")
+
+    with open(claimed_path) as f:
+        state = json.load(f)
+    missing = sorted(set(range(0, state['size'], state['chunk_size'])) - set(received_offsets(upload_dir)))
+    if missing:
+        # Le client peut envoyer les morceaux manquants et réessayer
+        os.rename(claimed_path, state_path)
+        raise ValueError(f"{len(missing)} morceau(x) manquant(s), à partir de la position {missing[0]}.")
+
+    shutil.rmtree(os.path.join(upload_dir, CHUNKS_DIR), ignore_errors=True)
+    os.remove(claimed_path)
+
+    elapsed = time.time() - state.get('created', time.time())
+    stats = {'size': state['size'], 'sha256': None, 'rate': round(state['size'] / elapsed) if elapsed > 0 else None}
+    return os.path.join(upload_dir, state['filename']), stats
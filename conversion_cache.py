@@ -0,0 +1,211 @@
+"""
+DocxFilesMerger - Application de traitement et fusion de documents.
+Développé par MOA Digital Agency LLC (https://myoneart.com)
+Email: moa@myoneart.com
+Copyright © 2025 MOA Digital Agency LLC. Développé par Aisance Kalonji. Tous droits réservés.
+"""
+
+import os
+import shutil
+import hashlib
+import tempfile
+import threading
+
+from capabilities import get_capabilities
+
+# Valeurs de CONVERSION_CACHE qui désactivent le cache
+DISABLED_VALUES = ('none', 'off', 'disabled', 'false', '0')
+
+_HASH_CHUNK_SIZE = 1024 * 1024
+
+
+def file_sha256(path):
+    """SHA-256 hex digest of a file, read in chunks"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(_HASH_CHUNK_SIZE), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def converter_identity():
+    """
+    Identity of the converter whose results are cached (None when it is unavailable)
+
+    Only LibreOffice conversions are cached: the text fallbacks write the
+    original file name into the document, so their output depends on more
+    than the file content.
+    """
+    libreoffice = get_capabilities()['libreoffice']
+    if not libreoffice['available']:
+        return None
+    return f"libreoffice|{libreoffice['path']}|{libreoffice['version']}"
+
+
+class ConversionCache:
+    """
+    On-disk cache of converted .docx files keyed by input content and converter
+
+    Entries are stored as <key[:2]>/<key>.docx where the key is the SHA-256 of
+    the converter identity and of the input bytes. A hit hardlinks (or copies)
+    the entry to the requested path and refreshes its mtime; once the cache
+    grows beyond max_bytes, the least recently used entries are evicted.
+    """
+
+    def __init__(self, directory, max_bytes):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+        self._size = sum(os.path.getsize(path) for path, _ in self._entries())
+
+    def key(self, source_path, converter):
+        digest = hashlib.sha256(converter.encode('utf-8'))
+        digest.update(b'\0')
+        digest.update(file_sha256(source_path).encode('ascii'))
+        return digest.hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.directory, key[:2], f"{key}.docx")
+
+    def _entries(self):
+        for root, _, files in os.walk(self.directory):
+            for name in files:
+                if name.endswith('.docx'):
+                    path = os.path.join(root, name)
+                    try:
+                        yield path, os.path.getmtime(path)
+                    except OSError:
+                        continue
+
+    def fetch(self, key, destination):
+        """Materialise the entry for key at destination; return False on a miss"""
+        entry = self._path(key)
+        try:
+            os.utime(entry)
+        except OSError:
+            with self._lock:
+                self.misses += 1
+            return False
+
+        try:
+            if os.path.exists(destination):
+                os.remove(destination)
+            try:
+                os.link(entry, destination)
+            except OSError:
+                # Autre système de fichiers ou liens non supportés
+                shutil.copyfile(entry, destination)
+        except OSError as e:
+            # Entrée évincée entre-temps
+            print(f"Lecture impossible depuis le cache de conversion: {str(e)}")
+            with self._lock:
+                self.misses += 1
+            return False
+
+        with self._lock:
+            self.hits += 1
+        return True
+
+    def store(self, key, docx_path):
+        """Add a converted file to the cache, then evict old entries if needed"""
+        entry = self._path(key)
+        if os.path.exists(entry):
+            return
+
+        os.makedirs(os.path.dirname(entry), exist_ok=True)
+        # Copie dans un fichier temporaire puis renommage atomique: un lecteur
+        # concurrent ne voit jamais d'entrée partielle
+        fd, temp_path = tempfile.mkstemp(suffix='.tmp', dir=os.path.dirname(entry))
+        try:
+            with os.fdopen(fd, 'wb') as target, open(docx_path, 'rb') as source:
+                shutil.copyfileobj(source, target)
+            os.replace(temp_path, entry)
+        except OSError as e:
+            print(f"Écriture impossible dans le cache de conversion: {str(e)}")
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            return
+
+        with self._lock:
+            self.stores += 1
+            self._size += os.path.getsize(entry)
+            if self._size > self.max_bytes:
+                self._evict()
+
+    def _evict(self):
+        # Appelée avec le verrou: supprime les entrées les moins récemment utilisées
+        entries = sorted(self._entries(), key=lambda entry: entry[1])
+        self._size = 0
+        for path, _ in entries:
+            self._size += os.path.getsize(path)
+        for path, _ in entries:
+            if self._size <= self.max_bytes:
+                break
+            try:
+                size = os.path.getsize(path)
+                os.remove(path)
+            except OSError:
+                continue
+            self._size -= size
+            self.evictions += 1
+
+    def stats(self):
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'stores': self.stores,
+                'evictions': self.evictions,
+                'size': self._size,
+                'max_size': self.max_bytes,
+            }
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_conversion_cache():
+    """
+    Return the process-wide conversion cache, or None when it is disabled
+
+    CONVERSION_CACHE=0 bypasses the cache; CONVERSION_CACHE_DIR and
+    CONVERSION_CACHE_MAX_MB set its location and size bound.
+    """
+    global _cache
+
+    if os.environ.get('CONVERSION_CACHE', '1').lower() in DISABLED_VALUES:
+        return None
+
+    with _cache_lock:
+        if _cache is None:
+            directory = os.environ.get('CONVERSION_CACHE_DIR') or os.path.join(os.getcwd(), 'cache', 'conversions')
+            try:
+                max_mb = int(os.environ.get('CONVERSION_CACHE_MAX_MB', '1024'))
+            except ValueError:
+                max_mb = 1024
+            try:
+                _cache = ConversionCache(directory, max_mb * 1024 * 1024)
+            except OSError as e:
+                print(f"Cache de conversion indisponible: {str(e)}")
+                return None
+        return _cache
+
+
+def cached_conversion_key(doc_path):
+    """Cache and key for a .doc file, or (None, None) when caching does not apply"""
+    cache = get_conversion_cache()
+    if cache is None:
+        return None, None
+    converter = converter_identity()
+    if converter is None:
+        return None, None
+    try:
+        return cache, cache.key(doc_path, converter)
+    except OSError:
+        return None, None
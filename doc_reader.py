@@ -0,0 +1,286 @@
+"""
+DocxFilesMerger - Application de traitement et fusion de documents.
+Développé par MOA Digital Agency LLC (https://myoneart.com)
+Email: moa@myoneart.com
+Copyright © 2025 MOA Digital Agency LLC. Développé par Aisance Kalonji. Tous droits réservés.
+"""
+
+import re
+import struct
+
+from formats import OLE2_MAGIC
+
+# Numéros de secteur spéciaux du format OLE2 (Compound File Binary)
+FREE_SECTOR = 0xFFFFFFFF
+END_OF_CHAIN = 0xFFFFFFFE
+NO_STREAM = 0xFFFFFFFF
+
+# Identifiant et version minimale (Word 97) du FIB; les premières versions de
+# Word 97 écrivent 0xC0, les suivantes 0xC1 (même structure de FIB)
+WORD_IDENT = 0xA5EC
+WORD97_NFIB = 0xC0
+
+# Caractères spéciaux du texte Word
+PARAGRAPH_MARK = '\r'
+CELL_MARK = '\x07'
+FIELD_BEGIN, FIELD_SEPARATOR, FIELD_END = '\x13', '\x14', '\x15'
+
+# Caractères remplacés (sauts de ligne/page, traits d'union) ou supprimés
+# (objets incorporés, renvois de notes, commentaires)
+_CHARACTER_MAP = {
+    '\x0b': PARAGRAPH_MARK,
+    '\x0c': PARAGRAPH_MARK,
+    '\x0e': PARAGRAPH_MARK,
+    '\x1e': '-',
+    '\xa0': ' ',
+}
+# Texte d'un paragraphe ou d'une cellule suivi de sa marque de fin
+_SEGMENT_RE = re.compile(r'([^\r\x07]*)([\r\x07])')
+
+_DELETED = dict.fromkeys(code for code in range(32) if chr(code) not in '\t\r\x07\x0b\x0c\x0e\x13\x14\x15\x1e')
+
+
+class CompoundFile:
+    """
+    Minimal reader for OLE2 compound files
+
+    Only what is needed to read the top-level streams of a Word document:
+    the FAT (with its DIFAT extension), the mini stream and the directory.
+    """
+
+    def __init__(self, data):
+        if not data.startswith(OLE2_MAGIC) or len(data) < 512:
+            raise ValueError("Pas un fichier OLE2")
+        self.data = data
+
+        (sector_shift, mini_sector_shift) = struct.unpack_from('<HH', data, 0x1E)
+        self.sector_size = 1 << sector_shift
+        self.mini_sector_size = 1 << mini_sector_shift
+        (fat_count, directory_start) = struct.unpack_from('<II', data, 0x2C)
+        (self.mini_cutoff, minifat_start, _, difat_start, difat_count) = struct.unpack_from('<IIIII', data, 0x38)
+
+        self.fat = self._read_fat(fat_count, difat_start, difat_count)
+        directory = self._read_chain(directory_start)
+        self.entries = [self._parse_entry(directory, offset)
+                        for offset in range(0, len(directory) - 127, 128)]
+        if not self.entries:
+            raise ValueError("Répertoire OLE2 vide")
+
+        root = self.entries[0]
+        self.mini_stream = self._read_chain(root['start'])[:root['size']]
+        self.minifat = self._unpack_sectors(self._read_chain(minifat_start)) if minifat_start != END_OF_CHAIN else []
+        self.streams = self._root_children()
+
+    def _sector(self, sid):
+        offset = (sid + 1) * self.sector_size
+        if offset + self.sector_size > len(self.data):
+            raise ValueError(f"Secteur OLE2 hors du fichier: {sid}")
+        return self.data[offset:offset + self.sector_size]
+
+    @staticmethod
+    def _unpack_sectors(raw):
+        return list(struct.unpack(f'<{len(raw) // 4}I', raw[:len(raw) // 4 * 4]))
+
+    def _read_fat(self, fat_count, difat_start, difat_count):
+        fat_sectors = list(struct.unpack_from('<109I', self.data, 0x4C))
+        sid = difat_start
+        per_sector = self.sector_size // 4 - 1
+        for _ in range(difat_count):
+            if sid in (END_OF_CHAIN, FREE_SECTOR):
+                break
+            values = self._unpack_sectors(self._sector(sid))
+            fat_sectors.extend(values[:per_sector])
+            sid = values[per_sector]
+
+        fat = []
+        for sid in fat_sectors[:fat_count]:
+            if sid != FREE_SECTOR:
+                fat.extend(self._unpack_sectors(self._sector(sid)))
+        return fat
+
+    def _chain(self, start, table):
+        sid, seen = start, set()
+        while sid not in (END_OF_CHAIN, FREE_SECTOR):
+            if sid in seen or sid >= len(table):
+                raise ValueError("Chaîne de secteurs OLE2 invalide")
+            seen.add(sid)
+            yield sid
+            sid = table[sid]
+
+    def _read_chain(self, start):
+        return b''.join(self._sector(sid) for sid in self._chain(start, self.fat))
+
+    def _read_mini_chain(self, start, size):
+        size_of = self.mini_sector_size
+        raw = b''.join(self.mini_stream[sid * size_of:(sid + 1) * size_of]
+                       for sid in self._chain(start, self.minifat))
+        return raw[:size]
+
+    @staticmethod
+    def _parse_entry(directory, offset):
+        name_length = struct.unpack_from('<H', directory, offset + 64)[0]
+        name = directory[offset:offset + max(0, name_length - 2)].decode('utf-16-le', errors='replace')
+        entry_type = directory[offset + 66]
+        left, right, child = struct.unpack_from('<III', directory, offset + 68)
+        start, size = struct.unpack_from('<II', directory, offset + 116)
+        return {'name': name, 'type': entry_type, 'left': left, 'right': right,
+                'child': child, 'start': start, 'size': size}
+
+    def _root_children(self):
+        # Parcours de l'arbre rouge-noir des enfants de la racine
+        streams, pending, seen = {}, [self.entries[0]['child']], set()
+        while pending:
+            index = pending.pop()
+            if index == NO_STREAM or index >= len(self.entries) or index in seen:
+                continue
+            seen.add(index)
+            entry = self.entries[index]
+            if entry['type'] == 2:
+                streams[entry['name']] = entry
+            pending.extend((entry['left'], entry['right']))
+        return streams
+
+    def read_stream(self, name):
+        entry = self.streams.get(name)
+        if entry is None:
+            raise ValueError(f"Flux OLE2 absent: {name}")
+        if entry['size'] < self.mini_cutoff:
+            return self._read_mini_chain(entry['start'], entry['size'])
+        return self._read_chain(entry['start'])[:entry['size']]
+
+
+def _piece_table(clx):
+    # Clx: blocs Prc (0x01) ignorés, puis Pcdt (0x02) contenant le PlcPcd
+    position = 0
+    while position < len(clx) and clx[position] == 0x01:
+        position += 3 + struct.unpack_from('<h', clx, position + 1)[0]
+    if position >= len(clx) or clx[position] != 0x02:
+        raise ValueError("Table des pièces introuvable")
+    size = struct.unpack_from('<I', clx, position + 1)[0]
+    plc = clx[position + 5:position + 5 + size]
+
+    count = (len(plc) - 4) // 12
+    cps = struct.unpack_from(f'<{count + 1}I', plc, 0)
+    pieces = []
+    for index in range(count):
+        fc = struct.unpack_from('<I', plc, 4 * (count + 1) + 8 * index + 2)[0]
+        pieces.append((cps[index], cps[index + 1], fc))
+    return pieces
+
+
+def read_text(data):
+    """
+    Return the main document text of a Word 97-2003 file
+
+    The text is reassembled from the piece table, so fast-saved documents
+    come out in reading order. Raises ValueError for encrypted files,
+    pre-97 versions and anything that is not a Word binary document.
+    """
+    ole = CompoundFile(data)
+    word = ole.read_stream('WordDocument')
+
+    ident, nfib = struct.unpack_from('<HH', word, 0)
+    if ident != WORD_IDENT:
+        raise ValueError("Flux WordDocument invalide")
+    if nfib < WORD97_NFIB:
+        raise ValueError(f"Version de Word non prise en charge (nFib={nfib})")
+    flags = struct.unpack_from('<H', word, 0x0A)[0]
+    if flags & 0x0100:
+        raise ValueError("Document chiffré")
+
+    table = ole.read_stream('1Table' if flags & 0x0200 else '0Table')
+
+    # FIB: FibBase (32 octets), puis tableaux de longueur variable
+    position = 32
+    csw = struct.unpack_from('<H', word, position)[0]
+    position += 2 + 2 * csw
+    cslw = struct.unpack_from('<H', word, position)[0]
+    ccp_text = struct.unpack_from('<i', word, position + 2 + 4 * 3)[0]
+    position += 2 + 4 * cslw
+    # fcClx/lcbClx: 34e paire du FibRgFcLcb97
+    fc_clx, lcb_clx = struct.unpack_from('<II', word, position + 2 + 8 * 33)
+
+    parts = []
+    for cp_start, cp_end, fc in _piece_table(table[fc_clx:fc_clx + lcb_clx]):
+        if cp_start >= ccp_text:
+            break
+        cp_end = min(cp_end, ccp_text)
+        length = cp_end - cp_start
+        if fc & 0x40000000:
+            # Pièce compressée: un octet par caractère (cp1252)
+            offset = (fc & ~0x40000000) // 2
+            parts.append(word[offset:offset + length].decode('cp1252', errors='replace'))
+        else:
+            parts.append(word[fc:fc + 2 * length].decode('utf-16-le', errors='replace'))
+    return ''.join(parts)
+
+
+def _strip_fields(text):
+    # Conserve le résultat des champs (après le séparateur) et retire leur code
+    if FIELD_BEGIN not in text:
+        return text
+    output, stack = [], []
+    for character in text:
+        if character == FIELD_BEGIN:
+            stack.append(False)
+        elif character == FIELD_SEPARATOR:
+            if stack:
+                stack[-1] = True
+        elif character == FIELD_END:
+            if stack:
+                stack.pop()
+        elif all(stack):
+            output.append(character)
+    return ''.join(output)
+
+
+def read_blocks(data):
+    """
+    Read a Word 97-2003 document as a list of ('paragraph', text) and
+    ('table', rows) blocks
+
+    Table boundaries come from the cell marks in the text: each cell ends
+    with a cell mark and each row with an extra, empty one. A paragraph mark
+    outside a row ends the table. Formatting and embedded objects are dropped.
+    """
+    text = _strip_fields(read_text(data)).translate(_DELETED)
+    for character, replacement in _CHARACTER_MAP.items():
+        text = text.replace(character, replacement)
+
+    blocks, rows, cells, cell_lines = [], [], [], []
+    previous_mark = None
+    for match in _SEGMENT_RE.finditer(text):
+        content, mark = match.group(1).strip(), match.group(2)
+        if mark == CELL_MARK:
+            row_end = previous_mark == CELL_MARK and not content and not cell_lines and cells
+            if row_end and rows and len(cells) < len(rows[0]):
+                # Ligne plus courte que la première: cellule vide plutôt que fin de ligne
+                row_end = False
+            if row_end:
+                rows.append(cells)
+                cells = []
+            else:
+                cells.append(' '.join(cell_lines + [content]).strip())
+                cell_lines = []
+        elif cells:
+            # Paragraphe d'une cellule qui en compte plusieurs
+            cell_lines.append(content)
+        else:
+            if rows:
+                blocks.append(('table', rows))
+                rows = []
+            if content:
+                blocks.append(('paragraph', content))
+        previous_mark = mark
+
+    if cells:
+        rows.append(cells)
+    if rows:
+        blocks.append(('table', rows))
+    return blocks
+
+
+def read_doc_file(path):
+    """Read a Word 97-2003 file from disk (see read_blocks)"""
+    with open(path, 'rb') as f:
+        return read_blocks(f.read())
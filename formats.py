@@ -0,0 +1,92 @@
+"""
+DocxFilesMerger - Application de traitement et fusion de documents.
+Développé par MOA Digital Agency LLC (https://myoneart.com)
+Email: moa@myoneart.com
+Copyright © 2025 MOA Digital Agency LLC. Développé par Aisance Kalonji. Tous droits réservés.
+"""
+
+import zipfile
+
+# Nombre d'octets lus en tête de fichier pour reconnaître son format
+SNIFF_SIZE = 4096
+
+OLE2_MAGIC = b'\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1'
+ZIP_MAGICS = (b'PK\x03\x04', b'PK\x05\x06')
+RTF_MAGIC = b'{\\rtf'
+# Partie principale d'un paquet Word 2007+
+WORD_DOCUMENT_PART = 'word/document.xml'
+HTML_MARKERS = (b'<html', b'<!doctype html', b'<head', b'<meta', b'mime-version:')
+
+# Méthodes de conversion à essayer, dans l'ordre, pour chaque format détecté
+# (le document de substitution reste le dernier recours dans tous les cas)
+CONVERSION_ROUTES = {
+    'ooxml': ('docx', 'libreoffice'),
+    'zip': ('docx', 'libreoffice'),
+    'ole2': ('libreoffice', 'doc_reader', 'antiword', 'catdoc'),
+    'rtf': ('libreoffice',),
+    'html': ('libreoffice',),
+    'text': ('text',),
+    'unknown': ('libreoffice', 'antiword', 'catdoc'),
+}
+
+
+def _looks_like_text(header):
+    if not header or b'\x00' in header:
+        return False
+    # Caractères de contrôle autres que tabulation, saut de ligne et de page
+    controls = sum(1 for byte in header if byte < 32 and byte not in (9, 10, 12, 13))
+    return controls <= len(header) // 100
+
+
+def sniff_format(header):
+    """
+    Identify a document from its first bytes
+
+    Returns 'ooxml' (Word 2007+ package), 'ole2' (Word 97-2003 compound file),
+    'rtf', 'html' (including Word "web page" and MHT saves), 'text' or
+    'unknown'. A ZIP archive whose first entries are not Word parts is
+    reported as 'zip': the parts of a package can come in any order, so
+    only its central directory tells (see resolve_zip_format).
+    """
+    if header.startswith(OLE2_MAGIC):
+        return 'ole2'
+    if header.startswith(ZIP_MAGICS):
+        # Word écrit [Content_Types].xml et word/ en tête du paquet
+        if b'[Content_Types].xml' in header or b'word/' in header:
+            return 'ooxml'
+        return 'zip'
+
+    stripped = header.lstrip(b'\xef\xbb\xbf \t\r\n').lower()
+    if stripped.startswith(RTF_MAGIC):
+        return 'rtf'
+    if stripped.startswith((b'<', b'mime-version:')) and any(marker in stripped for marker in HTML_MARKERS):
+        return 'html'
+    if _looks_like_text(header):
+        return 'text'
+    return 'unknown'
+
+
+def resolve_zip_format(file_format, source):
+    """
+    Turn a 'zip' result of sniff_format into 'ooxml' when the central
+    directory of source (a path or a seekable binary file) lists the main
+    part of a Word package; other formats are returned unchanged
+    """
+    if file_format != 'zip':
+        return file_format
+    try:
+        with zipfile.ZipFile(source) as package:
+            package.getinfo(WORD_DOCUMENT_PART)
+        return 'ooxml'
+    except (zipfile.BadZipFile, KeyError, OSError):
+        return 'zip'
+
+
+def sniff_file(path):
+    """Identify a document on disk (see sniff_format)"""
+    with open(path, 'rb') as f:
+        return resolve_zip_format(sniff_format(f.read(SNIFF_SIZE)), path)
+
+
+def conversion_route(file_format):
+    return CONVERSION_ROUTES.get(file_format, CONVERSION_ROUTES['unknown'])
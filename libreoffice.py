@@ -0,0 +1,436 @@
+"""
+DocxFilesMerger - Application de traitement et fusion de documents.
+Développé par MOA Digital Agency LLC (https://myoneart.com)
+Email: moa@myoneart.com
+Copyright © 2025 MOA Digital Agency LLC. Développé par Aisance Kalonji. Tous droits réservés.
+"""
+
+import os
+import sys
+import time
+import queue
+import atexit
+import shutil
+import socket
+import tempfile
+import threading
+import subprocess
+import importlib.util
+from pathlib import Path
+from contextlib import contextmanager
+
+from capabilities import get_capabilities, tool_path
+
+# Filtres d'export LibreOffice par format cible
+EXPORT_FILTERS = {
+    'docx': 'MS Word 2007 XML',
+    'pdf': 'writer_pdf_Export',
+}
+
+
+def find_libreoffice():
+    """Return the LibreOffice command found by the capability probe, or None"""
+    return tool_path('libreoffice')
+
+
+def find_uno_python(soffice_cmd):
+    """
+    Return a Python interpreter able to import the LibreOffice UNO bridge
+
+    Tries the current interpreter, the one bundled with LibreOffice and the
+    system python3, in that order.
+    """
+    if importlib.util.find_spec('uno') is not None:
+        return sys.executable
+
+    candidates = []
+    resolved = shutil.which(soffice_cmd) or soffice_cmd
+    program_dir = os.path.dirname(os.path.realpath(resolved))
+    candidates.append(os.path.join(program_dir, 'python'))
+    candidates.append(os.path.join(program_dir, '..', 'lib', 'libreoffice', 'program', 'python'))
+    candidates.append('python3')
+
+    for candidate in candidates:
+        try:
+            result = subprocess.run([candidate, '-c', 'import uno'], stdout=subprocess.PIPE,
+                                    stderr=subprocess.PIPE, timeout=30)
+            if result.returncode == 0:
+                return candidate
+        except (OSError, subprocess.SubprocessError):
+            continue
+    return None
+
+
+def _free_port():
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+class SofficeInstance:
+    """
+    A long-lived headless LibreOffice listening on a local UNO socket
+
+    Each instance owns its own user profile (-env:UserInstallation), so
+    several instances can run side by side. Conversions are submitted by a
+    short-lived UNO client running under uno_python, which is much cheaper
+    than booting soffice for every file.
+    """
+
+    def __init__(self, soffice_cmd, uno_python, startup_timeout=60):
+        self.soffice_cmd = soffice_cmd
+        self.uno_python = uno_python
+        self.startup_timeout = startup_timeout
+        self.port = None
+        self.profile_dir = None
+        self.process = None
+
+    def start(self):
+        self.port = _free_port()
+        self.profile_dir = tempfile.mkdtemp(prefix='lo_profile_')
+        cmd = [
+            self.soffice_cmd, '--headless', '--invisible', '--nologo', '--norestore', '--nodefault',
+            f'-env:UserInstallation={Path(self.profile_dir).as_uri()}',
+            f'--accept=socket,host=127.0.0.1,port={self.port};urp;StarOffice.ComponentContext'
+        ]
+        self.process = subprocess.Popen(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+        # Attendre que l'instance accepte les connexions
+        deadline = time.time() + self.startup_timeout
+        while time.time() < deadline:
+            if self.is_healthy():
+                return
+            if self.process.poll() is not None:
+                break
+            time.sleep(0.2)
+
+        self.stop()
+        raise RuntimeError("L'instance LibreOffice n'a pas démarré")
+
+    def is_healthy(self):
+        """The process is running and its UNO socket accepts connections"""
+        if self.process is None or self.process.poll() is not None:
+            return False
+        try:
+            with socket.create_connection(('127.0.0.1', self.port), timeout=1):
+                return True
+        except OSError:
+            return False
+
+    def convert(self, input_path, output_path, target_format, timeout):
+        cmd = [
+            self.uno_python, os.path.abspath(__file__), '--uno-convert', str(self.port),
+            os.path.abspath(input_path), os.path.abspath(output_path), EXPORT_FILTERS[target_format]
+        ]
+        subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, check=True, timeout=timeout)
+        if not os.path.exists(output_path):
+            raise RuntimeError(f"LibreOffice n'a pas produit {output_path}")
+        return output_path
+
+    def stop(self):
+        if self.process is not None and self.process.poll() is None:
+            self.process.terminate()
+            try:
+                self.process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                self.process.kill()
+                self.process.wait()
+        self.process = None
+        if self.profile_dir:
+            shutil.rmtree(self.profile_dir, ignore_errors=True)
+            self.profile_dir = None
+
+    def restart(self):
+        self.stop()
+        self.start()
+
+
+class LibreOfficePool:
+    """
+    Pool of long-lived LibreOffice instances shared by all conversions
+
+    instance_factory builds an object with start(), is_healthy(), convert(),
+    stop() and restart() methods; it defaults to SofficeInstance and lets a
+    stub converter stand in for soffice. Instances are started on first use,
+    checked before every conversion and restarted when they die or hang.
+    """
+
+    def __init__(self, size, instance_factory, timeout=120):
+        self.size = size
+        self.timeout = timeout
+        self._idle = queue.Queue()
+        self._instances = []
+        for _ in range(size):
+            instance = instance_factory()
+            self._instances.append(instance)
+            self._idle.put((instance, False))
+
+    def convert(self, input_path, output_dir, target_format, timeout=None):
+        """Convert input_path to target_format ('docx' or 'pdf') in output_dir and return the output path"""
+        name_without_ext = os.path.splitext(os.path.basename(input_path))[0]
+        output_path = os.path.join(output_dir, f"{name_without_ext}.{target_format}")
+
+        instance, started = self._idle.get()
+        try:
+            # Vérification de santé avant de soumettre la conversion
+            if not started:
+                instance.start()
+                started = True
+            elif not instance.is_healthy():
+                print("Instance LibreOffice indisponible, redémarrage...")
+                instance.restart()
+
+            try:
+                return instance.convert(input_path, output_path, target_format, timeout or self.timeout)
+            except subprocess.TimeoutExpired:
+                # Instance probablement bloquée: la redémarrer pour les conversions suivantes
+                print(f"Délai dépassé pour la conversion de {input_path}, redémarrage de l'instance LibreOffice")
+                instance.stop()
+                started = False
+                raise
+        except Exception:
+            if started and not instance.is_healthy():
+                instance.stop()
+                started = False
+            raise
+        finally:
+            self._idle.put((instance, started))
+
+    def shutdown(self):
+        for instance in self._instances:
+            try:
+                instance.stop()
+            except Exception as e:
+                print(f"Erreur lors de l'arrêt d'une instance LibreOffice: {str(e)}")
+
+
+def conversion_workers(workers=None):
+    """
+    Number of LibreOffice conversions allowed to run at the same time in this process
+
+    Read from LIBREOFFICE_WORKERS (one per CPU by default). The limit is shared
+    by all jobs.
+    """
+    if workers is None:
+        workers = os.environ.get('LIBREOFFICE_WORKERS', '0')
+    try:
+        workers = int(workers)
+    except ValueError:
+        workers = 0
+    return workers if workers > 0 else (os.cpu_count() or 1)
+
+
+class ProfileSlots:
+    """
+    Fixed set of LibreOffice user profiles handed out to concurrent conversions
+
+    soffice processes sharing a user profile block each other on its lock, so
+    every slot gets its own profile directory (created on first use and kept
+    for the life of the process to avoid re-initialising it each time).
+    Acquiring a slot blocks while all of them are in use.
+    """
+
+    def __init__(self, size):
+        self.size = size
+        self._free = queue.Queue()
+        for index in range(size):
+            self._free.put(index)
+        self._profiles = {}
+        atexit.register(self.cleanup)
+
+    @contextmanager
+    def acquire(self):
+        index = self._free.get()
+        try:
+            if index not in self._profiles:
+                self._profiles[index] = tempfile.mkdtemp(prefix=f'lo_slot{index}_')
+            yield self._profiles[index]
+        finally:
+            self._free.put(index)
+
+    def cleanup(self):
+        for profile_dir in self._profiles.values():
+            shutil.rmtree(profile_dir, ignore_errors=True)
+
+
+_slots = None
+_slots_lock = threading.Lock()
+
+
+def get_profile_slots():
+    """Return the process-wide profile slots, sized by conversion_workers()"""
+    global _slots
+    with _slots_lock:
+        if _slots is None:
+            _slots = ProfileSlots(conversion_workers())
+        return _slots
+
+
+def run_soffice(soffice_cmd, args, timeout):
+    """Run a one-shot soffice command in a free profile slot (blocks until one is available)"""
+    with get_profile_slots().acquire() as profile_dir:
+        cmd = [soffice_cmd, f'-env:UserInstallation={Path(profile_dir).as_uri()}'] + list(args)
+        return subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, check=True, timeout=timeout)
+
+
+def batch_size(size=None):
+    """Number of files per soffice invocation in batch mode (LIBREOFFICE_BATCH_SIZE, 20 by default)"""
+    if size is None:
+        size = os.environ.get('LIBREOFFICE_BATCH_SIZE', '20')
+    try:
+        return max(1, int(size))
+    except ValueError:
+        return 20
+
+
+def batch_timeout(timeout=None):
+    """Longest run of one soffice invocation in batch mode, in seconds (LIBREOFFICE_BATCH_TIMEOUT, 300 by default)"""
+    if timeout is None:
+        timeout = os.environ.get('LIBREOFFICE_BATCH_TIMEOUT', '300')
+    try:
+        return max(1, int(timeout))
+    except ValueError:
+        return 300
+
+
+def batch_convert(soffice_cmd, input_paths, output_dir, target_format='docx', timeout_per_file=60):
+    """
+    Convert several files with a single soffice invocation
+
+    Outputs are written to output_dir and mapped back to their inputs by
+    name; the returned dict maps each input path to its output path, or to
+    None when LibreOffice did not produce it, so that only those are
+    converted again one by one. Input names must be unique. The invocation
+    gets timeout_per_file per file but no more than batch_timeout() (and
+    never less than timeout_per_file): a single hung document must not hold
+    a LibreOffice profile for the time of the whole group.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    args = ['--headless', '--convert-to', target_format, '--outdir', output_dir] + list(input_paths)
+    timeout = min(timeout_per_file * len(input_paths), max(timeout_per_file, batch_timeout()))
+
+    try:
+        run_soffice(soffice_cmd, args, timeout=timeout)
+    except subprocess.TimeoutExpired:
+        # Les fichiers déjà convertis restent exploitables
+        print(f"Délai de {timeout} s dépassé pour la conversion groupée de {len(input_paths)} fichiers")
+    except subprocess.CalledProcessError as e:
+        print(f"LibreOffice a signalé une erreur pendant la conversion groupée (code {e.returncode})")
+
+    results = {}
+    for input_path in input_paths:
+        name_without_ext = os.path.splitext(os.path.basename(input_path))[0]
+        output_path = os.path.join(output_dir, f"{name_without_ext}.{target_format}")
+        results[input_path] = output_path if os.path.exists(output_path) and os.path.getsize(output_path) > 0 else None
+    missing = [os.path.basename(path) for path, output in results.items() if output is None]
+    if missing:
+        print(f"Conversion groupée: {len(missing)} fichier(s) sans résultat, à reconvertir un par un: {', '.join(missing)}")
+    return results
+
+
+def convert_file(input_path, output_dir, target_format, timeout=120):
+    """
+    Convert one file with the LibreOffice pool, or a one-shot soffice when there is no pool
+
+    Returns the output path in output_dir, or None when LibreOffice is not
+    available or produced nothing. Conversion errors are raised.
+    """
+    pool = get_libreoffice_pool()
+    soffice_cmd = None if pool else tool_path('libreoffice')
+    if not pool and not soffice_cmd:
+        return None
+
+    name_without_ext = os.path.splitext(os.path.basename(input_path))[0]
+    output_path = os.path.join(output_dir, f"{name_without_ext}.{target_format}")
+    if pool:
+        pool.convert(input_path, output_dir, target_format, timeout=timeout)
+    else:
+        run_soffice(soffice_cmd, ['--headless', '--convert-to', target_format, '--outdir', output_dir, input_path],
+                    timeout=timeout)
+    return output_path if os.path.exists(output_path) and os.path.getsize(output_path) > 0 else None
+
+
+_pool = None
+_pool_lock = threading.Lock()
+_pool_checked = False
+
+
+def get_libreoffice_pool():
+    """
+    Return the process-wide LibreOffice pool, or None when it is disabled or unavailable
+
+    The pool size is read from LIBREOFFICE_POOL_SIZE (2 by default, 0 to
+    disable it and start a fresh soffice per conversion).
+    """
+    global _pool, _pool_checked
+
+    if _pool_checked:
+        return _pool
+
+    with _pool_lock:
+        if _pool_checked:
+            return _pool
+        _pool_checked = True
+
+        try:
+            size = int(os.environ.get('LIBREOFFICE_POOL_SIZE', '2'))
+        except ValueError:
+            size = 2
+        if size <= 0:
+            return None
+
+        libreoffice = get_capabilities()['libreoffice']
+        if not libreoffice['available']:
+            return None
+        soffice_cmd = libreoffice['path']
+        uno_python = libreoffice.get('uno_python')
+        if not uno_python:
+            print("Pont UNO introuvable: le pool LibreOffice est désactivé.")
+            return None
+
+        _pool = LibreOfficePool(size, lambda: SofficeInstance(soffice_cmd, uno_python))
+        atexit.register(_pool.shutdown)
+        return _pool
+
+
+def reset_libreoffice_pool():
+    """
+    Stop the process-wide LibreOffice pool so that the next get_libreoffice_pool()
+    builds it again from the current tool paths
+    """
+    global _pool, _pool_checked
+
+    with _pool_lock:
+        pool, _pool, _pool_checked = _pool, None, False
+    if pool:
+        atexit.unregister(pool.shutdown)
+        pool.shutdown()
+
+
+def _uno_convert(port, input_path, output_path, filter_name):
+    """UNO client run under uno_python: load a document in a running instance and export it"""
+    import uno
+    from com.sun.star.beans import PropertyValue
+
+    def prop(name, value):
+        p = PropertyValue()
+        p.Name = name
+        p.Value = value
+        return p
+
+    local_context = uno.getComponentContext()
+    resolver = local_context.ServiceManager.createInstanceWithContext('com.sun.star.bridge.UnoUrlResolver', local_context)
+    context = resolver.resolve(f'uno:socket,host=127.0.0.1,port={port};urp;StarOffice.ComponentContext')
+    desktop = context.ServiceManager.createInstanceWithContext('com.sun.star.frame.Desktop', context)
+
+    document = desktop.loadComponentFromURL(uno.systemPathToFileUrl(input_path), '_blank', 0, (prop('Hidden', True),))
+    if document is None:
+        raise RuntimeError(f"Impossible d'ouvrir {input_path}")
+    try:
+        document.storeToURL(uno.systemPathToFileUrl(output_path), (prop('FilterName', filter_name), prop('Overwrite', True)))
+    finally:
+        document.close(True)
+
+
+if __name__ == '__main__' and len(sys.argv) == 6 and sys.argv[1] == '--uno-convert':
+    _uno_convert(int(sys.argv[2]), sys.argv[3], sys.argv[4], sys.argv[5])
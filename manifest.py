@@ -0,0 +1,151 @@
+"""
+DocxFilesMerger - Application de traitement et fusion de documents.
+Développé par MOA Digital Agency LLC (https://myoneart.com)
+Email: moa@myoneart.com
+Copyright © 2025 MOA Digital Agency LLC. Développé par Aisance Kalonji. Tous droits réservés.
+"""
+
+import os
+import zipfile
+
+from archives import list_doc_members, list_archive_members, open_nested, nested_max_depth
+
+# Coûts par défaut (secondes) tant qu'aucun historique n'est disponible
+DEFAULT_SECONDS_PER_DOC = 1.5
+DEFAULT_SECONDS_PER_DOCX = 0.2
+FIXED_OVERHEAD_SECONDS = 5
+
+# En dessous de cette taille, un taux de compression élevé n'est pas suspect
+RATIO_CHECK_MIN_SIZE = 1024 * 1024
+
+
+def _env_int(name, default):
+    try:
+        return int(os.environ.get(name, default))
+    except ValueError:
+        return default
+
+
+def manifest_limits():
+    """
+    Budgets applied to an uploaded archive before any work starts
+
+    MAX_ARCHIVE_FILES (documents), MAX_UNCOMPRESSED_MB (total size of the
+    documents once extracted) and MAX_COMPRESSION_RATIO (per member, to
+    catch zip bombs).
+    """
+    return {
+        'max_files': _env_int('MAX_ARCHIVE_FILES', 10000),
+        'max_uncompressed': _env_int('MAX_UNCOMPRESSED_MB', 4096) * 1024 * 1024,
+        'max_ratio': _env_int('MAX_COMPRESSION_RATIO', 100),
+    }
+
+
+def scan_zip(zip_path, limits=None):
+    """
+    Build the manifest of an uploaded archive from the central directories
+    of the archive and of the archives nested in it
+
+    No document is decompressed, and a compressed nested archive is only
+    read as a stream, in bounded memory, to reach its central directory.
+    Returns a dict with the number of
+    .doc/.docx members, their compressed and uncompressed sizes, the overall
+    compression ratio, the highest per-member ratio and the number of
+    duplicate members (same CRC-32 and size as an earlier one), plus the
+    number of nested .zip archives. Nested archives are walked down to
+    NESTED_ZIP_MAX_DEPTH, like archives.archive_documents does when the job
+    runs; one whose declared size is beyond MAX_UNCOMPRESSED_MB (see
+    limits) is not opened and its size is counted as documents, and one
+    compressed beyond MAX_COMPRESSION_RATIO is not opened either, so that
+    check_manifest rejects them. Raises zipfile.BadZipFile for an invalid
+    archive.
+    """
+    limits = limits or manifest_limits()
+    max_depth = nested_max_depth()
+    members = []
+    archives = []
+    unopened_size = 0
+
+    def walk(archive, depth):
+        nonlocal unopened_size
+        members.extend(list_doc_members(archive))
+        for file_info in list_archive_members(archive):
+            archives.append(file_info)
+            if depth >= max_depth:
+                continue
+            if file_info.file_size > limits['max_uncompressed']:
+                # Trop volumineuse pour être ouverte: l'archive sera refusée
+                unopened_size += file_info.file_size
+                continue
+            if (file_info.file_size >= RATIO_CHECK_MIN_SIZE
+                    and file_info.file_size / max(file_info.compress_size, 1) > limits['max_ratio']):
+                # Taux anormal (compté dans max_member_ratio): l'archive sera refusée
+                continue
+            try:
+                # Lecture en flux: rien n'est décompressé en mémoire
+                nested = open_nested(archive, file_info, buffer_size=0)
+            except zipfile.BadZipFile as e:
+                print(f"Archive imbriquée illisible ignorée ({file_info.filename}): {str(e)}")
+                continue
+            with nested:
+                walk(nested, depth + 1)
+
+    with zipfile.ZipFile(zip_path, 'r') as zip_ref:
+        walk(zip_ref, 0)
+
+    compressed = sum(info.compress_size for info in members)
+    uncompressed = sum(info.file_size for info in members) + unopened_size
+    # Les archives imbriquées sont soumises au même contrôle que les documents
+    max_ratio = max((info.file_size / max(info.compress_size, 1)
+                     for info in members + archives if info.file_size >= RATIO_CHECK_MIN_SIZE), default=1.0)
+
+    seen = set()
+    duplicates = 0
+    for info in members:
+        key = (info.CRC, info.file_size)
+        if key in seen:
+            duplicates += 1
+        seen.add(key)
+
+    doc_count = sum(1 for info in members if info.filename.lower().endswith('.doc'))
+    return {
+        'file_count': len(members),
+        'doc_count': doc_count,
+        'docx_count': len(members) - doc_count,
+        'compressed_size': compressed,
+        'uncompressed_size': uncompressed,
+        'compression_ratio': round(uncompressed / max(compressed, 1), 2),
+        'max_member_ratio': round(max_ratio, 2),
+        'duplicates': duplicates,
+        'archive_count': len(archives),
+    }
+
+
+def check_manifest(manifest, limits=None):
+    """Return the reason for rejecting an archive, or None when it is within budget"""
+    limits = limits or manifest_limits()
+
+    if manifest['file_count'] == 0 and not manifest.get('archive_count'):
+        return "Aucun fichier .doc ou .docx trouvé dans l'archive ZIP."
+    if manifest['file_count'] > limits['max_files']:
+        return f"L'archive contient {manifest['file_count']} documents (maximum {limits['max_files']})."
+    if manifest['uncompressed_size'] > limits['max_uncompressed']:
+        return (f"Les documents occupent {manifest['uncompressed_size'] // (1024 * 1024)} Mo une fois extraits "
+                f"(maximum {limits['max_uncompressed'] // (1024 * 1024)} Mo).")
+    if manifest['max_member_ratio'] > limits['max_ratio']:
+        return "L'archive contient un fichier anormalement compressé et a été refusée."
+    return None
+
+
+def estimate_seconds(manifest, seconds_per_file=None):
+    """
+    Estimate the processing time of an archive
+
+    seconds_per_file is the observed average of recent jobs; without it the
+    default per-format costs apply (.doc files need a conversion).
+    """
+    if seconds_per_file:
+        return int(FIXED_OVERHEAD_SECONDS + seconds_per_file * manifest['file_count'])
+    return int(FIXED_OVERHEAD_SECONDS
+               + DEFAULT_SECONDS_PER_DOC * manifest['doc_count']
+               + DEFAULT_SECONDS_PER_DOCX * manifest['docx_count'])
@@ -0,0 +1,708 @@
+"""
+DocxFilesMerger - Application de traitement et fusion de documents.
+Développé par MOA Digital Agency LLC (https://myoneart.com)
+Email: moa@myoneart.com
+Copyright © 2025 MOA Digital Agency LLC. Développé par Aisance Kalonji. Tous droits réservés.
+"""
+
+import io
+import os
+import re
+import copy
+import shutil
+import hashlib
+import zipfile
+import tempfile
+import multiprocessing
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+
+from lxml import etree
+
+from archives import open_archive_path
+
+try:
+    from docx import Document
+    from docx.opc.constants import RELATIONSHIP_TYPE as RT
+    from docx.opc.packuri import PackURI
+    from docx.opc.part import Part
+    from docx.oxml import parse_xml
+except ImportError:
+    print("Bibliothèque python-docx non installée. Certaines fonctionnalités peuvent ne pas fonctionner correctement.")
+
+# Espaces de noms WordprocessingML
+W_NS = 'http://schemas.openxmlformats.org/wordprocessingml/2006/main'
+R_NS = 'http://schemas.openxmlformats.org/officeDocument/2006/relationships'
+MC_NS = 'http://schemas.openxmlformats.org/markup-compatibility/2006'
+PKG_REL_NS = 'http://schemas.openxmlformats.org/package/2006/relationships'
+CT_NS = 'http://schemas.openxmlformats.org/package/2006/content-types'
+
+# Espaces de noms récents que l'on déclare sur la racine pour que les fragments
+# copiés depuis des documents Word 2013+ restent lisibles
+EXTRA_NAMESPACES = {
+    'w15': 'http://schemas.microsoft.com/office/word/2012/wordml',
+    'w16': 'http://schemas.microsoft.com/office/word/2018/wordml',
+    'w16cex': 'http://schemas.microsoft.com/office/word/2018/wordml/cex',
+    'w16cid': 'http://schemas.microsoft.com/office/word/2016/wordml/cid',
+    'w16se': 'http://schemas.microsoft.com/office/word/2015/wordml/symex',
+    'w16sdtdh': 'http://schemas.microsoft.com/office/word/2020/wordml/sdtdatahash',
+}
+
+# Marqueur utilisé pour les identifiants de relation à renuméroter dans un fragment
+_REL_PLACEHOLDER = re.compile(rb'__drm(\d+)__')
+
+
+def _w(tag):
+    """Return the Clark notation of a WordprocessingML tag"""
+    return f'{{{W_NS}}}{tag}'
+
+
+def _strip_unportable(element):
+    """Remove markup that points to parts which are not carried over to the merged document"""
+    # Sauts de section internes (ils référencent les en-têtes/pieds de page du document source)
+    for sect_pr in list(element.iter(_w('sectPr'))):
+        parent = sect_pr.getparent()
+        if parent is not None:
+            parent.remove(sect_pr)
+
+    # Notes de bas de page, notes de fin et commentaires
+    for tag in ('footnoteReference', 'endnoteReference', 'commentReference'):
+        for ref in list(element.iter(_w(tag))):
+            run = ref.getparent()
+            if run is not None and run.tag == _w('r') and run.getparent() is not None:
+                run.getparent().remove(run)
+            elif run is not None:
+                run.remove(ref)
+
+    for tag in ('commentRangeStart', 'commentRangeEnd'):
+        for marker in list(element.iter(_w(tag))):
+            marker.getparent().remove(marker)
+
+
+def _drop_reference(node):
+    """Remove the run holding an unsupported relationship reference"""
+    target = node
+    while target is not None and target.tag != _w('r'):
+        target = target.getparent()
+    if target is None:
+        target = node
+    parent = target.getparent()
+    if parent is not None:
+        parent.remove(target)
+
+
+def _resource_for(rel):
+    """Describe what a source relationship points to, or None if it cannot be carried over"""
+    if rel is None:
+        return None
+    if rel.is_external:
+        return {'kind': 'external', 'reltype': rel.reltype, 'target': rel.target_ref}
+    if rel.reltype == RT.IMAGE:
+        target_part = rel.target_part
+        return {
+            'kind': 'part',
+            'reltype': rel.reltype,
+            'content_type': target_part.content_type,
+            'ext': target_part.partname.ext,
+            'blob': target_part.blob
+        }
+    return None
+
+
+def _remap_relationships(element, part, relate, mapping):
+    """
+    Rewrite the r:* relationship ids of an element for the merged document
+
+    relate() receives the resource a relationship points to (image payload or
+    external URL) and returns the id to use instead. mapping caches the result
+    per source id. Runs referencing any other kind of part are dropped.
+    """
+    unsupported = []
+
+    for node in element.iter():
+        for attr_name, r_id in list(node.attrib.items()):
+            if not attr_name.startswith(f'{{{R_NS}}}'):
+                continue
+
+            if r_id not in mapping:
+                resource = _resource_for(part.rels.get(r_id))
+                mapping[r_id] = relate(resource) if resource is not None else None
+
+            if mapping[r_id] is None:
+                unsupported.append(node)
+                break
+            node.set(attr_name, mapping[r_id])
+
+    for node in unsupported:
+        _drop_reference(node)
+
+
+_target_style_ids_cache = None
+
+
+def _target_style_ids():
+    """Return the style ids defined by the template used for merged documents"""
+    global _target_style_ids_cache
+    if _target_style_ids_cache is None:
+        styles = Document().styles.element
+        _target_style_ids_cache = frozenset(style.get(_w('styleId')) for style in styles.iter(_w('style')))
+    return _target_style_ids_cache
+
+
+def _resolve_table_styles(element, source_styles):
+    """
+    Keep the borders of tables whose style does not exist in the merged document
+
+    The borders of the missing source style are inlined in the table properties
+    (unless the table already defines its own) and the dangling reference is removed.
+    """
+    known_styles = _target_style_ids()
+
+    for tbl in element.iter(_w('tbl')):
+        tbl_pr = tbl.find(_w('tblPr'))
+        if tbl_pr is None:
+            continue
+        tbl_style = tbl_pr.find(_w('tblStyle'))
+        if tbl_style is None or tbl_style.get(_w('val')) in known_styles:
+            continue
+
+        style_id = tbl_style.get(_w('val'))
+        tbl_pr.remove(tbl_style)
+
+        if tbl_pr.find(_w('tblBorders')) is not None or source_styles is None:
+            continue
+        for style in source_styles.iter(_w('style')):
+            if style.get(_w('styleId')) == style_id:
+                borders = style.find(f"{_w('tblPr')}/{_w('tblBorders')}")
+                if borders is not None:
+                    # w:tblBorders doit suivre w:tblW/w:jc/w:tblCellSpacing/w:tblInd dans w:tblPr
+                    position = 0
+                    for index, child in enumerate(tbl_pr):
+                        if child.tag in (_w('tblStyle'), _w('tblpPr'), _w('tblOverlap'), _w('bidiVisual'),
+                                         _w('tblStyleRowBandSize'), _w('tblStyleColBandSize'), _w('tblW'),
+                                         _w('jc'), _w('tblCellSpacing'), _w('tblInd')):
+                            position = index + 1
+                    tbl_pr.insert(position, copy.deepcopy(borders))
+                break
+
+
+def build_text_table(rows):
+    """
+    Build a 'Table Grid' w:tbl element from rows of cell strings in linear time
+
+    Used by the text extraction fallbacks instead of add_table() followed by
+    table.cell(i, j).text, which recomputes the cell grid on every call.
+    """
+    col_count = max(len(row) for row in rows)
+    tbl = etree.Element(_w('tbl'), nsmap={'w': W_NS})
+
+    tbl_pr = etree.SubElement(tbl, _w('tblPr'))
+    etree.SubElement(tbl_pr, _w('tblStyle')).set(_w('val'), 'TableGrid')
+    tbl_w = etree.SubElement(tbl_pr, _w('tblW'))
+    tbl_w.set(_w('w'), '0')
+    tbl_w.set(_w('type'), 'auto')
+    etree.SubElement(tbl_pr, _w('tblLook')).set(_w('val'), '04A0')
+
+    tbl_grid = etree.SubElement(tbl, _w('tblGrid'))
+    for _ in range(col_count):
+        etree.SubElement(tbl_grid, _w('gridCol'))
+
+    for row in rows:
+        tr = etree.SubElement(tbl, _w('tr'))
+        for col_index in range(col_count):
+            tc = etree.SubElement(tr, _w('tc'))
+            tc_w = etree.SubElement(etree.SubElement(tc, _w('tcPr')), _w('tcW'))
+            tc_w.set(_w('w'), '0')
+            tc_w.set(_w('type'), 'auto')
+            paragraph = etree.SubElement(tc, _w('p'))
+            if col_index < len(row) and row[col_index]:
+                text_el = etree.SubElement(etree.SubElement(paragraph, _w('r')), _w('t'))
+                text_el.text = row[col_index]
+                text_el.set('{http://www.w3.org/XML/1998/namespace}space', 'preserve')
+
+    return parse_xml(etree.tostring(tbl))
+
+
+def document_relater(target_doc):
+    """Return a relate() callback adding resources to an in-memory python-docx document"""
+    part = target_doc.part
+    external = {}
+
+    def relate(resource):
+        if resource['kind'] == 'external':
+            key = (resource['reltype'], resource['target'])
+            if key not in external:
+                external[key] = part.relate_to(resource['target'], resource['reltype'], is_external=True)
+            return external[key]
+        try:
+            # python-docx déduplique les images par empreinte SHA-1
+            r_id, _ = part.get_or_add_image(io.BytesIO(resource['blob']))
+            return r_id
+        except Exception:
+            # Formats non reconnus par python-docx (EMF, WMF, ...): partie binaire brute
+            partname = part.package.next_partname(f"/word/media/merged_image%d.{resource['ext']}")
+            media_part = Part(PackURI(partname), resource['content_type'], resource['blob'], part.package)
+            return part.relate_to(media_part, resource['reltype'])
+
+    return relate
+
+
+def append_body_elements(target_doc, elements):
+    """Insert elements at the end of a python-docx document body, before its final w:sectPr"""
+    body = target_doc.element.body
+    position = len(body)
+    if position and body[position - 1].tag == _w('sectPr'):
+        position -= 1
+    body[position:position] = elements
+
+
+def transplant_table(tbl, source_doc, target_doc, relate=None, mapping=None):
+    """
+    Copy a native w:tbl from source_doc into target_doc
+
+    Merged cells, widths and borders are kept as is; the copy is a single
+    linear pass over the table XML. Images and hyperlinks inside cells are
+    re-related in the target document.
+    """
+    table = copy.deepcopy(tbl)
+    _strip_unportable(table)
+    _resolve_table_styles(table, _styles_element(source_doc))
+    _remap_relationships(table, source_doc.part, relate or document_relater(target_doc),
+                         {} if mapping is None else mapping)
+    append_body_elements(target_doc, [table])
+    return table
+
+
+def _styles_element(doc):
+    """Return the w:styles element of a document, or None when it has no styles part"""
+    try:
+        return doc.styles.element
+    except Exception:
+        return None
+
+
+class ZipMember:
+    """
+    A .docx member merged straight from its archive, without extraction
+
+    In the process that owns the open archive the member is read through it;
+    once pickled to a merge worker, the worker opens the archive by path
+    (one handle per archive and process), going through the nested archives
+    that contain it if any (see archives.NestedZipFile).
+    """
+
+    def __init__(self, zip_ref, file_info):
+        self.zip_ref = zip_ref
+        self.zip_path = getattr(zip_ref, 'root_path', zip_ref.filename)
+        self.nested = getattr(zip_ref, 'nested', ())
+        self.member = file_info.filename
+        self.name = os.path.basename(file_info.filename)
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state['zip_ref'] = None
+        return state
+
+    def open(self):
+        """Return the member as a seekable in-memory file"""
+        if self.zip_ref is None:
+            self.zip_ref = _worker_archive(self.zip_path, self.nested)
+        return io.BytesIO(self.zip_ref.read(self.member))
+
+
+_worker_archives = {}
+
+
+def _worker_archive(zip_path, nested=()):
+    # Un processus de fusion ne traite qu'un job à la fois: une archive ouverte par chemin
+    if (zip_path, nested) not in _worker_archives:
+        _worker_archives[(zip_path, nested)] = open_archive_path(zip_path, nested)
+    return _worker_archives[(zip_path, nested)]
+
+
+def open_source(source):
+    """Return what Document() accepts for a merge source (path, file object or ZipMember)"""
+    return source.open() if isinstance(source, ZipMember) else source
+
+
+def source_name(source):
+    """File name shown in the merged document for a merge source"""
+    if isinstance(source, dict):
+        source = source['name']
+    if isinstance(source, ZipMember):
+        return source.name
+    return os.path.basename(source)
+
+
+def _prepared_elements(doc, relate):
+    """Yield the body elements of a parsed document, cleaned up and with remapped relationships"""
+    mapping = {}
+    source_styles = _styles_element(doc)
+    for element in list(doc.element.body.iterchildren()):
+        if element.tag == _w('sectPr'):
+            continue
+        _strip_unportable(element)
+        _resolve_table_styles(element, source_styles)
+        _remap_relationships(element, doc.part, relate, mapping)
+        yield element
+
+
+def extract_fragment(source):
+    """
+    Parse a .docx file (path, file-like object or ZipMember) into a mergeable fragment
+
+    The fragment is a plain dict holding the serialized body elements (without
+    the final w:sectPr) and the resources they reference, so that it can be
+    written to any merge target and sent across process boundaries.
+    """
+    resources = []
+
+    def relate(resource):
+        resources.append(resource)
+        return f'__drm{len(resources) - 1}__'
+
+    doc = Document(open_source(source))
+    chunks = []
+    for element in _prepared_elements(doc, relate):
+        # Détacher l'élément pour ne sérialiser que les espaces de noms qu'il utilise
+        element.getparent().remove(element)
+        etree.cleanup_namespaces(element)
+        chunks.append(etree.tostring(element, encoding='UTF-8'))
+
+    return {'xml': b''.join(chunks), 'resources': resources}
+
+
+def _resolve_fragment_xml(fragment, relate):
+    """Return the fragment XML with its placeholders replaced by the ids returned by relate()"""
+    xml = fragment['xml']
+    if fragment['resources']:
+        rel_ids = [relate(resource) for resource in fragment['resources']]
+        xml = _REL_PLACEHOLDER.sub(lambda m: rel_ids[int(m.group(1))].encode('ascii'), xml)
+    return xml
+
+
+def fragment_elements(fragment, relate):
+    """Parse a fragment into body elements, relating its resources with relate()"""
+    xml = _resolve_fragment_xml(fragment, relate)
+    body = parse_xml(b'<w:body xmlns:w="' + W_NS.encode('ascii') + b'">' + xml + b'</w:body>')
+    return list(body)
+
+
+def text_fragment(name, title, blocks):
+    """
+    Build a fragment straight from ('paragraph', text) and ('table', rows) blocks
+
+    Used by the text extraction fallbacks so that their output reaches the
+    merge target without an intermediate .docx file. The fragment starts
+    with a Heading 1 title and carries the name shown in the merged
+    document; returns None when blocks is empty.
+    """
+    chunks = []
+    for kind, value in blocks:
+        if kind == 'table':
+            element = build_text_table(value)
+        else:
+            element = _text_paragraph_element(value)
+        chunks.append(etree.tostring(element, encoding='UTF-8'))
+
+    if not chunks:
+        return None
+    chunks.insert(0, etree.tostring(_heading_element(title, style='Heading1'), encoding='UTF-8'))
+    return {'name': name, 'xml': b''.join(chunks), 'resources': []}
+
+
+def merge_workers(workers=None):
+    """
+    Number of processes used to parse source documents
+
+    Read from the MERGE_WORKERS environment variable when not given;
+    0 or 'auto' means one worker per CPU, 1 keeps parsing in-process.
+    """
+    if workers is None:
+        workers = os.environ.get('MERGE_WORKERS', '1')
+    if str(workers).lower() in ('0', 'auto'):
+        return os.cpu_count() or 1
+    try:
+        return max(1, int(workers))
+    except ValueError:
+        return 1
+
+
+def _pool_context():
+    # Le traitement tourne dans un thread: éviter fork() depuis un processus multi-thread
+    methods = multiprocessing.get_all_start_methods()
+    return multiprocessing.get_context('forkserver' if 'forkserver' in methods else 'spawn')
+
+
+def parallel_fragments(sources, workers):
+    """
+    Parse sources into fragments in a process pool and yield them in the original order
+
+    Yields (source, fragment, error) tuples. At most two fragments per worker are
+    in flight, so memory stays bounded whatever the number of sources. Sources
+    that already are fragments (see text_fragment) are passed through.
+    """
+    sources = iter(sources)
+    pending = deque()
+
+    with ProcessPoolExecutor(max_workers=workers, mp_context=_pool_context()) as executor:
+        def submit_next():
+            for source in sources:
+                if isinstance(source, dict):
+                    pending.append((source['name'], _ready(source)))
+                else:
+                    pending.append((source, executor.submit(extract_fragment, source)))
+                return
+
+        for _ in range(workers * 2):
+            submit_next()
+
+        while pending:
+            source, future = pending.popleft()
+            submit_next()
+            try:
+                yield source, future.result(), None
+            except Exception as e:
+                yield source, None, e
+
+
+def _ready(result):
+    future = Future()
+    future.set_result(result)
+    return future
+
+
+def _heading_element(text, style='Heading2'):
+    """Build a paragraph element carrying a paragraph style"""
+    paragraph = etree.Element(_w('p'), nsmap={'w': W_NS})
+    p_pr = etree.SubElement(paragraph, _w('pPr'))
+    etree.SubElement(p_pr, _w('pStyle')).set(_w('val'), style)
+    run = etree.SubElement(paragraph, _w('r'))
+    text_el = etree.SubElement(run, _w('t'))
+    text_el.text = text
+    text_el.set('{http://www.w3.org/XML/1998/namespace}space', 'preserve')
+    return paragraph
+
+
+def _text_paragraph_element(text):
+    """Build a plain paragraph holding a single run of text"""
+    paragraph = etree.Element(_w('p'), nsmap={'w': W_NS})
+    text_el = etree.SubElement(etree.SubElement(paragraph, _w('r')), _w('t'))
+    text_el.text = text
+    text_el.set('{http://www.w3.org/XML/1998/namespace}space', 'preserve')
+    return paragraph
+
+
+def _error_element(text):
+    """Build a bold red paragraph used to flag a document that could not be merged"""
+    paragraph = etree.Element(_w('p'), nsmap={'w': W_NS})
+    run = etree.SubElement(paragraph, _w('r'))
+    r_pr = etree.SubElement(run, _w('rPr'))
+    etree.SubElement(r_pr, _w('b'))
+    etree.SubElement(r_pr, _w('color')).set(_w('val'), 'FF0000')
+    text_el = etree.SubElement(run, _w('t'))
+    text_el.text = text
+    return paragraph
+
+
+class StreamingDocxWriter:
+    """
+    Write a merged .docx package incrementally
+
+    The body of word/document.xml is streamed into the output ZIP one source
+    document at a time, so peak memory stays bounded by the largest single
+    input instead of the sum of all inputs. Media are spooled to a temporary
+    directory (deduplicated by content hash) and written when the writer is
+    closed, together with the relationships and content types.
+    """
+
+    def __init__(self, output_path):
+        self.output_path = output_path
+
+        # Le modèle par défaut de python-docx sert de squelette au paquet
+        template = io.BytesIO()
+        Document().save(template)
+        template.seek(0)
+
+        self._spool_dir = tempfile.mkdtemp(prefix='merge_media_', dir=os.path.dirname(os.path.abspath(output_path)))
+        self._media = {}
+        self._external = {}
+        self._new_rels = []
+        self._new_defaults = {}
+        self._closed = False
+
+        with zipfile.ZipFile(template) as template_zip:
+            document_root = etree.fromstring(template_zip.read('word/document.xml'))
+            self._rels_root = etree.fromstring(template_zip.read('word/_rels/document.xml.rels'))
+            self._types_root = etree.fromstring(template_zip.read('[Content_Types].xml'))
+
+            self._zip = zipfile.ZipFile(output_path, 'w', zipfile.ZIP_DEFLATED)
+            for info in template_zip.infolist():
+                if info.filename in ('word/document.xml', 'word/_rels/document.xml.rels', '[Content_Types].xml'):
+                    continue
+                self._zip.writestr(info, template_zip.read(info.filename))
+
+        self._next_rel = 1 + max(
+            [int(rel.get('Id')[3:]) for rel in self._rels_root if rel.get('Id', '').startswith('rId') and rel.get('Id')[3:].isdigit()] or [0]
+        )
+        self._known_extensions = {d.get('Extension').lower() for d in self._types_root.iter(f'{{{CT_NS}}}Default')}
+
+        # Préparer l'en-tête et la fin de document.xml autour du corps
+        prefix, suffix = self._split_document(document_root)
+        self._suffix = suffix
+
+        self._document = self._zip.open('word/document.xml', 'w', force_zip64=True)
+        self._document.write(prefix)
+
+    @staticmethod
+    def _split_document(document_root):
+        """Return the serialized document.xml before and after the body content"""
+        nsmap = dict(document_root.nsmap)
+        for prefix, uri in EXTRA_NAMESPACES.items():
+            nsmap.setdefault(prefix, uri)
+
+        root = etree.Element(document_root.tag, nsmap=nsmap)
+        ignorable = set((document_root.get(f'{{{MC_NS}}}Ignorable') or '').split())
+        ignorable.update(EXTRA_NAMESPACES)
+        root.set(f'{{{MC_NS}}}Ignorable', ' '.join(sorted(ignorable)))
+
+        template_body = document_root.find(_w('body'))
+        body = etree.SubElement(root, _w('body'))
+        body.append(etree.Comment('__BODY__'))
+        sect_pr = template_body.find(_w('sectPr'))
+        if sect_pr is not None:
+            body.append(sect_pr)
+
+        serialized = etree.tostring(root, xml_declaration=True, encoding='UTF-8', standalone=True)
+        prefix, suffix = serialized.split(b'<!--__BODY__-->', 1)
+        return prefix, suffix
+
+    def _relate(self, resource):
+        """Return the relationship id of a resource in the merged document, adding it if needed"""
+        if resource['kind'] == 'external':
+            key = (resource['reltype'], resource['target'])
+            if key not in self._external:
+                self._external[key] = self._add_rel(resource['reltype'], resource['target'], external=True)
+            return self._external[key]
+
+        digest = hashlib.sha1(resource['blob']).hexdigest()
+        if digest not in self._media:
+            ext = resource['ext'].lower()
+            media_name = f'media/merged_image{len(self._media) + 1}.{ext}'
+            spool_path = os.path.join(self._spool_dir, f'{len(self._media) + 1}.{ext}')
+            with open(spool_path, 'wb') as f:
+                f.write(resource['blob'])
+            if ext not in self._known_extensions:
+                self._new_defaults.setdefault(ext, resource['content_type'])
+            self._media[digest] = (self._add_rel(resource['reltype'], media_name), media_name, spool_path)
+        return self._media[digest][0]
+
+    def _add_rel(self, reltype, target, external=False):
+        r_id = f'rId{self._next_rel}'
+        self._next_rel += 1
+        self._new_rels.append((r_id, reltype, target, external))
+        return r_id
+
+    def _write_element(self, element):
+        self._document.write(etree.tostring(element, encoding='UTF-8'))
+
+    def add_heading(self, text):
+        """Append the separator heading placed before each merged document"""
+        self._write_element(_heading_element(text))
+
+    def add_error(self, text):
+        """Append an error notice for a document that could not be merged"""
+        self._write_element(_error_element(text))
+
+    def append_fragment(self, fragment):
+        """Append a fragment produced by extract_fragment"""
+        self._document.write(_resolve_fragment_xml(fragment, self._relate))
+
+    def append_document(self, source):
+        """Parse a source .docx and append its body; the parsed document is released right after"""
+        self.append_fragment(extract_fragment(source))
+
+    def close(self):
+        """Finish document.xml and write media, relationships and content types"""
+        if self._closed:
+            return
+        self._closed = True
+
+        try:
+            self._document.write(self._suffix)
+            self._document.close()
+
+            for r_id, media_name, spool_path in self._media.values():
+                self._zip.write(spool_path, f'word/{media_name}')
+
+            for r_id, reltype, target, external in self._new_rels:
+                rel = etree.SubElement(self._rels_root, f'{{{PKG_REL_NS}}}Relationship')
+                rel.set('Id', r_id)
+                rel.set('Type', reltype)
+                rel.set('Target', target)
+                if external:
+                    rel.set('TargetMode', 'External')
+            self._zip.writestr('word/_rels/document.xml.rels',
+                               etree.tostring(self._rels_root, xml_declaration=True, encoding='UTF-8', standalone=True))
+
+            for ext, content_type in self._new_defaults.items():
+                default = etree.Element(f'{{{CT_NS}}}Default')
+                default.set('Extension', ext)
+                default.set('ContentType', content_type)
+                self._types_root.insert(0, default)
+            self._zip.writestr('[Content_Types].xml',
+                               etree.tostring(self._types_root, xml_declaration=True, encoding='UTF-8', standalone=True))
+        finally:
+            self._zip.close()
+            shutil.rmtree(self._spool_dir, ignore_errors=True)
+
+    def abort(self):
+        """Discard a partially written package"""
+        if not self._closed:
+            self._closed = True
+            try:
+                self._document.close()
+            except Exception:
+                pass
+            self._zip.close()
+            shutil.rmtree(self._spool_dir, ignore_errors=True)
+        if os.path.exists(self.output_path):
+            os.remove(self.output_path)
+
+
+class CopyMergeTarget:
+    """
+    Merge by appending the source body elements (w:p, w:tbl, ...) directly to
+    the body of an in-memory python-docx master document
+
+    Elements are moved in bulk from the parsed source, which is discarded right
+    after, instead of being rebuilt run by run, so formatting is preserved.
+    """
+
+    def __init__(self, output_path):
+        self.output_path = output_path
+        self.master_doc = Document()
+        self._relate = document_relater(self.master_doc)
+
+    def _append(self, elements):
+        # Insérer avant le w:sectPr final en une seule opération
+        append_body_elements(self.master_doc, elements)
+
+    def add_heading(self, text):
+        self._append([parse_xml(etree.tostring(_heading_element(text)))])
+
+    def add_error(self, text):
+        self._append([parse_xml(etree.tostring(_error_element(text)))])
+
+    def append_document(self, source):
+        doc = Document(open_source(source))
+        self._append(list(_prepared_elements(doc, self._relate)))
+
+    def append_fragment(self, fragment):
+        self._append(fragment_elements(fragment, self._relate))
+
+    def close(self):
+        self.master_doc.save(self.output_path)
+
+    def abort(self):
+        self.master_doc = None
@@ -5,6 +5,7 @@ Email: moa@myoneart.com
 Copyright © 2025 MOA Digital Agency LLC. Développé par Aisance Kalonji. Tous droits réservés.
 """
 
+import json
 from flask_sqlalchemy import SQLAlchemy
 from datetime import datetime
 
@@ -23,6 +24,10 @@ class ProcessingJob(db.Model):
     file_count = db.Column(db.Integer)
     original_filename = db.Column(db.String(255))
     processing_time = db.Column(db.Integer)
+    manifest = db.Column(db.Text)  # Manifeste JSON de l'archive téléversée
+    upload_size = db.Column(db.BigInteger)  # Taille du fichier téléversé (octets)
+    upload_sha256 = db.Column(db.String(64))
+    upload_rate = db.Column(db.Float)  # Débit du téléversement (octets par seconde)
     
     def __repr__(self):
         return f'<ProcessingJob {self.job_id}>'
@@ -37,7 +42,11 @@ class ProcessingJob(db.Model):
             'completed_at': self.completed_at.isoformat() if self.completed_at else None,
             'file_count': self.file_count,
             'original_filename': self.original_filename,
-            'processing_time': self.processing_time
+            'processing_time': self.processing_time,
+            'manifest': json.loads(self.manifest) if self.manifest else None,
+            'upload_size': self.upload_size,
+            'upload_sha256': self.upload_sha256,
+            'upload_rate': self.upload_rate
         }
 
 class UsageStat(db.Model):
@@ -83,4 +92,23 @@ class Config(db.Model):
             config = cls(key=key, value=value, description=description)
             db.session.add(config)
         db.session.commit()
-        return config
\ No newline at end of file
+        return config
+
+def add_missing_columns():
+    """
+    Add to existing tables the columns declared on the models since they were created
+
+    db.create_all() only creates missing tables; new nullable columns are
+    added with ALTER TABLE so that existing databases keep working.
+    """
+    inspector = db.inspect(db.engine)
+    for table in db.metadata.sorted_tables:
+        if not inspector.has_table(table.name):
+            continue
+        existing = {column['name'] for column in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name not in existing:
+                column_type = column.type.compile(db.engine.dialect)
+                db.session.execute(db.text(f'ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}'))
+                print(f"Colonne ajoutée: {table.name}.{column.name}")
+    db.session.commit()
@@ -0,0 +1,307 @@
+"""
+DocxFilesMerger - Application de traitement et fusion de documents.
+Développé par MOA Digital Agency LLC (https://myoneart.com)
+Email: moa@myoneart.com
+Copyright © 2025 MOA Digital Agency LLC. Développé par Aisance Kalonji. Tous droits réservés.
+"""
+
+import re
+import zlib
+import zipfile
+
+from lxml import etree
+from reportlab.lib.pagesizes import A4
+from reportlab.pdfbase.pdfmetrics import stringWidth
+
+W = '{http://schemas.openxmlformats.org/wordprocessingml/2006/main}'
+
+# Polices standard PDF (non incorporées) et leurs noms de ressource
+FONTS = {'F1': 'Helvetica', 'F2': 'Helvetica-Bold'}
+BODY_FONT, BOLD_FONT = 'F1', 'F2'
+
+# (taille, interligne, espace avant) des paragraphes selon leur niveau de titre
+HEADING_SIZES = {1: (16, 20, 12), 2: (13, 16, 10), 3: (12, 15, 8)}
+BODY_SIZE, BODY_LEADING, PARAGRAPH_SPACING = 10, 13, 4
+TABLE_SIZE, TABLE_LEADING, CELL_PADDING = 9, 11, 3
+MARGIN = 56
+
+_CONTROL_CHARS = re.compile('[\x00-\x08\x0b-\x1f]')
+
+
+def docx_blocks(docx_path):
+    """
+    Yield the body of a .docx as ('paragraph', text, heading_level),
+    ('table', rows) and ('page_break',) blocks, in document order
+
+    word/document.xml is parsed incrementally and every block is released
+    once yielded, so memory does not grow with the document. heading_level
+    is 0 for body text.
+    """
+    with zipfile.ZipFile(docx_path) as package, package.open('word/document.xml') as stream:
+        table_depth = paragraph_depth = 0
+        for event, element in etree.iterparse(stream, events=('start', 'end'), tag=(W + 'p', W + 'tbl')):
+            if element.tag == W + 'tbl':
+                table_depth += 1 if event == 'start' else -1
+                if event == 'end' and table_depth == 0 and paragraph_depth == 0:
+                    yield 'table', _table_rows(element)
+                    _release(element)
+                continue
+
+            paragraph_depth += 1 if event == 'start' else -1
+            if event == 'end' and table_depth == 0 and paragraph_depth == 0:
+                text, page_break = _paragraph_text(element)
+                if page_break or element.find(f'{W}pPr/{W}pageBreakBefore') is not None:
+                    yield ('page_break',)
+                yield 'paragraph', text, _heading_level(element)
+                _release(element)
+
+
+def _release(element):
+    # Libérer l'élément traité et ceux qui le précèdent dans le corps
+    element.clear()
+    while element.getprevious() is not None:
+        del element.getparent()[0]
+
+
+def _paragraph_text(paragraph):
+    parts = []
+    page_break = False
+    for node in paragraph.iter(W + 't', W + 'tab', W + 'br', W + 'cr'):
+        if node.tag == W + 't':
+            parts.append(node.text or '')
+        elif node.tag == W + 'tab':
+            parts.append('    ')
+        elif node.get(W + 'type') == 'page':
+            page_break = True
+        else:
+            parts.append('\n')
+    return _CONTROL_CHARS.sub('', ''.join(parts)), page_break
+
+
+def _heading_level(paragraph):
+    style = paragraph.find(f'{W}pPr/{W}pStyle')
+    name = (style.get(W + 'val') or '').lower() if style is not None else ''
+    if name == 'title':
+        return 1
+    match = re.match(r'(?:heading|titre)(\d)', name)
+    return int(match.group(1)) if match else 0
+
+
+def _table_rows(table):
+    return [['\n'.join(_paragraph_text(paragraph)[0] for paragraph in cell.iter(W + 'p'))
+             for cell in row.findall(W + 'tc')]
+            for row in table.findall(W + 'tr')]
+
+
+def wrap_text(text, font, size, width):
+    """
+    Split text into lines no wider than width points
+
+    Lines break between words; a word wider than the line (long numbers,
+    rows of dots...) is cut where it overflows.
+    """
+    font_name = FONTS[font]
+    space = stringWidth(' ', font_name, size)
+    lines = []
+    for raw_line in text.split('\n'):
+        line, line_width = '', 0
+        for word in raw_line.split(' '):
+            word_width = stringWidth(word, font_name, size)
+            if line and line_width + space + word_width <= width:
+                line, line_width = f"{line} {word}", line_width + space + word_width
+                continue
+            if line:
+                lines.append(line)
+            while word_width > width and len(word) > 1:
+                cut = _fitting_length(word, font_name, size, width)
+                lines.append(word[:cut])
+                word = word[cut:]
+                word_width = stringWidth(word, font_name, size)
+            line, line_width = word, word_width
+        lines.append(line)
+    return lines
+
+
+def _fitting_length(word, font_name, size, width):
+    # Plus long préfixe du mot tenant dans la largeur (au moins un caractère)
+    low, high = 1, len(word)
+    while low < high:
+        middle = (low + high + 1) // 2
+        if stringWidth(word[:middle], font_name, size) <= width:
+            low = middle
+        else:
+            high = middle - 1
+    return low
+
+
+def _pdf_string(text):
+    data = text.encode('cp1252', 'replace')
+    return b'(' + data.replace(b'\\', b'\\\\').replace(b'(', b'\\(').replace(b')', b'\\)') + b')'
+
+
+class StreamingPdfWriter:
+    """
+    Minimal PDF writer that writes every page to disk as soon as it is complete
+
+    Only the offsets of the objects written so far are kept, to build the
+    cross-reference table at the end. Text uses the standard Helvetica
+    fonts (WinAnsi encoding), so nothing is embedded.
+    """
+
+    def __init__(self, path, pagesize=A4):
+        self.pagesize = pagesize
+        self.page_count = 0
+        self._file = open(path, 'wb')
+        self._offsets = []
+        self._page_ids = []
+        self._file.write(b'%PDF-1.4\n%\xe2\xe3\xcf\xd3\n')
+        # 1: catalogue, 2: arbre des pages (écrits à la fin), puis les polices
+        self._offsets.extend([None, None])
+        self._font_ids = {}
+        for resource, font_name in FONTS.items():
+            self._font_ids[resource] = self._write_object(
+                f'<< /Type /Font /Subtype /Type1 /BaseFont /{font_name} /Encoding /WinAnsiEncoding >>'.encode())
+
+    def _write_object(self, body, object_id=None):
+        if object_id is None:
+            self._offsets.append(None)
+            object_id = len(self._offsets)
+        self._offsets[object_id - 1] = self._file.tell()
+        self._file.write(f'{object_id} 0 obj\n'.encode() + body + b'\nendobj\n')
+        return object_id
+
+    def add_page(self, content):
+        """Write one page from its content stream (PDF drawing operators)"""
+        data = zlib.compress(content)
+        content_id = self._write_object(f'<< /Length {len(data)} /Filter /FlateDecode >>\nstream\n'.encode()
+                                        + data + b'\nendstream')
+        self._page_ids.append(self._write_object(f'<< /Type /Page /Parent 2 0 R /Contents {content_id} 0 R >>'.encode()))
+        self.page_count += 1
+
+    def close(self):
+        width, height = self.pagesize
+        fonts = ' '.join(f'/{resource} {object_id} 0 R' for resource, object_id in self._font_ids.items())
+        kids = ' '.join(f'{page_id} 0 R' for page_id in self._page_ids)
+        self._write_object(f'<< /Type /Pages /Kids [{kids}] /Count {self.page_count} '
+                           f'/MediaBox [0 0 {width:.2f} {height:.2f}] /Resources << /Font << {fonts} >> >> >>'.encode(), 2)
+        self._write_object(b'<< /Type /Catalog /Pages 2 0 R >>', 1)
+
+        xref_offset = self._file.tell()
+        self._file.write(f'xref\n0 {len(self._offsets) + 1}\n0000000000 65535 f \n'.encode())
+        self._file.write(b''.join(b'%010d 00000 n \n' % offset for offset in self._offsets))
+        self._file.write(f'trailer\n<< /Size {len(self._offsets) + 1} /Root 1 0 R >>\n'
+                         f'startxref\n{xref_offset}\n%%EOF\n'.encode())
+        self._file.close()
+
+
+class PageLayout:
+    """Lay out paragraphs and tables top to bottom, starting a new page when one is full"""
+
+    def __init__(self, writer, margin=MARGIN):
+        self.writer = writer
+        self.left = margin
+        self.width = writer.pagesize[0] - 2 * margin
+        self.top = writer.pagesize[1] - margin
+        self.bottom = margin
+        self.y = self.top
+        self._ops = []
+
+    def _text(self, x, text, font, size):
+        self._ops.append(b'BT /%s %d Tf %.2f %.2f Td %s Tj ET' % (font.encode(), size, x, self.y, _pdf_string(text)))
+
+    def finish_page(self):
+        """Write the current page, if anything was drawn on it, and start a new one"""
+        if not self._ops:
+            # Page restée blanche (paragraphes vides): on repart simplement du haut
+            self.y = self.top
+            return
+        # Numéro de page en pied de page
+        self.y = self.bottom / 2
+        self._text(self.left + self.width / 2 - 10, f"{self.writer.page_count + 1}", BODY_FONT, 8)
+        self.writer.add_page(b'0.5 w\n' + b'\n'.join(self._ops))
+        self._ops = []
+        self.y = self.top
+
+    def paragraph(self, text, heading_level=0):
+        if heading_level:
+            size, leading, space_before = HEADING_SIZES.get(heading_level, HEADING_SIZES[3])
+            font = BOLD_FONT
+        else:
+            size, leading, space_before = BODY_SIZE, BODY_LEADING, 0
+            font = BODY_FONT
+
+        lines = wrap_text(text, font, size, self.width)
+        if self._ops:
+            self.y -= space_before
+        # Un titre n'est jamais laissé seul en bas de page
+        keep = leading * (2 if heading_level else 1)
+        for line in lines:
+            if self.y - keep < self.bottom:
+                self.finish_page()
+            keep = leading
+            self.y -= leading
+            if line:
+                self._text(self.left, line, font, size)
+        self.y -= PARAGRAPH_SPACING
+
+    def table(self, rows):
+        columns = max((len(row) for row in rows), default=0)
+        if not columns:
+            return
+        column_width = self.width / columns
+        text_width = column_width - 2 * CELL_PADDING
+
+        for row in rows:
+            cells = [wrap_text(cell, BODY_FONT, TABLE_SIZE, text_width) for cell in row]
+            cells += [['']] * (columns - len(cells))
+            needed = max(len(lines) for lines in cells)
+            start = 0
+            while start < needed:
+                available = int((self.y - self.bottom - 2 * CELL_PADDING) // TABLE_LEADING)
+                # Une ligne de tableau n'est coupée que si elle ne tient pas sur une page entière
+                if available < 1 or (available < needed - start and start == 0 and self._ops):
+                    self.finish_page()
+                    continue
+                count = min(available, needed - start)
+                height = count * TABLE_LEADING + 2 * CELL_PADDING
+                top = self.y
+                for index, lines in enumerate(cells):
+                    x = self.left + index * column_width
+                    self._ops.append(b'%.2f %.2f %.2f %.2f re S' % (x, top - height, column_width, height))
+                    self.y = top - CELL_PADDING
+                    for line in lines[start:start + count]:
+                        self.y -= TABLE_LEADING
+                        if line:
+                            self._text(x + CELL_PADDING, line, BODY_FONT, TABLE_SIZE)
+                self.y = top - height
+                start += count
+        self.y -= PARAGRAPH_SPACING
+
+    def close(self):
+        self.finish_page()
+        if not self.writer.page_count:
+            # Un PDF doit avoir au moins une page
+            self._text(self.left, '', BODY_FONT, BODY_SIZE)
+            self.finish_page()
+        self.writer.close()
+        return self.writer.page_count
+
+
+def render_docx_pdf(docx_path, pdf_path):
+    """
+    Render the text and tables of a .docx to pdf_path, page by page
+
+    Fallback when no converter is available: the layout is simple (wrapped
+    paragraphs, bold headings, tables as grids of equal columns) but the
+    document is streamed from the package to the output, so memory stays
+    bounded for any number of pages. Returns the number of pages.
+    """
+    layout = PageLayout(StreamingPdfWriter(pdf_path))
+    for block in docx_blocks(docx_path):
+        if block[0] == 'paragraph':
+            layout.paragraph(block[1], block[2])
+        elif block[0] == 'table':
+            layout.table(block[1])
+        else:
+            layout.finish_page()
+    return layout.close()
@@ -0,0 +1,250 @@
+"""
+DocxFilesMerger - Application de traitement et fusion de documents.
+Développé par MOA Digital Agency LLC (https://myoneart.com)
+Email: moa@myoneart.com
+Copyright © 2025 MOA Digital Agency LLC. Développé par Aisance Kalonji. Tous droits réservés.
+"""
+
+import os
+import re
+import time
+import hashlib
+import subprocess
+
+from capabilities import tool_path
+from merge_engine import ZipMember, source_name
+
+# Modes de production du PDF fusionné
+PDF_MODES = ('merged', 'parts')
+# Dossier des PDF par document, conservé entre deux traitements de la même archive
+PARTS_DIR = 'pdf_parts'
+
+
+def pdf_mode(mode=None):
+    """
+    How merged.pdf is produced (PDF_MODE)
+
+    - 'merged': merged.docx is converted in a single LibreOffice call
+    - 'parts': every document is rendered on its own, in parallel, and the
+      PDFs are concatenated with one bookmark per document
+    """
+    mode = (mode or os.environ.get('PDF_MODE', 'merged')).lower()
+    if mode not in PDF_MODES:
+        raise ValueError(f"Mode PDF inconnu: {mode}")
+    return mode
+
+
+def pdf_part_timeout():
+    """Time allowed to render one document in 'parts' mode, in seconds (PDF_PART_TIMEOUT, 120 by default)"""
+    try:
+        return max(1, int(os.environ.get('PDF_PART_TIMEOUT', '120')))
+    except ValueError:
+        return 120
+
+
+def part_key(source):
+    """
+    Identify the PDF of a merge source by its name and content
+
+    The name is part of the key because it is printed in the heading of
+    the document; the same key on a later run means the PDF can be reused.
+    """
+    digest = hashlib.sha256(source_name(source).encode('utf-8'))
+    if isinstance(source, dict):
+        digest.update(source['xml'])
+    elif isinstance(source, ZipMember):
+        digest.update(source.open().getvalue())
+    else:
+        with open(source, 'rb') as f:
+            for block in iter(lambda: f.read(1024 * 1024), b''):
+                digest.update(block)
+    return digest.hexdigest()
+
+
+def concatenate_pdfs(parts, pdf_path):
+    """
+    Concatenate the PDFs of (title, path) parts into pdf_path, in order
+
+    Each part starts with an outline bookmark carrying its title, and the
+    fonts and images repeated across parts are stored once (see
+    deduplicate_resources). The output is written under a temporary name
+    and renamed once complete.
+    """
+    from PyPDF2 import PdfWriter
+
+    writer = PdfWriter()
+    for title, path in parts:
+        writer.append(path, outline_item=title)
+    replaced = deduplicate_resources(writer)
+    if replaced:
+        print(f"{replaced} police(s) ou image(s) en double partagée(s) entre les documents")
+
+    temp_path = f"{pdf_path}.tmp"
+    with open(temp_path, 'wb') as f:
+        writer.write(f)
+    writer.close()
+    os.replace(temp_path, pdf_path)
+    return pdf_path
+
+
+def _digest(obj, memo, visiting):
+    # Empreinte du contenu d'un objet PDF, objets référencés compris
+    from PyPDF2.generic import IndirectObject, DictionaryObject, ArrayObject, StreamObject
+
+    if isinstance(obj, IndirectObject):
+        if obj.idnum not in memo:
+            if obj.idnum in visiting:
+                # Référence circulaire: l'objet reste distinct de tout autre
+                return f"cycle:{obj.idnum}".encode()
+            visiting.add(obj.idnum)
+            memo[obj.idnum] = _digest(obj.get_object(), memo, visiting)
+            visiting.discard(obj.idnum)
+        return memo[obj.idnum]
+
+    digest = hashlib.sha256(type(obj).__name__.encode())
+    if isinstance(obj, DictionaryObject):
+        for name in sorted(obj):
+            if name != '/Parent':
+                digest.update(name.encode('utf-8', 'replace'))
+                digest.update(_digest(obj.raw_get(name), memo, visiting))
+        if isinstance(obj, StreamObject):
+            digest.update(obj._data)
+    elif isinstance(obj, ArrayObject):
+        for item in obj:
+            digest.update(_digest(item, memo, visiting))
+    else:
+        digest.update(repr(obj).encode('utf-8', 'replace'))
+    return digest.digest()
+
+
+def _drop_unreferenced(writer):
+    # PdfWriter écrit tous ses objets: ceux qui ne sont plus atteignables
+    # depuis le catalogue sont remplacés par null
+    from PyPDF2.generic import IndirectObject, NullObject
+
+    reachable = set()
+    pending = [writer._root, writer._info]
+    while pending:
+        obj = pending.pop()
+        if isinstance(obj, IndirectObject):
+            if obj.idnum not in reachable:
+                reachable.add(obj.idnum)
+                pending.append(obj.get_object())
+        elif isinstance(obj, dict):
+            pending.extend(dict.values(obj))
+        elif isinstance(obj, list):
+            pending.extend(obj)
+
+    for index in range(len(writer._objects)):
+        if index + 1 not in reachable:
+            writer._objects[index] = NullObject()
+
+
+def deduplicate_resources(writer):
+    """
+    Make the pages of a PdfWriter share identical fonts and images
+
+    Documents rendered separately each embed their own copy of the same
+    fonts (and of repeated images such as letterheads): page resources are
+    pointed at the first identical copy and the others are dropped. Returns
+    the number of resources replaced.
+    """
+    from PyPDF2.generic import IndirectObject, NameObject
+
+    memo = {}
+    originals = {}
+    replaced = 0
+    for page in writer.pages:
+        resources = page.get('/Resources')
+        if resources is None:
+            continue
+        resources = resources.get_object()
+        for category in ('/Font', '/XObject'):
+            entries = resources.get(category)
+            if entries is None:
+                continue
+            entries = entries.get_object()
+            for name in list(entries):
+                reference = entries.raw_get(name)
+                if not isinstance(reference, IndirectObject):
+                    continue
+                original = originals.setdefault((category, _digest(reference, memo, set())), reference)
+                if original.idnum != reference.idnum:
+                    entries[NameObject(name)] = original
+                    replaced += 1
+
+    if replaced:
+        _drop_unreferenced(writer)
+    return replaced
+
+
+def pdf_optimize_enabled():
+    """Whether merged.pdf goes through optimize_pdf (PDF_OPTIMIZE, enabled by default)"""
+    return os.environ.get('PDF_OPTIMIZE', '1').lower() not in ('0', 'false', 'no', 'off')
+
+
+def pdf_link_rate():
+    """Reference link speed for the time-to-first-page estimate, in kbit/s (PDF_LINK_KBPS, 1000 by default)"""
+    try:
+        return max(1, int(os.environ.get('PDF_LINK_KBPS', '1000')))
+    except ValueError:
+        return 1000
+
+
+def first_page_bytes(pdf_path):
+    """
+    Return (linearized, size) where size is the number of bytes a viewer
+    must download before it can show the first page
+
+    For a linearized file this is the end of the first-page section (/E
+    in the linearization dictionary), otherwise the whole file.
+    """
+    with open(pdf_path, 'rb') as f:
+        head = f.read(1024)
+    match = re.search(rb'/Linearized\s[^>]*?/E\s+(\d+)', head)
+    if match:
+        return True, int(match.group(1))
+    return False, os.path.getsize(pdf_path)
+
+
+def optimize_pdf(pdf_path, timeout=600):
+    """
+    Rewrite pdf_path for fast web view with qpdf: linearized, objects packed
+    in compressed object streams, flate streams recompressed
+
+    Returns the stats recorded on the job: size before and after, whether
+    the file is linearized, the bytes needed to show the first page and the
+    matching time at PDF_LINK_KBPS, and the time spent. Without qpdf (or
+    with PDF_OPTIMIZE=0) the file is left unchanged and only described.
+    """
+    start = time.perf_counter()
+    original_size = os.path.getsize(pdf_path)
+    qpdf = tool_path('qpdf')
+
+    if qpdf and pdf_optimize_enabled():
+        temp_path = f"{pdf_path}.tmp"
+        try:
+            result = subprocess.run([qpdf, '--linearize', '--object-streams=generate', '--compress-streams=y',
+                                     '--recompress-flate', pdf_path, temp_path],
+                                    stdout=subprocess.PIPE, stderr=subprocess.PIPE, timeout=timeout)
+            # Code 3: fichier produit avec des avertissements
+            if result.returncode in (0, 3) and os.path.exists(temp_path):
+                os.replace(temp_path, pdf_path)
+            else:
+                print(f"qpdf n'a pas pu optimiser le PDF (code {result.returncode}): "
+                      f"{result.stderr.decode('utf-8', 'replace').strip()}")
+        except (subprocess.SubprocessError, OSError) as e:
+            print(f"Échec de l'optimisation du PDF via qpdf: {str(e)}")
+        finally:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+
+    linearized, first_page = first_page_bytes(pdf_path)
+    return {
+        'original_size': original_size,
+        'size': os.path.getsize(pdf_path),
+        'linearized': linearized,
+        'first_page_bytes': first_page,
+        'time_to_first_page': round(first_page * 8 / (pdf_link_rate() * 1000), 2),
+        'optimize_time': round(time.perf_counter() - start, 2),
+    }
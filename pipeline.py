@@ -0,0 +1,121 @@
+"""
+DocxFilesMerger - Application de traitement et fusion de documents.
+Développé par MOA Digital Agency LLC (https://myoneart.com)
+Email: moa@myoneart.com
+Copyright © 2025 MOA Digital Agency LLC. Développé par Aisance Kalonji. Tous droits réservés.
+"""
+
+import os
+import queue
+import threading
+
+# Marqueur de fin de flux entre deux étapes
+_DONE = object()
+
+
+def pipeline_queue_size(size=None):
+    """Capacity of the queues between pipeline stages (PIPELINE_QUEUE_SIZE, 8 by default)"""
+    if size is None:
+        size = os.environ.get('PIPELINE_QUEUE_SIZE', '8')
+    try:
+        return max(1, int(size))
+    except ValueError:
+        return 8
+
+
+def run_pipeline(items, stages, queue_size=None):
+    """
+    Run items through a chain of stages and yield the results in the original order
+
+    stages is a list of (function, workers) tuples; each stage runs in its own
+    threads and hands its results to the next one through a bounded queue, so an
+    item moves on as soon as it is ready while a slow stage applies backpressure
+    to the ones before it. A reorder buffer restores the input order at the end.
+
+    Yields (index, result, error) tuples. When a stage raises, the item skips the
+    remaining stages and comes out with result None and the exception as error.
+    """
+    queue_size = pipeline_queue_size(queue_size)
+    queues = [queue.Queue(maxsize=queue_size) for _ in range(len(stages) + 1)]
+    # Nombre maximal d'éléments en vol: borne aussi le tampon de réordonnancement
+    window = threading.Semaphore(queue_size * (len(stages) + 1))
+    stop = threading.Event()
+    lock = threading.Lock()
+    remaining = [workers for _, workers in stages]
+
+    def put(target, entry):
+        while not stop.is_set():
+            try:
+                target.put(entry, timeout=0.5)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def get(source):
+        while not stop.is_set():
+            try:
+                return source.get(timeout=0.5)
+            except queue.Empty:
+                continue
+        return _DONE
+
+    def feed():
+        try:
+            for index, item in enumerate(items):
+                while not window.acquire(timeout=0.5):
+                    if stop.is_set():
+                        return
+                if not put(queues[0], (index, item, None)):
+                    return
+        finally:
+            for _ in range(stages[0][1]):
+                put(queues[0], _DONE)
+
+    def work(stage_index, function):
+        inbox, outbox = queues[stage_index], queues[stage_index + 1]
+        while True:
+            entry = get(inbox)
+            if entry is _DONE:
+                break
+            index, value, error = entry
+            if error is None:
+                try:
+                    value = function(value)
+                except Exception as e:
+                    value, error = None, e
+            if not put(outbox, (index, value, error)):
+                return
+
+        # Le dernier thread de l'étape signale la fin à l'étape suivante
+        with lock:
+            remaining[stage_index] -= 1
+            last = remaining[stage_index] == 0
+        if last:
+            next_workers = stages[stage_index + 1][1] if stage_index + 1 < len(stages) else 1
+            for _ in range(next_workers):
+                put(outbox, _DONE)
+
+    threads = [threading.Thread(target=feed, daemon=True)]
+    for stage_index, (function, workers) in enumerate(stages):
+        for _ in range(workers):
+            threads.append(threading.Thread(target=work, args=(stage_index, function), daemon=True))
+    for thread in threads:
+        thread.start()
+
+    buffer = {}
+    next_index = 0
+    try:
+        while True:
+            entry = get(queues[-1])
+            if entry is _DONE:
+                break
+            index, value, error = entry
+            buffer[index] = (value, error)
+            while next_index in buffer:
+                value, error = buffer.pop(next_index)
+                window.release()
+                yield next_index, value, error
+                next_index += 1
+    finally:
+        stop.set()
@@ -0,0 +1,143 @@
+"""
+DocxFilesMerger - Application de traitement et fusion de documents.
+Développé par MOA Digital Agency LLC (https://myoneart.com)
+Email: moa@myoneart.com
+Copyright © 2025 MOA Digital Agency LLC. Développé par Aisance Kalonji. Tous droits réservés.
+"""
+
+import os
+import threading
+import traceback
+from collections import deque
+
+
+def _env_int(name, default):
+    try:
+        return int(os.environ.get(name, default))
+    except ValueError:
+        return default
+
+
+def job_workers():
+    """Number of jobs processed at the same time (JOB_WORKERS, 2 by default)"""
+    return max(1, _env_int('JOB_WORKERS', 2))
+
+
+def job_queue_size():
+    """Number of jobs allowed to wait for a worker (JOB_QUEUE_SIZE, 10 by default, 0 to reject when busy)"""
+    return max(0, _env_int('JOB_QUEUE_SIZE', 10))
+
+
+class QueueFullError(Exception):
+    """Raised by JobScheduler.submit when every worker is busy and the queue is full"""
+
+
+class JobScheduler:
+    """
+    Run processing jobs on a fixed number of worker threads
+
+    Jobs wait in a bounded first-in first-out queue while all the workers
+    are busy; beyond max_pending, submit() refuses them so that a burst of
+    uploads cannot start more merges and LibreOffice conversions than the
+    machine can take. The limits apply per process (each gunicorn worker
+    has its own scheduler).
+    """
+
+    def __init__(self, workers=None, max_pending=None):
+        self.workers = workers or job_workers()
+        self.max_pending = job_queue_size() if max_pending is None else max_pending
+        self._pending = deque()
+        self._running = set()
+        self._held = set()
+        self._condition = threading.Condition()
+        self._threads = [threading.Thread(target=self._work, name=f'job-worker-{index}', daemon=True)
+                         for index in range(self.workers)]
+        for thread in self._threads:
+            thread.start()
+
+    def submit(self, job_id, run, on_queued=None):
+        """
+        Queue the callable run as job job_id
+
+        Returns the position of the job in the queue, 0 when a worker picks
+        it up right away. on_queued(position) is called when the job has to
+        wait, before any worker can start it (e.g. to write its status); if
+        it raises, the job is taken back out of the queue and the error is
+        passed on. Raises QueueFullError when the job cannot be accepted and
+        ValueError when job_id is already queued or running.
+        """
+        with self._condition:
+            if job_id in self._running or any(pending_id == job_id for pending_id, _ in self._pending):
+                raise ValueError("Ce traitement est déjà en cours ou en attente.")
+            # Travaux qui devront attendre un processus libre, celui-ci compris
+            free = self.workers - len(self._running)
+            if len(self._pending) + 1 - free > self.max_pending:
+                raise QueueFullError("Le serveur traite déjà le nombre maximal de fichiers. "
+                                     "Veuillez réessayer dans quelques minutes.")
+            self._pending.append((job_id, run))
+            position = max(0, len(self._pending) - free)
+            if not (position and on_queued):
+                self._condition.notify()
+                return position
+            # Place réservée, mais aucun processus ne la prend avant la fin de on_queued
+            self._held.add(job_id)
+
+        try:
+            on_queued(position)
+        except Exception:
+            with self._condition:
+                self._held.discard(job_id)
+                self._pending.remove((job_id, run))
+                self._condition.notify_all()
+            raise
+        with self._condition:
+            self._held.discard(job_id)
+            self._condition.notify_all()
+        return position
+
+    def position(self, job_id):
+        """0 when job_id is running, its 1-based position while it waits, None otherwise"""
+        with self._condition:
+            if job_id in self._running:
+                return 0
+            # Les premiers travaux de la file partent sur les processus libres
+            free = self.workers - len(self._running)
+            for index, (pending_id, _) in enumerate(self._pending):
+                if pending_id == job_id:
+                    return max(0, index + 1 - free)
+            return None
+
+    def stats(self):
+        """Worker and queue counters shown on the admin page"""
+        with self._condition:
+            return {'workers': self.workers, 'running': len(self._running),
+                    'pending': len(self._pending), 'max_pending': self.max_pending}
+
+    def _work(self):
+        while True:
+            with self._condition:
+                # Premier arrivé, premier servi: un travail réservé bloque ceux qui le suivent
+                while not self._pending or self._pending[0][0] in self._held:
+                    self._condition.wait()
+                job_id, run = self._pending.popleft()
+                self._running.add(job_id)
+            try:
+                run()
+            except Exception:
+                traceback.print_exc()
+            finally:
+                with self._condition:
+                    self._running.discard(job_id)
+
+
+_scheduler = None
+_scheduler_lock = threading.Lock()
+
+
+def get_scheduler():
+    """Return the process-wide job scheduler, sized by JOB_WORKERS and JOB_QUEUE_SIZE"""
+    global _scheduler
+    with _scheduler_lock:
+        if _scheduler is None:
+            _scheduler = JobScheduler()
+        return _scheduler
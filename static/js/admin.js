@@ -112,6 +112,9 @@ document.addEventListener('DOMContentLoaded', function() {
             } else if (job.status === 'processing') {
                 badgeClass = 'bg-primary';
                 statusText = 'En cours';
+            } else if (job.status === 'queued') {
+                badgeClass = 'bg-warning';
+                statusText = 'En attente';
             }
             
             // Définir le contenu HTML de la ligne
@@ -18,6 +18,7 @@ let pdfDownloadBtn = null;
 // Variables for tracking state
 let uploadStatus = 'idle'; // 'idle', 'uploading', 'processing', 'complete', 'error'
 let statusCheckInterval = null;
+let processingDeadline = null; // Fin estimée du traitement (ms), d'après l'ETA du serveur
 
 // Initialize the upload interface
 function setupDropZone() {
@@ -132,26 +133,15 @@ function uploadFile(file) {
     uploadStatus = 'uploading';
     updateProgressUI(5, 'Téléversement du fichier...', 'upload');
     
-    // Create form data
-    const formData = new FormData();
-    formData.append('file', file);
+    // Les gros fichiers sont envoyés par morceaux pour pouvoir reprendre après une coupure
+    const chunked = file.size > CHUNKED_UPLOAD_THRESHOLD;
+    const upload = chunked ? uploadInChunks(file) : uploadWholeFile(file);
     
-    // Send the file to the server
-    fetch('/upload', {
-        method: 'POST',
-        body: formData
-    })
-    .then(response => {
-        if (!response.ok) {
-            return response.json().then(data => {
-                throw new Error(data.error || 'Échec du téléversement');
-            });
-        }
-        return response.json();
-    })
+    upload
     .then(data => {
         if (data.success) {
-            updateProgressUI(20, 'Téléversement terminé. Démarrage du traitement...', 'upload_complete');
+            processingDeadline = data.eta_seconds ? Date.now() + data.eta_seconds * 1000 : null;
+            updateProgressUI(20, `Téléversement terminé : ${data.file_count} documents. Démarrage du traitement...`, 'upload_complete');
             startProcessing(data.zip_path, data.file_count);
         } else {
             throw new Error(data.error || 'Échec du téléversement');
@@ -159,11 +149,138 @@ function uploadFile(file) {
     })
     .catch(error => {
         uploadStatus = 'error';
-        updateProgressUI(0, 'Erreur lors du téléversement : ' + error.message, 'error');
+        const hint = chunked && error.resumable ? ' Sélectionnez à nouveau le même fichier pour reprendre le téléversement.' : '';
+        updateProgressUI(0, 'Erreur lors du téléversement : ' + error.message + hint, 'error');
         console.error('Upload error:', error);
     });
 }
 
+function fetchJson(url, options, failureMessage) {
+    return fetch(url, options).then(response => {
+        if (!response.ok) {
+            return response.json().catch(() => ({})).then(data => {
+                const error = new Error(data.error || failureMessage);
+                error.status = response.status;
+                throw error;
+            });
+        }
+        return response.json();
+    });
+}
+
+function uploadWholeFile(file) {
+    // Corps brut: le serveur l'écrit directement à sa place, sans passer par un formulaire
+    return fetchJson('/upload', {
+        method: 'POST',
+        headers: {
+            'Content-Type': 'application/zip',
+            'X-Filename': encodeURIComponent(file.name)
+        },
+        body: file
+    }, 'Échec du téléversement');
+}
+
+// Téléversement par morceaux
+const CHUNKED_UPLOAD_THRESHOLD = 16 * 1024 * 1024;
+const PARALLEL_CHUNKS = 3;
+const CHUNK_ATTEMPTS = 4;
+
+function uploadResumeKey(file) {
+    return `upload:${file.name}:${file.size}:${file.lastModified}`;
+}
+
+async function uploadInChunks(file) {
+    const resumeKey = uploadResumeKey(file);
+    let upload = null;
+    
+    // Reprendre un téléversement interrompu du même fichier
+    const savedId = localStorage.getItem(resumeKey);
+    if (savedId) {
+        const response = await fetch(`/upload/chunks/${savedId}`);
+        if (response.ok) {
+            upload = await response.json();
+        }
+    }
+    if (!upload) {
+        upload = await fetchJson('/upload/chunks', {
+            method: 'POST',
+            headers: { 'Content-Type': 'application/json' },
+            body: JSON.stringify({ filename: file.name, size: file.size })
+        }, 'Échec du téléversement');
+        localStorage.setItem(resumeKey, upload.upload_id);
+    }
+    
+    const received = new Set(upload.received);
+    const pending = [];
+    for (let offset = 0; offset < file.size; offset += upload.chunk_size) {
+        if (!received.has(offset)) {
+            pending.push(offset);
+        }
+    }
+    
+    let sentBytes = file.size - pending.reduce((total, offset) => total + Math.min(upload.chunk_size, file.size - offset), 0);
+    const reportProgress = () => {
+        updateProgressUI(5 + 15 * sentBytes / file.size,
+            `Téléversement du fichier... ${formatFileSize(sentBytes)} / ${formatFileSize(file.size)}`, 'upload');
+    };
+    reportProgress();
+    
+    // Plusieurs morceaux en vol à la fois
+    const sendPending = async () => {
+        while (pending.length > 0) {
+            const offset = pending.shift();
+            const chunk = file.slice(offset, offset + upload.chunk_size);
+            await sendChunk(upload.upload_id, offset, chunk);
+            sentBytes += chunk.size;
+            reportProgress();
+        }
+    };
+    try {
+        await Promise.all(Array.from({ length: PARALLEL_CHUNKS }, sendPending));
+    } catch (error) {
+        error.resumable = true;
+        throw error;
+    }
+    
+    const data = await fetchJson(`/upload/chunks/${upload.upload_id}/complete`, { method: 'POST' }, 'Échec du téléversement');
+    localStorage.removeItem(resumeKey);
+    return data;
+}
+
+async function sendChunk(uploadId, offset, chunk) {
+    const headers = { 'Content-Type': 'application/octet-stream' };
+    const checksum = await chunkChecksum(chunk);
+    if (checksum) {
+        headers['X-Chunk-SHA256'] = checksum;
+    }
+    
+    for (let attempt = 1; ; attempt++) {
+        try {
+            return await fetchJson(`/upload/chunks/${uploadId}?offset=${offset}`, {
+                method: 'PUT',
+                headers: headers,
+                body: chunk
+            }, "Échec de l'envoi d'un morceau");
+        } catch (error) {
+            // Téléversement introuvable ou déjà finalisé: inutile de réessayer
+            if (attempt >= CHUNK_ATTEMPTS || error.status === 404 || error.status === 409) {
+                throw error;
+            }
+            // Nouvel essai après une pause croissante
+            await new Promise(resolve => setTimeout(resolve, 1000 * attempt));
+        }
+    }
+}
+
+async function chunkChecksum(chunk) {
+    // crypto.subtle n'existe que dans un contexte sécurisé (HTTPS ou localhost)
+    if (!window.crypto || !window.crypto.subtle) {
+        return null;
+    }
+    const digest = await window.crypto.subtle.digest('SHA-256', await chunk.arrayBuffer());
+    return Array.from(new Uint8Array(digest), byte => byte.toString(16).padStart(2, '0')).join('');
+}
+
 function startProcessing(zipPath, fileCount) {
     // Update status
     uploadStatus = 'processing';
@@ -263,7 +380,7 @@ function checkProcessingStatus(fileCount) {
             
             // Mettre à jour l'UI en fonction de l'étape actuelle
             if (data.percent !== undefined && data.status_text) {
-                updateProgressUI(data.percent, data.status_text, data.current_step);
+                updateProgressUI(data.percent, data.status_text + formatRemainingTime(), data.current_step);
                 return;
             }
             
@@ -341,6 +458,14 @@ function getMotivationalMessage(percent) {
     return "";
 }
 
+function formatRemainingTime() {
+    if (!processingDeadline) return '';
+    const seconds = Math.round((processingDeadline - Date.now()) / 1000);
+    if (seconds <= 0) return ' (presque terminé)';
+    if (seconds < 60) return ` (environ ${seconds} s restantes)`;
+    return ` (environ ${Math.ceil(seconds / 60)} min restantes)`;
+}
+
 function updateProgressUI(percent, statusText, step) {
     // Show progress container
     progressContainer.style.display = 'block';
@@ -456,12 +581,44 @@ function showResults(data) {
         // Mettre à jour les références des boutons
         docxDownloadBtn = document.getElementById('docx-download-btn');
         pdfDownloadBtn = document.getElementById('pdf-download-btn');
+        pdfDownloadBtn.addEventListener('click', downloadPdf);
+    }
+}
+
+async function downloadPdf(event) {
+    // Le PDF peut être généré à la première demande: attendre qu'il soit prêt
+    // (réponse 202) avant de lancer le téléchargement
+    event.preventDefault();
+    const button = event.currentTarget;
+    if (button.classList.contains('disabled')) {
+        return;
+    }
+    const label = button.innerHTML;
+    button.classList.add('disabled');
+    
+    try {
+        for (;;) {
+            const response = await fetch('/download/pdf', { method: 'HEAD', headers: { 'Accept': 'application/json' } });
+            if (response.status !== 202) {
+                break;
+            }
+            button.innerHTML = '<span class="spinner-border spinner-border-sm me-2"></span>Génération du PDF...';
+            const delay = parseInt(response.headers.get('Retry-After'), 10) || 5;
+            await new Promise(resolve => setTimeout(resolve, delay * 1000));
+        }
+    } catch (error) {
+        console.error('PDF status error:', error);
+    } finally {
+        button.innerHTML = label;
+        button.classList.remove('disabled');
     }
+    window.location.href = '/download/pdf';
 }
 
 function resetApplication() {
     // Reset UI state
     uploadStatus = 'idle';
+    processingDeadline = null;
     
     // Clear any ongoing status check
     if (statusCheckInterval) {
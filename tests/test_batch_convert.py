@@ -0,0 +1,38 @@
+import os
+import sys
+import time
+
+from libreoffice import batch_convert
+
+FAKE_SOFFICE = '''#!{python}
+import os, sys, time
+args = sys.argv[1:]
+outdir = args[args.index('--outdir') + 1]
+for path in args[args.index('--outdir') + 2:]:
+    if 'bloque' in path:
+        time.sleep(60)
+    name = os.path.splitext(os.path.basename(path))[0]
+    with open(os.path.join(outdir, name + '.docx'), 'w') as f:
+        f.write('docx')
+'''
+
+
+def test_hung_document_is_bounded_and_only_missing_files_are_reported(tmp_path, monkeypatch):
+    soffice = tmp_path / 'soffice'
+    soffice.write_text(FAKE_SOFFICE.format(python=sys.executable))
+    soffice.chmod(0o755)
+    inputs = []
+    for name in ('a', 'b', 'bloque', 'c'):
+        inputs.append(str(tmp_path / f'{name}.doc'))
+        open(inputs[-1], 'w').close()
+    monkeypatch.setenv('LIBREOFFICE_BATCH_TIMEOUT', '2')
+
+    start = time.monotonic()
+    results = batch_convert(str(soffice), inputs, str(tmp_path / 'out'), timeout_per_file=1)
+
+    # 4 fichiers à 1 s, plafonnés à 2 s: bien moins que le sommeil de 60 s
+    assert time.monotonic() - start < 20
+    assert results[inputs[0]] == os.path.join(str(tmp_path / 'out'), 'a.docx')
+    assert results[inputs[1]] is not None
+    assert results[inputs[2]] is None
+    assert results[inputs[3]] is None
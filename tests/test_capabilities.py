@@ -0,0 +1,32 @@
+import libreoffice
+from capabilities import set_overrides, tool_path
+
+
+class FakePool:
+    def __init__(self):
+        self.stopped = False
+
+    def shutdown(self):
+        self.stopped = True
+
+
+def test_set_overrides_resets_libreoffice_pool(monkeypatch, tmp_path):
+    pool = FakePool()
+    monkeypatch.setattr(libreoffice, '_pool', pool)
+    monkeypatch.setattr(libreoffice, '_pool_checked', True)
+    assert libreoffice.get_libreoffice_pool() is pool
+
+    soffice = tmp_path / 'soffice'
+    soffice.write_text('#!/bin/sh\n')
+    soffice.chmod(0o755)
+    try:
+        set_overrides({'LIBREOFFICE_PATH': str(soffice)})
+
+        assert pool.stopped
+        assert not libreoffice._pool_checked
+        assert tool_path('libreoffice') == str(soffice)
+        # La taille 0 désactive le pool: il n'est pas relancé avec le nouveau chemin
+        monkeypatch.setenv('LIBREOFFICE_POOL_SIZE', '0')
+        assert libreoffice.get_libreoffice_pool() is None
+    finally:
+        set_overrides({})
@@ -0,0 +1,88 @@
+import io
+import hashlib
+import threading
+
+import pytest
+
+from chunked_upload import (UploadFinishedError, create_upload, finish_upload, upload_status,
+                            write_chunk)
+
+CHUNK = 1024 * 1024
+
+
+@pytest.fixture
+def payload():
+    return bytes(range(256)) * (CHUNK * 3 // 256 - 100)
+
+
+@pytest.fixture
+def upload_dir(tmp_path, payload):
+    directory = str(tmp_path / 'upload')
+    create_upload(directory, 'archive.zip', len(payload), chunk_size=CHUNK)
+    return directory
+
+
+def send(upload_dir, payload, offset, data=None):
+    chunk = payload[offset:offset + CHUNK]
+    return write_chunk(upload_dir, offset, io.BytesIO(chunk if data is None else data),
+                       hashlib.sha256(chunk).hexdigest())
+
+
+def test_resume_after_failed_chunk(upload_dir, payload):
+    send(upload_dir, payload, 0)
+    # Morceau tronqué puis morceau corrompu: aucun n'est compté comme reçu
+    with pytest.raises(ValueError):
+        send(upload_dir, payload, CHUNK, payload[CHUNK:CHUNK + 10])
+    with pytest.raises(ValueError):
+        send(upload_dir, payload, CHUNK, b'x' * CHUNK)
+    send(upload_dir, payload, 2 * CHUNK)
+
+    status = upload_status(upload_dir)
+    assert status['received'] == [0, 2 * CHUNK]
+    assert not status['complete']
+    with pytest.raises(ValueError, match='manquant'):
+        finish_upload(upload_dir)
+
+    # Reprise: seul le morceau manquant est renvoyé
+    send(upload_dir, payload, CHUNK)
+    path, stats = finish_upload(upload_dir)
+
+    with open(path, 'rb') as f:
+        assert f.read() == payload
+    assert stats['size'] == len(payload)
+
+
+def test_complete_sent_twice_finishes_once(upload_dir, payload):
+    for offset in range(0, len(payload), CHUNK):
+        send(upload_dir, payload, offset)
+
+    results, errors = [], []
+    barrier = threading.Barrier(4)
+
+    def complete():
+        barrier.wait()
+        try:
+            results.append(finish_upload(upload_dir))
+        except UploadFinishedError as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=complete) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(results) == 1
+    assert len(errors) == 3
+    with pytest.raises(UploadFinishedError):
+        finish_upload(upload_dir)
+
+
+def test_chunk_after_completion_reports_missing_upload(upload_dir, payload):
+    for offset in range(0, len(payload), CHUNK):
+        send(upload_dir, payload, offset)
+    finish_upload(upload_dir)
+
+    # /upload/chunks/<id> répond 409 à ce morceau en retard
+    with pytest.raises(FileNotFoundError):
+        send(upload_dir, payload, 0)
@@ -0,0 +1,48 @@
+import struct
+
+import pytest
+
+from corpus import make_legacy_doc
+from doc_reader import read_blocks, read_text
+
+
+@pytest.fixture
+def legacy_doc(tmp_path):
+    path = make_legacy_doc(str(tmp_path / 'report.doc'), 7, paragraphs=2, table_rows=2, table_cols=3)
+    with open(path, 'rb') as f:
+        return f.read()
+
+
+def test_read_blocks(legacy_doc):
+    blocks = read_blocks(legacy_doc)
+
+    assert blocks[0] == ('paragraph', 'Compte rendu n°7')
+    assert blocks[1][1].startswith('Paragraphe 0 du compte rendu 7.')
+    assert blocks[3] == ('table', [['R0C0', 'R0C1', 'R0C2'], ['R1C0', 'R1C1', 'R1C2']])
+    assert blocks[-1] == ('paragraph', 'Fin du compte rendu.')
+
+
+def test_accepts_early_word97_fib(legacy_doc):
+    early = legacy_doc.replace(struct.pack('<HH', 0xA5EC, 0xC1), struct.pack('<HH', 0xA5EC, 0xC0), 1)
+
+    assert read_blocks(early) == read_blocks(legacy_doc)
+
+
+def test_rejects_pre_word97_fib(legacy_doc):
+    word6 = legacy_doc.replace(struct.pack('<HH', 0xA5EC, 0xC1), struct.pack('<HH', 0xA5EC, 101), 1)
+
+    with pytest.raises(ValueError, match='nFib=101'):
+        read_text(word6)
+
+
+def test_rejects_encrypted_document(legacy_doc):
+    fib_base = struct.pack('<HHHHHH', 0xA5EC, 0xC1, 0, 0x0409, 0, 0x0200)
+    encrypted = legacy_doc.replace(fib_base, fib_base[:10] + struct.pack('<H', 0x0300), 1)
+
+    with pytest.raises(ValueError, match='chiffré'):
+        read_text(encrypted)
+
+
+def test_rejects_non_ole2_data():
+    with pytest.raises(ValueError):
+        read_text(b'PK\x03\x04' + b'\0' * 1024)
@@ -0,0 +1,50 @@
+import io
+import zipfile
+from types import SimpleNamespace
+
+from archives import archive_documents, close_archives
+from utils import find_duplicate_members, replay_duplicates
+
+
+def test_duplicates_across_folders_and_nested_archives(tmp_path):
+    inner = io.BytesIO()
+    with zipfile.ZipFile(inner, 'w') as archive:
+        archive.writestr('copie/rapport.docx', b'rapport')
+    path = tmp_path / 'upload.zip'
+    with zipfile.ZipFile(path, 'w', zipfile.ZIP_DEFLATED) as archive:
+        archive.writestr('a/rapport.docx', b'rapport')
+        archive.writestr('b/annexe.docx', b'annexe')
+        archive.writestr('c/rapport.docx', b'rapport')
+        archive.writestr('inner.zip', inner.getvalue())
+
+    with zipfile.ZipFile(path) as zip_ref:
+        documents = archive_documents(zip_ref)
+        try:
+            assert find_duplicate_members(documents) == {2: 0, 3: 0}
+        finally:
+            close_archives(documents)
+
+
+class FakeArchive:
+    def __init__(self, contents):
+        self.contents = contents
+
+    def open(self, file_info):
+        return io.BytesIO(self.contents[file_info.filename])
+
+
+def test_same_crc_and_size_with_different_content_is_kept():
+    archive = FakeArchive({'a.docx': b'AAAA', 'b.docx': b'BBBB', 'c.docx': b'AAAA'})
+    # Même CRC-32 et même taille dans le répertoire central: seul le contenu les distingue
+    documents = [(archive, SimpleNamespace(filename=name, CRC=42, file_size=4))
+                 for name in ('a.docx', 'b.docx', 'c.docx')]
+
+    assert find_duplicate_members(documents) == {2: 0}
+
+
+def test_replay_duplicates_restores_archive_order():
+    duplicates = {1: 0, 3: 0, 5: 2}
+    processed = [(0, 'A'), (2, 'C'), (4, 'E')]
+
+    assert list(replay_duplicates(iter(processed), duplicates)) == [
+        (0, 'A'), (1, 'A'), (2, 'C'), (3, 'A'), (4, 'E'), (5, 'C')]
@@ -0,0 +1,55 @@
+import io
+import zipfile
+
+from docx import Document
+
+from formats import sniff_file, sniff_format
+from merge_engine import ZipMember
+from utils import ensure_docx, prepare_member
+
+
+def reordered_package(path):
+    """A python-docx package rewritten with a large thumbnail as its first entry"""
+    buffer = io.BytesIO()
+    document = Document()
+    document.add_paragraph('Contenu du document')
+    document.save(buffer)
+    with zipfile.ZipFile(buffer) as source, zipfile.ZipFile(path, 'w', zipfile.ZIP_STORED) as target:
+        target.writestr('docProps/thumbnail.jpeg', bytes(range(256)) * 32)
+        for info in source.infolist():
+            if info.filename != 'docProps/thumbnail.jpeg':
+                target.writestr(info, source.read(info))
+    return str(path)
+
+
+def test_reordered_package_is_recognised(tmp_path):
+    path = reordered_package(tmp_path / 'b.docx')
+    with open(path, 'rb') as f:
+        assert sniff_format(f.read(4096)) == 'zip'
+
+    assert sniff_file(path) == 'ooxml'
+    assert ensure_docx(path, str(tmp_path)) == path
+    assert Document(path).paragraphs[0].text == 'Contenu du document'
+
+
+def test_reordered_member_is_merged_from_the_archive(tmp_path):
+    archive_path = tmp_path / 'upload.zip'
+    with zipfile.ZipFile(archive_path, 'w', zipfile.ZIP_DEFLATED) as archive:
+        archive.write(reordered_package(tmp_path / 'b.docx'), 'dossier/b.docx')
+
+    with zipfile.ZipFile(archive_path) as archive:
+        source, file_format = prepare_member(archive, archive.getinfo('dossier/b.docx'), str(tmp_path / 'out'))
+
+    assert file_format == 'ooxml'
+    assert isinstance(source, ZipMember)
+
+
+def test_other_zip_is_not_renamed_to_doc(tmp_path):
+    path = tmp_path / 'archive.docx'
+    with zipfile.ZipFile(path, 'w') as archive:
+        archive.writestr('notes.txt', 'pas un document Word')
+
+    assert sniff_file(str(path)) == 'zip'
+    ensure_docx(str(path), str(tmp_path / 'out'))
+
+    assert not (tmp_path / 'archive.doc').exists()
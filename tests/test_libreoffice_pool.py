@@ -0,0 +1,107 @@
+import subprocess
+
+import pytest
+
+from libreoffice import LibreOfficePool
+
+
+class FakeInstance:
+    """Stands in for SofficeInstance; convert() runs the next scripted behaviour"""
+
+    def __init__(self, behaviours):
+        self.behaviours = behaviours
+        self.running = False
+        self.starts = 0
+        self.stops = 0
+
+    def start(self):
+        self.running = True
+        self.starts += 1
+
+    def is_healthy(self):
+        return self.running
+
+    def convert(self, input_path, output_path, target_format, timeout):
+        behaviour = self.behaviours.pop(0) if self.behaviours else 'ok'
+        if behaviour == 'hang':
+            raise subprocess.TimeoutExpired('soffice', timeout)
+        if behaviour == 'crash':
+            self.running = False
+            raise subprocess.CalledProcessError(1, 'soffice')
+        with open(output_path, 'w') as f:
+            f.write(target_format)
+        return output_path
+
+    def stop(self):
+        self.running = False
+        self.stops += 1
+
+    def restart(self):
+        self.stop()
+        self.start()
+
+
+def make_pool(*behaviours):
+    instances = []
+
+    def factory():
+        instances.append(FakeInstance(list(behaviours)))
+        return instances[-1]
+
+    return LibreOfficePool(1, factory, timeout=5), instances
+
+
+def test_conversion_starts_instance_on_first_use(tmp_path):
+    pool, instances = make_pool('ok')
+    assert instances[0].starts == 0
+
+    output = pool.convert(str(tmp_path / 'report.docx'), str(tmp_path), 'pdf')
+
+    assert output == str(tmp_path / 'report.pdf')
+    assert (tmp_path / 'report.pdf').read_text() == 'pdf'
+    assert instances[0].starts == 1
+
+
+def test_hung_instance_is_restarted(tmp_path):
+    pool, instances = make_pool('ok', 'hang', 'ok')
+    pool.convert(str(tmp_path / 'a.docx'), str(tmp_path), 'pdf')
+
+    with pytest.raises(subprocess.TimeoutExpired):
+        pool.convert(str(tmp_path / 'b.docx'), str(tmp_path), 'pdf')
+    assert instances[0].stops == 1
+    assert not instances[0].running
+
+    assert pool.convert(str(tmp_path / 'c.docx'), str(tmp_path), 'pdf') == str(tmp_path / 'c.pdf')
+    assert instances[0].starts == 2
+
+
+def test_crashed_instance_is_replaced_by_a_fresh_start(tmp_path):
+    pool, instances = make_pool('crash', 'ok')
+
+    with pytest.raises(subprocess.CalledProcessError):
+        pool.convert(str(tmp_path / 'a.docx'), str(tmp_path), 'pdf')
+    assert instances[0].stops == 1
+
+    assert pool.convert(str(tmp_path / 'b.docx'), str(tmp_path), 'pdf') == str(tmp_path / 'b.pdf')
+    assert instances[0].starts == 2
+
+
+def test_dead_idle_instance_is_restarted_before_conversion(tmp_path):
+    pool, instances = make_pool()
+    pool.convert(str(tmp_path / 'a.docx'), str(tmp_path), 'pdf')
+    # Processus soffice tombé entre deux conversions
+    instances[0].running = False
+
+    pool.convert(str(tmp_path / 'b.docx'), str(tmp_path), 'pdf')
+
+    assert instances[0].stops == 1
+    assert instances[0].starts == 2
+    assert len(instances) == 1
+
+
+def test_shutdown_stops_every_instance():
+    pool = LibreOfficePool(3, lambda: FakeInstance([]))
+
+    pool.shutdown()
+
+    assert all(instance.stops == 1 for instance in pool._instances)
@@ -0,0 +1,113 @@
+import io
+import zipfile
+
+from manifest import check_manifest, manifest_limits, scan_zip
+
+
+def zip_bytes(members, compression=zipfile.ZIP_STORED):
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, 'w', compression) as archive:
+        for name, data in members.items():
+            archive.writestr(name, data)
+    return buffer.getvalue()
+
+
+def write_zip(path, members, compression=zipfile.ZIP_STORED):
+    path.write_bytes(zip_bytes(members, compression))
+    return str(path)
+
+
+def test_counts_documents_of_nested_archives(tmp_path):
+    inner = zip_bytes({'b.docx': b'B' * 100, 'c.doc': b'C' * 50, 'notes.txt': b'x'})
+    path = write_zip(tmp_path / 'upload.zip', {'a.docx': b'A' * 10, 'inner.zip': inner})
+
+    manifest = scan_zip(path)
+
+    assert manifest['file_count'] == 3
+    assert manifest['doc_count'] == 1
+    assert manifest['uncompressed_size'] == 160
+    assert manifest['archive_count'] == 1
+
+
+def test_compressed_nested_archive_and_duplicates(tmp_path):
+    inner = zip_bytes({'copy.docx': b'A' * 10})
+    path = write_zip(tmp_path / 'upload.zip', {'a.docx': b'A' * 10, 'inner.zip': inner}, zipfile.ZIP_DEFLATED)
+
+    manifest = scan_zip(path)
+
+    assert manifest['file_count'] == 2
+    assert manifest['duplicates'] == 1
+
+
+def test_stops_at_nested_max_depth(tmp_path, monkeypatch):
+    level2 = zip_bytes({'deep.docx': b'D'})
+    level1 = zip_bytes({'mid.docx': b'M', 'level2.zip': level2})
+    path = write_zip(tmp_path / 'upload.zip', {'level1.zip': level1})
+
+    monkeypatch.setenv('NESTED_ZIP_MAX_DEPTH', '1')
+    assert scan_zip(path)['file_count'] == 1
+    monkeypatch.setenv('NESTED_ZIP_MAX_DEPTH', '2')
+    assert scan_zip(path)['file_count'] == 2
+
+
+def test_rejects_nested_archive_beyond_size_budget(tmp_path):
+    inner = zip_bytes({'big.docx': b'\0' * 4096})
+    path = write_zip(tmp_path / 'upload.zip', {'a.docx': b'A', 'inner.zip': inner})
+    limits = dict(manifest_limits(), max_uncompressed=1024)
+
+    manifest = scan_zip(path, limits)
+
+    assert manifest['file_count'] == 1
+    assert manifest['uncompressed_size'] > 1024
+    assert check_manifest(manifest, limits)
+
+
+def test_nested_document_bomb_is_caught_by_ratio(tmp_path):
+    inner = zip_bytes({'bomb.docx': b'\0' * (8 * 1024 * 1024)}, zipfile.ZIP_DEFLATED)
+    path = write_zip(tmp_path / 'upload.zip', {'inner.zip': inner})
+
+    manifest = scan_zip(path)
+
+    assert manifest['max_member_ratio'] > manifest_limits()['max_ratio']
+    assert check_manifest(manifest) == "L'archive contient un fichier anormalement compressé et a été refusée."
+
+
+def test_unreadable_nested_archive_is_skipped(tmp_path):
+    path = write_zip(tmp_path / 'upload.zip', {'a.docx': b'A', 'broken.zip': b'not a zip'})
+
+    manifest = scan_zip(path)
+
+    assert manifest['file_count'] == 1
+    assert manifest['archive_count'] == 1
+
+
+def test_highly_compressed_nested_archive_is_not_opened(tmp_path, monkeypatch):
+    import manifest
+
+    opened = []
+    monkeypatch.setattr(manifest, 'open_nested', lambda *args, **kwargs: opened.append(args) or None)
+    inner = zip_bytes({'bomb.docx': b'\0' * (8 * 1024 * 1024)})
+    path = write_zip(tmp_path / 'upload.zip', {'inner.zip': inner}, zipfile.ZIP_DEFLATED)
+
+    manifest_data = scan_zip(path)
+
+    assert opened == []
+    assert check_manifest(manifest_data)
+
+
+def test_compressed_nested_archive_is_streamed(tmp_path, monkeypatch):
+    import manifest
+
+    buffer_sizes = []
+    real_open_nested = manifest.open_nested
+
+    def open_nested(archive, file_info, buffer_size=None):
+        buffer_sizes.append(buffer_size)
+        return real_open_nested(archive, file_info, buffer_size)
+
+    monkeypatch.setattr(manifest, 'open_nested', open_nested)
+    inner = zip_bytes({'a.docx': b'A' * 100})
+    path = write_zip(tmp_path / 'upload.zip', {'inner.zip': inner}, zipfile.ZIP_DEFLATED)
+
+    assert scan_zip(path)['file_count'] == 1
+    assert buffer_sizes == [0]
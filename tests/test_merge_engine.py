@@ -0,0 +1,56 @@
+import io
+import zipfile
+
+from docx import Document
+from docx.shared import Inches
+from PIL import Image
+
+import utils
+
+
+def make_png(seed):
+    image = Image.effect_noise((32, 32), 40 + seed).convert('RGB')
+    buffer = io.BytesIO()
+    image.save(buffer, format='PNG')
+    return buffer.getvalue()
+
+
+def make_document(path, name, images):
+    doc = Document()
+    doc.add_paragraph(f"Début de {name}")
+    for image in images:
+        doc.add_picture(io.BytesIO(image), width=Inches(1))
+    table = doc.add_table(rows=2, cols=2)
+    for row_index, row in enumerate(table.rows):
+        for col_index, cell in enumerate(row.cells):
+            cell.text = f"{name} R{row_index}C{col_index}"
+    doc.add_paragraph(f"Fin de {name}")
+    doc.save(path)
+    return str(path)
+
+
+def test_stream_merge_keeps_order_tables_and_images(tmp_path):
+    logo, photo = make_png(0), make_png(1)
+    # Le logo est présent dans chaque document : un seul média dans le résultat
+    sources = [
+        make_document(tmp_path / 'a.docx', 'a', [logo]),
+        make_document(tmp_path / 'b.docx', 'b', [logo, photo]),
+        make_document(tmp_path / 'c.docx', 'c', [logo]),
+    ]
+    output = str(tmp_path / 'merged.docx')
+
+    assert utils.merge_docx_files(sources, output, None, mode='stream', workers=1) == output
+
+    merged = Document(output)
+    texts = [p.text.rstrip('.') for p in merged.paragraphs if p.text]
+    assert texts == [
+        'a.docx', 'Début de a', 'Fin de a',
+        'b.docx', 'Début de b', 'Fin de b',
+        'c.docx', 'Début de c', 'Fin de c',
+    ]
+    assert [t.cell(1, 1).text for t in merged.tables] == ['a R1C1', 'b R1C1', 'c R1C1']
+    assert len(merged.inline_shapes) == 4
+
+    with zipfile.ZipFile(output) as package:
+        media = [name for name in package.namelist() if name.startswith('word/media/')]
+    assert len(media) == 2
@@ -0,0 +1,77 @@
+from docx import Document
+from PyPDF2 import PdfReader
+from reportlab.pdfbase.pdfmetrics import stringWidth
+
+from corpus import make_long_document, make_report
+from pdf_fallback import BODY_FONT, FONTS, docx_blocks, render_docx_pdf, wrap_text
+
+
+def test_blocks_in_document_order(tmp_path):
+    path = make_report(str(tmp_path / 'report.docx'), 3, paragraphs=2, table_rows=2, table_cols=2)
+
+    blocks = list(docx_blocks(path))
+
+    assert blocks[0] == ('paragraph', 'Compte rendu n°3', 1)
+    assert blocks[1][1].startswith('Paragraphe 0 du compte rendu 3.')
+    assert blocks[-1] == ('table', [['R0C0', 'R0C1'], ['R1C0', 'R1C1']])
+
+
+def test_wrap_text_fits_the_width():
+    text = 'mot ' * 50 + '9' * 200
+
+    lines = wrap_text(text, BODY_FONT, 10, 200)
+
+    assert len(lines) > 2
+    assert all(stringWidth(line, FONTS[BODY_FONT], 10) <= 200 for line in lines)
+    assert ''.join(lines).replace(' ', '') == text.replace(' ', '')
+
+
+def test_long_document_is_paginated(tmp_path):
+    docx_path = make_long_document(str(tmp_path / 'merged.docx'), 5, paragraphs=30)
+    pdf_path = str(tmp_path / 'merged.pdf')
+
+    pages = render_docx_pdf(docx_path, pdf_path)
+
+    reader = PdfReader(pdf_path)
+    assert pages == len(reader.pages) > 5
+    text = ''.join(page.extract_text() for page in reader.pages)
+    assert 'Compte rendu n°4' in text
+    assert 'R9C3' in text
+
+
+def test_page_break_and_empty_document(tmp_path):
+    document = Document()
+    document.add_paragraph('Première page')
+    document.add_page_break()
+    document.add_paragraph('Deuxième page')
+    document.save(str(tmp_path / 'breaks.docx'))
+    Document().save(str(tmp_path / 'empty.docx'))
+
+    assert render_docx_pdf(str(tmp_path / 'breaks.docx'), str(tmp_path / 'breaks.pdf')) == 2
+    reader = PdfReader(str(tmp_path / 'breaks.pdf'))
+    assert 'Deuxième page' in reader.pages[1].extract_text()
+
+    assert render_docx_pdf(str(tmp_path / 'empty.docx'), str(tmp_path / 'empty.pdf')) == 1
+    assert len(PdfReader(str(tmp_path / 'empty.pdf')).pages) == 1
+
+
+def test_blank_paragraphs_do_not_push_content_off_the_page(tmp_path):
+    table = Document()
+    text = Document()
+    for document in (table, text):
+        for _ in range(60):
+            document.add_paragraph('')
+    table.add_table(rows=2, cols=2).cell(1, 1).text = 'Cellule'
+    text.add_paragraph('Texte après les paragraphes vides')
+    table.save(str(tmp_path / 'table.docx'))
+    text.save(str(tmp_path / 'text.docx'))
+
+    assert render_docx_pdf(str(tmp_path / 'table.docx'), str(tmp_path / 'table.pdf')) == 1
+    assert 'Cellule' in PdfReader(str(tmp_path / 'table.pdf')).pages[0].extract_text()
+
+    assert render_docx_pdf(str(tmp_path / 'text.docx'), str(tmp_path / 'text.pdf')) == 1
+    page = PdfReader(str(tmp_path / 'text.pdf')).pages[0]
+    assert 'Texte après les paragraphes vides' in page.extract_text()
+    positions = []
+    page.extract_text(visitor_text=lambda text, cm, tm, font, size: positions.append(tm[5]) if text.strip() else None)
+    assert min(positions) > 0
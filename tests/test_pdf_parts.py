@@ -0,0 +1,56 @@
+import os
+
+from reportlab.pdfgen import canvas
+
+import utils
+
+
+def fake_convert(failing=()):
+    def convert(docx_path, output_dir, target_format, timeout=None):
+        name = os.path.splitext(os.path.basename(docx_path))[0]
+        if name in failing:
+            raise RuntimeError("conversion bloquée")
+        output = os.path.join(output_dir, f"{name}.pdf")
+        pdf = canvas.Canvas(output)
+        pdf.drawString(72, 720, name)
+        pdf.save()
+        return output
+    return convert
+
+
+def make_parts(parts_dir, keys):
+    os.makedirs(parts_dir)
+    parts = []
+    for key in keys:
+        docx_path = os.path.join(parts_dir, f"{key}.docx")
+        open(docx_path, 'w').close()
+        parts.append((f"{key}.docx", key, docx_path))
+    return parts
+
+
+def test_complete_run_keeps_only_the_part_pdfs(tmp_path, monkeypatch):
+    monkeypatch.setattr(utils, 'convert_file', fake_convert())
+    parts_dir = str(tmp_path / 'pdf_parts')
+    parts = make_parts(parts_dir, ['a', 'b'])
+
+    result = utils.render_pdf_parts(parts, parts_dir, str(tmp_path / 'merged.pdf'), None)
+
+    assert result == str(tmp_path / 'merged.pdf')
+    assert sorted(os.listdir(parts_dir)) == ['a.pdf', 'b.pdf']
+
+
+def test_failed_part_removes_the_intermediate_files(tmp_path, monkeypatch):
+    monkeypatch.setattr(utils, 'convert_file', fake_convert(failing=('b',)))
+    parts_dir = str(tmp_path / 'pdf_parts')
+    parts = make_parts(parts_dir, ['a', 'b'])
+
+    assert utils.render_pdf_parts(parts, parts_dir, str(tmp_path / 'merged.pdf'), None) is None
+    assert not os.path.exists(parts_dir)
+
+
+def test_unwritten_part_removes_the_intermediate_files(tmp_path):
+    parts_dir = str(tmp_path / 'pdf_parts')
+    parts = make_parts(parts_dir, ['a']) + [('b.docx', None, None)]
+
+    assert utils.render_pdf_parts(parts, parts_dir, str(tmp_path / 'merged.pdf'), None) is None
+    assert not os.path.exists(parts_dir)
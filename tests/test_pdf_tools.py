@@ -0,0 +1,102 @@
+import os
+
+import pytest
+from PyPDF2 import PdfReader
+from reportlab.pdfgen import canvas
+
+from pdf_tools import concatenate_pdfs, deduplicate_resources, first_page_bytes, optimize_pdf
+
+
+def make_pdf(path, title, pages=1):
+    pdf = canvas.Canvas(str(path))
+    for page in range(pages):
+        pdf.drawString(72, 720, f"{title} - page {page + 1}")
+        pdf.showPage()
+    pdf.save()
+    return str(path)
+
+
+def test_concatenate_in_order_with_bookmarks(tmp_path):
+    parts = [('Rapport A', make_pdf(tmp_path / 'a.pdf', 'A', pages=2)),
+             ('Rapport B', make_pdf(tmp_path / 'b.pdf', 'B')),
+             ('Rapport C', make_pdf(tmp_path / 'c.pdf', 'C', pages=3))]
+    output = str(tmp_path / 'merged.pdf')
+
+    assert concatenate_pdfs(parts, output) == output
+
+    reader = PdfReader(output)
+    assert len(reader.pages) == 6
+    assert [reader.pages[index].extract_text().strip() for index in (0, 2, 3)] == [
+        'A - page 1', 'B - page 1', 'C - page 1']
+    assert [(item.title, reader.get_destination_page_number(item)) for item in reader.outline] == [
+        ('Rapport A', 0), ('Rapport B', 2), ('Rapport C', 3)]
+    assert not os.path.exists(f"{output}.tmp")
+
+
+def make_rich_pdf(path, title, logo):
+    # Police TrueType incorporée et image répétée, comme un en-tête de lettre
+    pdf = canvas.Canvas(str(path))
+    pdf.setFont('Vera', 12)
+    pdf.drawImage(logo, 72, 750, width=64, height=64)
+    pdf.drawString(72, 720, f"Compte rendu {title}")
+    pdf.showPage()
+    pdf.save()
+    return str(path)
+
+
+@pytest.fixture
+def logo(tmp_path):
+    from PIL import Image
+
+    path = str(tmp_path / 'logo.png')
+    Image.effect_noise((128, 128), 64).convert('RGB').save(path)
+    return path
+
+
+def test_shared_fonts_and_images_are_stored_once(tmp_path, logo):
+    from reportlab.pdfbase import pdfmetrics
+    from reportlab.pdfbase.ttfonts import TTFont
+    from PyPDF2 import PdfWriter
+
+    pdfmetrics.registerFont(TTFont('Vera', 'Vera.ttf'))
+    paths = [make_rich_pdf(tmp_path / f'{index}.pdf', 'commun', logo) for index in range(3)]
+
+    resources = PdfReader(paths[0]).pages[0]['/Resources']
+    shared = len(resources['/Font']) + len(resources['/XObject'])
+    writer = PdfWriter()
+    for path in paths:
+        writer.append(path)
+    # Polices et image de chaque document après le premier
+    assert deduplicate_resources(writer) == shared * 2
+
+    plain = str(tmp_path / 'plain.pdf')
+    with open(plain, 'wb') as f:
+        writer_copy = PdfWriter()
+        for path in paths:
+            writer_copy.append(path)
+        writer_copy.write(f)
+    merged = concatenate_pdfs([(str(index), path) for index, path in enumerate(paths)], str(tmp_path / 'merged.pdf'))
+
+    assert os.path.getsize(merged) < os.path.getsize(plain) * 0.6
+    reader = PdfReader(merged)
+    assert all(page.extract_text().strip() == 'Compte rendu commun' for page in reader.pages)
+
+
+def test_optimize_disabled_only_describes_the_file(tmp_path, monkeypatch):
+    monkeypatch.setenv('PDF_OPTIMIZE', '0')
+    path = make_pdf(tmp_path / 'a.pdf', 'A')
+    size = os.path.getsize(path)
+
+    stats = optimize_pdf(path)
+
+    assert os.path.getsize(path) == size
+    assert stats['original_size'] == stats['size'] == stats['first_page_bytes'] == size
+    assert not stats['linearized']
+
+
+def test_first_page_bytes_of_linearized_file(tmp_path):
+    path = tmp_path / 'linearized.pdf'
+    path.write_bytes(b'%PDF-1.7\n1 0 obj\n<< /Linearized 1 /L 90000 /H [ 600 150 ] /O 4 /E 12345 /N 3 /T 89000 >>\nendobj\n'
+                     + b'\0' * 1000)
+
+    assert first_page_bytes(str(path)) == (True, 12345)
@@ -0,0 +1,68 @@
+import random
+import threading
+import time
+
+from pipeline import run_pipeline
+
+
+def jittered(function):
+    def run(value):
+        # Durées variables: les éléments sortent des étapes dans le désordre
+        time.sleep(random.uniform(0, 0.005))
+        return function(value)
+    return run
+
+
+def test_results_keep_input_order_under_parallel_workers():
+    stages = [(jittered(lambda value: value * 2), 4), (jittered(lambda value: value + 1), 3)]
+
+    results = list(run_pipeline(range(200), stages, queue_size=4))
+
+    assert [index for index, _, _ in results] == list(range(200))
+    assert [value for _, value, _ in results] == [index * 2 + 1 for index in range(200)]
+    assert all(error is None for _, _, error in results)
+
+
+def test_failed_item_skips_later_stages():
+    calls = []
+
+    def first(value):
+        if value == 3:
+            raise ValueError("document illisible")
+        return value
+
+    def second(value):
+        calls.append(value)
+        return value
+
+    results = list(run_pipeline(range(6), [(first, 2), (second, 2)]))
+
+    index, value, error = results[3]
+    assert (index, value) == (3, None)
+    assert isinstance(error, ValueError)
+    assert sorted(calls) == [0, 1, 2, 4, 5]
+    assert [value for _, value, _ in results if value is not None] == [0, 1, 2, 4, 5]
+
+
+def test_in_flight_items_are_bounded():
+    in_flight = []
+    lock = threading.Lock()
+    started = [0]
+
+    def stage(value):
+        with lock:
+            started[0] += 1
+        return value
+
+    results = run_pipeline(range(1000), [(stage, 2)], queue_size=2)
+    for index, _, _ in results:
+        with lock:
+            in_flight.append(started[0] - index)
+        time.sleep(0.001)
+        if index == 50:
+            break
+    results.close()
+
+    # Fenêtre de queue_size * (étapes + 1) éléments, plus celui qui vient de sortir
+    assert max(in_flight) <= 2 * 2 + 1
+    assert started[0] < 1000
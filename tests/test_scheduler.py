@@ -0,0 +1,108 @@
+import threading
+
+import pytest
+
+from scheduler import JobScheduler, QueueFullError
+
+
+@pytest.fixture
+def gate():
+    # Les travaux soumis restent bloqués tant que l'événement n'est pas levé
+    event = threading.Event()
+    yield event
+    event.set()
+
+
+def blocked_job(gate, started=None):
+    def run():
+        if started is not None:
+            started.set()
+        gate.wait(5)
+    return run
+
+
+def test_admission_limits(gate):
+    scheduler = JobScheduler(workers=2, max_pending=1)
+
+    assert scheduler.submit('a', blocked_job(gate)) == 0
+    assert scheduler.submit('b', blocked_job(gate)) == 0
+    assert scheduler.submit('c', blocked_job(gate)) == 1
+    with pytest.raises(QueueFullError):
+        scheduler.submit('d', blocked_job(gate))
+    with pytest.raises(ValueError):
+        scheduler.submit('c', blocked_job(gate))
+    assert scheduler.position('c') == 1
+    assert scheduler.position('d') is None
+
+
+def test_no_queue_rejects_when_busy(gate):
+    scheduler = JobScheduler(workers=1, max_pending=0)
+    started = threading.Event()
+
+    scheduler.submit('a', blocked_job(gate, started))
+    assert started.wait(5)
+    assert scheduler.position('a') == 0
+    with pytest.raises(QueueFullError):
+        scheduler.submit('b', blocked_job(gate))
+
+
+def test_queued_job_runs_once_a_worker_is_free(gate):
+    scheduler = JobScheduler(workers=1, max_pending=2)
+    done = threading.Event()
+
+    scheduler.submit('a', blocked_job(gate))
+    assert scheduler.submit('b', done.set) == 1
+    assert not done.wait(0.2)
+
+    gate.set()
+    assert done.wait(5)
+
+
+def test_on_queued_runs_outside_the_scheduler_lock(gate):
+    scheduler = JobScheduler(workers=1, max_pending=2)
+    scheduler.submit('a', blocked_job(gate))
+    seen = []
+
+    def on_queued(position):
+        # Un autre thread (requête /status) doit pouvoir consulter la file pendant l'appel
+        reader = threading.Thread(target=lambda: seen.append(scheduler.position('b')))
+        reader.start()
+        reader.join(5)
+        seen.append(position)
+
+    assert scheduler.submit('b', lambda: None, on_queued=on_queued) == 1
+    assert seen == [1, 1]
+
+
+def test_failed_on_queued_takes_job_out_of_the_queue(gate):
+    scheduler = JobScheduler(workers=1, max_pending=2)
+    scheduler.submit('a', blocked_job(gate))
+    ran = threading.Event()
+
+    def on_queued(position):
+        raise RuntimeError("base indisponible")
+
+    with pytest.raises(RuntimeError):
+        scheduler.submit('b', ran.set, on_queued=on_queued)
+    assert scheduler.position('b') is None
+
+    gate.set()
+    assert not ran.wait(0.2)
+
+
+def test_queued_job_waits_for_on_queued(gate):
+    scheduler = JobScheduler(workers=1, max_pending=2)
+    scheduler.submit('a', blocked_job(gate))
+    order = []
+    done = threading.Event()
+
+    def on_queued(position):
+        # Le processus se libère pendant l'écriture du statut
+        gate.set()
+        done.wait(0.2)
+        order.append('queued')
+
+    scheduler.submit('b', lambda: (order.append('run'), done.set()), on_queued=on_queued)
+
+    assert done.wait(5)
+    assert order == ['queued', 'run']
@@ -0,0 +1,103 @@
+"""
+DocxFilesMerger - Application de traitement et fusion de documents.
+Développé par MOA Digital Agency LLC (https://myoneart.com)
+Email: moa@myoneart.com
+Copyright © 2025 MOA Digital Agency LLC. Développé par Aisance Kalonji. Tous droits réservés.
+"""
+
+import re
+import io
+import threading
+import subprocess
+
+from capabilities import tool_path
+
+# Séparateurs de cellules des tableaux rendus en texte
+_ANTIWORD_CELL_SPLIT = re.compile(r'[|+]')
+_CATDOC_CELL_SPLIT = re.compile(r' {2,}|\t+')
+
+
+def stream_lines(cmd, timeout):
+    """
+    Run a command and yield its stdout line by line as it is produced
+
+    The process is killed when it runs longer than timeout seconds or when
+    the consumer stops early. Raises TimeoutExpired or CalledProcessError
+    once the output is exhausted, like subprocess.run(check=True).
+    """
+    process = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+    timed_out = threading.Event()
+
+    def kill():
+        timed_out.set()
+        process.kill()
+
+    timer = threading.Timer(timeout, kill)
+    timer.start()
+    finished = False
+    try:
+        for line in io.TextIOWrapper(process.stdout, encoding='utf-8', errors='replace'):
+            yield line
+        finished = True
+    finally:
+        if not finished:
+            # Lecture interrompue par le consommateur
+            process.kill()
+        process.stdout.close()
+        returncode = process.wait()
+        timer.cancel()
+
+    if timed_out.is_set():
+        raise subprocess.TimeoutExpired(cmd, timeout)
+    if returncode != 0:
+        raise subprocess.CalledProcessError(returncode, cmd)
+
+
+def _antiword_row(line):
+    # Détection heuristique de tableau (lignes avec plusieurs | ou +)
+    if line.count('|') > 2 or line.count('+') > 2:
+        return [cell.strip() for cell in _ANTIWORD_CELL_SPLIT.split(line) if cell.strip()]
+    return None
+
+
+def _catdoc_row(line):
+    # Détection heuristique de tableau (colonnes séparées par des espaces ou tabulations)
+    if line.count('  ') >= 3 or line.count('\t') >= 3:
+        return [cell.strip() for cell in _CATDOC_CELL_SPLIT.split(line) if cell.strip()]
+    return None
+
+
+def text_blocks(lines, table_row=None):
+    """
+    Turn lines of text into ('paragraph', text) and ('table', rows) blocks in a single pass
+
+    table_row(line) returns the cells of a table line, or None for a plain
+    line; consecutive table lines form one table.
+    """
+    rows = []
+    for line in lines:
+        line = line.strip()
+        cells = table_row(line) if table_row and line else None
+        if cells is not None:
+            if cells:
+                rows.append(cells)
+            continue
+
+        if rows:
+            yield ('table', rows)
+            rows = []
+        if line:
+            yield ('paragraph', line)
+
+    if rows:
+        yield ('table', rows)
+
+
+def antiword_blocks(doc_path, timeout=30):
+    """Blocks of a .doc file read from antiword's output"""
+    return text_blocks(stream_lines([tool_path('antiword'), doc_path], timeout), _antiword_row)
+
+
+def catdoc_blocks(doc_path, timeout=30):
+    """Blocks of a .doc file read from catdoc's output"""
+    return text_blocks(stream_lines([tool_path('catdoc'), doc_path], timeout), _catdoc_row)
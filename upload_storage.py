@@ -0,0 +1,90 @@
+"""
+DocxFilesMerger - Application de traitement et fusion de documents.
+Développé par MOA Digital Agency LLC (https://myoneart.com)
+Email: moa@myoneart.com
+Copyright © 2025 MOA Digital Agency LLC. Développé par Aisance Kalonji. Tous droits réservés.
+"""
+
+import os
+import time
+import hashlib
+import tempfile
+
+from flask import Request
+
+# Taille des blocs lus dans le corps de la requête et du tampon d'écriture
+WRITE_BLOCK = 1024 * 1024
+
+
+class HashingWriter:
+    """
+    File written sequentially to its final location while its SHA-256 is computed
+
+    Also readable and seekable, as Werkzeug expects from the stream of an
+    uploaded file.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.size = 0
+        self._digest = hashlib.sha256()
+        self._file = open(path, 'w+b', buffering=WRITE_BLOCK)
+
+    def write(self, data):
+        self._digest.update(data)
+        self.size += len(data)
+        return self._file.write(data)
+
+    def hexdigest(self):
+        return self._digest.hexdigest()
+
+    def __getattr__(self, name):
+        # read, readline, seek, tell, flush, close... du fichier sous-jacent
+        return getattr(self._file, name)
+
+
+def write_stream(stream, path):
+    """
+    Copy a binary stream (e.g. a request body) to path in large blocks
+
+    Returns a dict with the size, SHA-256 and throughput (bytes per second)
+    of the copy, as recorded on the job (see upload_stats).
+    """
+    start = time.perf_counter()
+    writer = HashingWriter(path)
+    try:
+        for block in iter(lambda: stream.read(WRITE_BLOCK), b''):
+            writer.write(block)
+    finally:
+        writer.close()
+    return upload_stats(writer, time.perf_counter() - start)
+
+
+def upload_stats(writer, elapsed):
+    """Size, SHA-256 and bytes per second of an upload written through a HashingWriter"""
+    return {
+        'size': writer.size,
+        'sha256': writer.hexdigest(),
+        'rate': round(writer.size / elapsed) if elapsed > 0 else None,
+    }
+
+
+class UploadRequest(Request):
+    """
+    Flask request whose uploaded files are written straight into upload_dir
+
+    Set upload_dir before request.files is first read: each file part is then
+    streamed, and hashed, into a temporary file of that folder instead of a
+    spooled temporary file elsewhere, so that it only has to be renamed to
+    its final name.
+    """
+
+    upload_dir = None
+
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        if self.upload_dir is None:
+            return super()._get_file_stream(total_content_length, content_type, filename, content_length)
+
+        fd, path = tempfile.mkstemp(dir=self.upload_dir, suffix='.part')
+        os.close(fd)
+        return HashingWriter(path)
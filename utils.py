@@ -17,6 +17,9 @@ from pathlib import Path
 import subprocess
 import sys
 import tempfile
+import hashlib
+import queue
+from concurrent.futures import ThreadPoolExecutor, Future
 
 # Import des bibliothèques de traitement de documents
 try:
@@ -27,6 +30,20 @@ try:
 except ImportError:
     print("Bibliothèque python-docx non installée. Certaines fonctionnalités peuvent ne pas fonctionner correctement.")
 
+from pipeline import run_pipeline
+from archives import list_doc_members, archive_documents, close_archives, MemberExtractor
+from manifest import manifest_limits
+from libreoffice import get_libreoffice_pool, batch_convert, batch_size, conversion_workers, run_soffice, convert_file
+from capabilities import tool_path, has_tool
+from conversion_cache import cached_conversion_key
+from formats import SNIFF_SIZE, sniff_format, sniff_file, resolve_zip_format, conversion_route
+from doc_reader import read_doc_file
+from text_extract import text_blocks, antiword_blocks, catdoc_blocks
+from merge_engine import (StreamingDocxWriter, CopyMergeTarget, text_fragment, fragment_elements,
+                          append_body_elements, transplant_table, merge_workers, parallel_fragments,
+                          document_relater, ZipMember, open_source, source_name)
+from pdf_tools import PARTS_DIR, pdf_mode, pdf_part_timeout, part_key, concatenate_pdfs, optimize_pdf
+
 def save_status(status_dir, status_data):
     """Save processing status to a JSON file"""
     if not status_dir:
@@ -41,296 +58,547 @@ def save_status(status_dir, status_data):
     except Exception as e:
         print(f"Erreur lors de la sauvegarde du statut: {str(e)}")
 
-def extract_doc_files(zip_path, extract_dir):
-    """Extract all .doc and .docx files from a zip file"""
+# Politiques de traitement des documents présents plusieurs fois dans l'archive
+DUPLICATE_POLICIES = ('skip', 'once', 'all')
+
+def duplicate_policy(policy=None):
+    """
+    How identical members of an archive are handled
+
+    - 'skip': later copies are left out (extracted, converted and merged once)
+    - 'once': the document is extracted and converted once, then merged again
+      at the position of each copy
+    - 'all': no detection, every copy is processed
+    The default policy is read from the DUPLICATE_POLICY environment variable.
+    """
+    policy = (policy or os.environ.get('DUPLICATE_POLICY', 'skip')).lower()
+    if policy not in DUPLICATE_POLICIES:
+        raise ValueError(f"Politique de doublons inconnue: {policy}")
+    return policy
+
+def member_sha256(zip_ref, file_info):
+    """SHA-256 of the uncompressed content of a zip member"""
+    digest = hashlib.sha256()
+    with zip_ref.open(file_info) as source:
+        for chunk in iter(lambda: source.read(1024 * 1024), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def find_duplicate_members(documents):
+    """
+    Map the index of each duplicate document to the index of its first copy
+
+    documents are (archive, file_info) pairs (see archives.archive_documents).
+    Candidates are found from the CRC-32 and size recorded in the central
+    directories; only documents sharing both are read, and they are reported
+    as duplicates once their contents hash the same.
+    """
+    candidates = {}
+    for index, (_, file_info) in enumerate(documents):
+        candidates.setdefault((file_info.CRC, file_info.file_size), []).append(index)
+    
+    duplicates = {}
+    for indexes in candidates.values():
+        if len(indexes) < 2:
+            continue
+        originals = {}
+        for index in indexes:
+            digest = member_sha256(*documents[index])
+            if digest in originals:
+                duplicates[index] = originals[digest]
+            else:
+                originals[digest] = index
+    
+    return duplicates
+
+def replay_duplicates(results, duplicates):
+    """
+    Insert results again at the positions of duplicate members
+
+    results yields (position, result) for the members that were processed,
+    in archive order; duplicates maps the position of each copy to the
+    position of its original (see find_duplicate_members). The original
+    always comes first in the archive, so its result is known by the time a
+    copy is reached.
+    """
+    copies = sorted(duplicates)
+    originals = set(duplicates.values())
+    saved = {}
+    next_copy = 0
+    
+    for position, result in results:
+        while next_copy < len(copies) and copies[next_copy] < position:
+            yield copies[next_copy], saved.get(duplicates[copies[next_copy]])
+            next_copy += 1
+        if position in originals:
+            saved[position] = result
+        yield position, result
+    
+    for copy in copies[next_copy:]:
+        yield copy, saved.get(duplicates[copy])
+
+# Verrou protégeant le choix des noms de fichiers extraits
+_claim_lock = threading.Lock()
+
+def claim_path(directory, filename):
+    """
+    Reserve a path for filename in directory without overwriting another file
+
+    Members with the same name in different folders of the archive get a
+    numbered suffix. A stem is only reused when neither its .doc nor its
+    .docx variant exists, so converting a .doc never overwrites another
+    extracted document.
+    """
+    stem, ext = os.path.splitext(filename)
+    candidate = stem
+    with _claim_lock:
+        suffix = 0
+        while any(os.path.exists(os.path.join(directory, candidate + variant)) for variant in (ext, '.doc', '.docx')):
+            suffix += 1
+            candidate = f"{stem}_{suffix}"
+        path = os.path.join(directory, candidate + ext)
+        # Créer le fichier pour le réserver avant de relâcher le verrou
+        open(path, 'wb').close()
+    return path
+
+def extract_member(zip_ref, file_info, extract_dir):
+    """
+    Extract a single member of an open zip file
+
+    Returns (path, file_format); the format is sniffed from the first bytes
+    of the member as they are extracted (see formats.sniff_format).
+    """
+    # Extraire uniquement le nom du fichier sans les dossiers, avec un
+    # suffixe si un autre document porte déjà ce nom
+    filename = os.path.basename(file_info.filename)
+    dest_path = claim_path(extract_dir, filename)
+    
+    # Extraire le fichier en identifiant son format au passage
+    with zip_ref.open(file_info) as source, open(dest_path, 'wb') as dest:
+        header = source.read(SNIFF_SIZE)
+        dest.write(header)
+        shutil.copyfileobj(source, dest)
+    
+    return dest_path, resolve_zip_format(sniff_format(header), dest_path)
+
+def sniff_member(zip_ref, file_info):
+    """Identify the format of a zip member from its first bytes, without extracting it"""
+    with zip_ref.open(file_info) as source:
+        return resolve_zip_format(sniff_format(source.read(SNIFF_SIZE)), source)
+
+def prepare_member(zip_ref, file_info, extract_dir):
+    """
+    Return (source, file_format) for a zip member in the processing pipeline
+
+    .docx members that really are Word 2007+ packages are merged straight
+    from the archive (see merge_engine.ZipMember); the others are extracted
+    to extract_dir for conversion.
+    """
+    if file_info.filename.lower().endswith('.docx'):
+        file_format = sniff_member(zip_ref, file_info)
+        if file_format == 'ooxml':
+            return ZipMember(zip_ref, file_info), file_format
+    return extract_member(zip_ref, file_info, extract_dir)
+
+def extract_doc_files(zip_path, extract_dir, policy=None, workers=None, progress=None):
+    """
+    Extract all .doc and .docx files from a zip file and the archives nested in it
+
+    Identical members are handled according to the duplicate policy (see
+    duplicate_policy): with 'once', the path of the original is returned
+    again at the position of each copy.
+    
+    Members are extracted by several threads (see archives.MemberExtractor
+    and EXTRACT_WORKERS); progress(done, file_info) is called as each one
+    is written.
+    """
+    policy = duplicate_policy(policy)
     # Créer le dossier d'extraction s'il n'existe pas
     os.makedirs(extract_dir, exist_ok=True)
     
-    # Liste pour stocker les chemins vers les fichiers extraits
-    extracted_files = []
-    
-    # Ouvrir le fichier ZIP
+    # Ouvrir le fichier ZIP et extraire les fichiers dans l'ordre de l'archive
     with zipfile.ZipFile(zip_path, 'r') as zip_ref:
-        # Parcourir tous les fichiers dans le ZIP
-        for file_info in zip_ref.infolist():
-            # Ignorer les dossiers
-            if file_info.filename.endswith('/'):
-                continue
-            
-            # Vérifier si le fichier est un .doc ou .docx
-            if file_info.filename.lower().endswith(('.doc', '.docx')):
-                # Extraire uniquement le nom du fichier sans les dossiers
-                filename = os.path.basename(file_info.filename)
-                # Créer un chemin de destination
-                dest_path = os.path.join(extract_dir, filename)
-                
-                # Extraire le fichier
-                with zip_ref.open(file_info) as source, open(dest_path, 'wb') as dest:
-                    shutil.copyfileobj(source, dest)
-                
-                # Ajouter le chemin à la liste des fichiers extraits
-                extracted_files.append(dest_path)
-    
-    return extracted_files
+        documents = archive_documents(zip_ref, max_bytes=manifest_limits()['max_uncompressed'])
+        extractor = MemberExtractor(workers, progress)
+        try:
+            duplicates = find_duplicate_members(documents) if policy != 'all' else {}
+            
+            positions = [index for index in range(len(documents)) if index not in duplicates]
+            paths = extractor.map(lambda archive, file_info: extract_member(archive, file_info, extract_dir)[0],
+                                  [documents[index] for index in positions])
+            extracted = zip(positions, paths)
+            if policy == 'once':
+                extracted = replay_duplicates(extracted, duplicates)
+            return [path for _, path in extracted]
+        finally:
+            extractor.close()
+            close_archives(documents)
 
-def convert_doc_to_docx(doc_path, output_dir):
+def convert_doc_to_docx(doc_path, output_dir, use_cache=True, file_format=None):
     """
     Convert a .doc file to .docx format
     
-    This function tries multiple methods to convert .doc to .docx:
+    The file is identified from its header bytes (see formats.sniff_format,
+    or pass file_format when it is already known) and only the methods that
+    can handle that format are tried:
+    0. python-docx direct loading (.docx packages saved with a .doc name)
     1. LibreOffice conversion (if available) - Meilleure option pour préserver la mise en forme
-    2. python-docx direct loading (works for some .docx disguised as .doc)
+    2. Built-in Word 97-2003 reader (text and tables, no subprocess)
     3. Antiword/catdoc for extracting text content (for old .doc files)
-    4. Creating a placeholder document if all else fails
+    4. Plain text read directly (text files saved with a .doc name)
+    5. Creating a placeholder document if all else fails
+    
+    Returns the path of the converted .docx for methods 0 and 1; the text
+    based methods (2 to 5) return a fragment (see merge_engine.text_fragment)
+    that merge_docx_files appends without going through a .docx file.
+    
+    LibreOffice results are cached by content (see conversion_cache); pass
+    use_cache=False when the cache has already been consulted for this file.
     """
     import subprocess
     import os
     from docx import Document
-    import mimetypes
     
     filename = os.path.basename(doc_path)
     name_without_ext = os.path.splitext(filename)[0]
     docx_path = os.path.join(output_dir, f"{name_without_ext}.docx")
     
-    # Méthode 1: Utiliser LibreOffice pour la conversion (préserve tableaux et mise en forme)
-    try:
-        # Chemin complet vers LibreOffice (plusieurs possibilités)
-        libreoffice_paths = [
-            'libreoffice',
-            '/nix/store/i0x2skvhs1wbr5vffhhc53kd9jg2bp5q-libreoffice-7.6.4/bin/libreoffice', 
-            '/usr/bin/libreoffice',
-            '/usr/local/bin/libreoffice',
-            '/opt/libreoffice/program/soffice'
-        ]
-        
-        libreoffice_cmd = None
-        for path in libreoffice_paths:
-            try:
-                subprocess.run([path, '--version'], stdout=subprocess.PIPE, stderr=subprocess.PIPE, check=False)
-                libreoffice_cmd = path
-                break
-            except (FileNotFoundError, subprocess.SubprocessError):
-                continue
-        
-        if libreoffice_cmd:
-            cmd = [
-                libreoffice_cmd, '--headless', '--convert-to', 'docx', 
-                '--outdir', output_dir, doc_path
-            ]
-            subprocess.run(cmd, check=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE, timeout=60)
-            
-            if os.path.exists(docx_path):
-                print(f"Conversion réussie de {doc_path} en utilisant LibreOffice")
-                return docx_path
-        else:
-            print("LibreOffice non trouvé dans les chemins standards")
-            
-    except (subprocess.SubprocessError, FileNotFoundError, subprocess.TimeoutExpired) as e:
-        print(f"Échec de la conversion via LibreOffice: {str(e)}")
+    # Le format réel (octets de tête) détermine les méthodes à essayer
+    if file_format is None:
+        file_format = sniff_file(doc_path)
+    route = conversion_route(file_format)
     
-    # Méthode 2: Essayer d'ouvrir directement avec python-docx
-    # Cela fonctionne pour certains .docx renommés en .doc
-    try:
-        # Vérifier le type MIME pour s'assurer que c'est un document Word
-        mime_type, _ = mimetypes.guess_type(doc_path)
-        if mime_type in ['application/msword', 'application/vnd.openxmlformats-officedocument.wordprocessingml.document']:
+    # Méthode 0: Paquet .docx renommé en .doc, ouvert directement avec python-docx
+    if 'docx' in route:
+        try:
             doc = Document(doc_path)
             doc.save(docx_path)
             print(f"Conversion directe réussie pour {doc_path}")
             return docx_path
-        else:
-            raise ValueError(f"file '{doc_path}' is not a Word file, content type is '{mime_type}'")
-            
-    except Exception as e:
-        print(f"Échec de la conversion directe de {doc_path}: {str(e)}")
+        except Exception as e:
+            print(f"Échec de la conversion directe de {doc_path}: {str(e)}")
     
-    # Méthode 3: Utiliser antiword pour extraire le texte (pour les vieux .doc)
-    try:
-        # Créer un fichier texte temporaire
-        temp_txt = os.path.join(output_dir, f"{name_without_ext}.txt")
-        
-        cmd = ['antiword', doc_path]
-        with open(temp_txt, 'w') as f:
-            subprocess.run(cmd, stdout=f, stderr=subprocess.PIPE, check=True, timeout=30)
-        
-        # Créer un nouveau document DOCX à partir du texte extrait
-        if os.path.exists(temp_txt) and os.path.getsize(temp_txt) > 0:
-            doc = Document()
-            
-            # Ajouter le titre avec le nom du fichier
-            doc.add_heading(f"Document: {filename}", level=1)
+    # Conversion déjà effectuée pour un fichier de même contenu
+    cache, cache_key = cached_conversion_key(doc_path) if use_cache and 'libreoffice' in route else (None, None)
+    if cache and cache.fetch(cache_key, docx_path):
+        print(f"Conversion de {doc_path} servie par le cache")
+        return docx_path
+    
+    # Méthode 1: Utiliser LibreOffice pour la conversion (préserve tableaux et mise en forme)
+    if 'libreoffice' in route:
+        try:
+            # Instances LibreOffice résidentes si le pool est disponible
+            pool = get_libreoffice_pool()
+            if pool:
+                pool.convert(doc_path, output_dir, 'docx', timeout=60)
             
-            # Lire le contenu du fichier texte et tenter de préserver les tableaux
-            table_rows = []
-            in_table = False
+                if os.path.exists(docx_path):
+                    print(f"Conversion réussie de {doc_path} en utilisant le pool LibreOffice")
+                    if cache:
+                        cache.store(cache_key, docx_path)
+                    return docx_path
+            else:
+                libreoffice_cmd = tool_path('libreoffice')
             
-            with open(temp_txt, 'r') as f:
-                for line in f:
-                    line = line.strip()
-                    
-                    # Détection heuristique de tableau (lignes avec plusieurs | ou +)
-                    if line and ('|' in line or '+' in line) and (line.count('|') > 2 or line.count('+') > 2):
-                        if not in_table:
-                            in_table = True
-                            table_rows = []
-                        
-                        # Supprimer les caractères de bordure et récupérer les cellules
-                        cells = [cell.strip() for cell in line.replace('+', '|').split('|') if cell.strip()]
-                        if cells:
-                            table_rows.append(cells)
-                    else:
-                        # Si nous sortions d'un tableau, créer le tableau dans le document
-                        if in_table and table_rows:
-                            table = doc.add_table(rows=len(table_rows), cols=max(len(row) for row in table_rows))
-                            table.style = 'Table Grid'
-                            
-                            for i, row_data in enumerate(table_rows):
-                                for j, cell_text in enumerate(row_data):
-                                    if j < table.columns.length:  # Éviter l'index out of range
-                                        table.cell(i, j).text = cell_text
-                            
-                            in_table = False
-                            table_rows = []
-                        
-                        # Ajouter la ligne comme paragraphe si elle n'est pas vide
-                        if line:
-                            doc.add_paragraph(line)
-            
-            # Vérifier s'il reste un tableau à ajouter
-            if in_table and table_rows:
-                table = doc.add_table(rows=len(table_rows), cols=max(len(row) for row in table_rows))
-                table.style = 'Table Grid'
+                if libreoffice_cmd:
+                    # Profil LibreOffice dédié pour pouvoir convertir en parallèle
+                    run_soffice(libreoffice_cmd, [
+                        '--headless', '--convert-to', 'docx', 
+                        '--outdir', output_dir, doc_path
+                    ], timeout=60)
                 
-                for i, row_data in enumerate(table_rows):
-                    for j, cell_text in enumerate(row_data):
-                        if j < table.columns.length:
-                            table.cell(i, j).text = cell_text
+                    if os.path.exists(docx_path):
+                        print(f"Conversion réussie de {doc_path} en utilisant LibreOffice")
+                        if cache:
+                            cache.store(cache_key, docx_path)
+                        return docx_path
+                else:
+                    print("LibreOffice non trouvé dans les chemins standards")
             
-            # Sauvegarder le document
-            doc.save(docx_path)
-            
-            # Supprimer le fichier texte temporaire
-            os.remove(temp_txt)
-            
-            print(f"Conversion réussie de {doc_path} en utilisant antiword avec extraction de tableaux")
-            return docx_path
+        except (subprocess.SubprocessError, FileNotFoundError, subprocess.TimeoutExpired, RuntimeError) as e:
+            print(f"Échec de la conversion via LibreOffice: {str(e)}")
     
-    except (subprocess.SubprocessError, FileNotFoundError, subprocess.TimeoutExpired) as e:
-        print(f"Échec de la conversion via antiword: {str(e)}")
+    # Les méthodes suivantes produisent un fragment (voir merge_engine.text_fragment)
+    # fusionné directement, sans fichier .docx intermédiaire
+    title = f"Document: {filename}"
+    
+    # Méthode 2b: Lecteur .doc intégré (table des pièces Word 97-2003), sans
+    # sous-processus ni fichier texte intermédiaire
+    if 'doc_reader' in route:
+        try:
+            fragment = text_fragment(docx_path, title, read_doc_file(doc_path))
+            if fragment:
+                print(f"Conversion réussie de {doc_path} avec le lecteur .doc intégré")
+                return fragment
         
-    # Méthode 3b: Utiliser catdoc comme alternative à antiword
-    try:
-        # Créer un fichier texte temporaire
-        temp_txt = os.path.join(output_dir, f"{name_without_ext}_catdoc.txt")
+        except Exception as e:
+            print(f"Échec du lecteur .doc intégré pour {doc_path}: {str(e)}")
+    
+    # Méthode 3: Utiliser antiword pour extraire le texte (pour les vieux .doc),
+    # sortie lue au fil de l'eau avec détection des tableaux
+    if 'antiword' in route:
+        try:
+            if not has_tool('antiword'):
+                raise FileNotFoundError("antiword non disponible")
+            fragment = text_fragment(docx_path, title, antiword_blocks(doc_path))
+            if fragment:
+                print(f"Conversion réussie de {doc_path} en utilisant antiword avec extraction de tableaux")
+                return fragment
         
-        cmd = ['catdoc', doc_path]
-        with open(temp_txt, 'w') as f:
-            subprocess.run(cmd, stdout=f, stderr=subprocess.PIPE, check=True, timeout=30)
+        except (subprocess.SubprocessError, FileNotFoundError, subprocess.TimeoutExpired) as e:
+            print(f"Échec de la conversion via antiword: {str(e)}")
         
-        # Créer un nouveau document DOCX à partir du texte extrait - tentative de préservation des tableaux
-        if os.path.exists(temp_txt) and os.path.getsize(temp_txt) > 0:
-            doc = Document()
-            
-            # Ajouter le titre avec le nom du fichier
-            doc.add_heading(f"Document: {filename}", level=1)
-            
-            # Variables pour la détection des tableaux
-            table_rows = []
-            in_table = False
-            
-            with open(temp_txt, 'r') as f:
-                for line in f:
-                    line = line.strip()
-                    
-                    # Détection heuristique de tableau (lignes structurées avec espaces réguliers)
-                    if line and ('  ' in line or '\t' in line):
-                        # Heuristique simple: si la ligne contient plusieurs espaces consécutifs
-                        # et a une structure similaire aux lignes adjacentes, c'est probablement un tableau
-                        if line.count('  ') >= 3 or line.count('\t') >= 3:
-                            if not in_table:
-                                in_table = True
-                                table_rows = []
-                            
-                            # Diviser la ligne sur deux espaces ou plus pour obtenir les cellules
-                            import re
-                            cells = [cell.strip() for cell in re.split(r'  +|\t+', line) if cell.strip()]
-                            if cells:
-                                table_rows.append(cells)
-                            continue
-                    
-                    # Si nous n'avons pas continué, nous ne sommes plus dans un tableau
-                    if in_table:
-                        if table_rows:
-                            # Créer un tableau avec les lignes collectées
-                            table = doc.add_table(rows=len(table_rows), cols=max(len(row) for row in table_rows))
-                            table.style = 'Table Grid'
-                            
-                            for i, row_data in enumerate(table_rows):
-                                for j, cell_text in enumerate(row_data):
-                                    if j < table.columns.length:
-                                        table.cell(i, j).text = cell_text
-                        
-                        in_table = False
-                        table_rows = []
-                    
-                    # Ajouter la ligne comme paragraphe si elle n'est pas vide
-                    if line:
-                        doc.add_paragraph(line)
-            
-            # Vérifier s'il reste un tableau à ajouter
-            if in_table and table_rows:
-                table = doc.add_table(rows=len(table_rows), cols=max(len(row) for row in table_rows))
-                table.style = 'Table Grid'
-                
-                for i, row_data in enumerate(table_rows):
-                    for j, cell_text in enumerate(row_data):
-                        if j < table.columns.length:
-                            table.cell(i, j).text = cell_text
-            
-            # Sauvegarder le document
-            doc.save(docx_path)
-            
-            # Supprimer le fichier texte temporaire
-            os.remove(temp_txt)
-            
-            print(f"Conversion réussie de {doc_path} en utilisant catdoc avec extraction de tableaux")
-            return docx_path
+    # Méthode 3b: Utiliser catdoc comme alternative à antiword
+    if 'catdoc' in route:
+        try:
+            if not has_tool('catdoc'):
+                raise FileNotFoundError("catdoc non disponible")
+            fragment = text_fragment(docx_path, title, catdoc_blocks(doc_path))
+            if fragment:
+                print(f"Conversion réussie de {doc_path} en utilisant catdoc avec extraction de tableaux")
+                return fragment
+        
+        except (subprocess.SubprocessError, FileNotFoundError, subprocess.TimeoutExpired) as e:
+            print(f"Échec de la conversion via catdoc: {str(e)}")
     
-    except (subprocess.SubprocessError, FileNotFoundError, subprocess.TimeoutExpired) as e:
-        print(f"Échec de la conversion via catdoc: {str(e)}")
+    # Méthode 3c: Texte brut enregistré avec une extension .doc
+    if 'text' in route:
+        try:
+            with open(doc_path, 'rb') as f:
+                raw = f.read()
+            try:
+                text = raw.decode('utf-8-sig')
+            except UnicodeDecodeError:
+                text = raw.decode('cp1252', errors='replace')
+            
+            fragment = text_fragment(docx_path, title, text_blocks(text.splitlines()))
+            if fragment:
+                print(f"Conversion réussie de {doc_path} depuis le texte brut")
+                return fragment
+        
+        except Exception as e:
+            print(f"Échec de la conversion du texte brut de {doc_path}: {str(e)}")
     
     # Méthode 4: En dernier recours, créer un document de substitution
     try:
-        doc = Document()
-        doc.add_heading(f"Document: {filename}", level=1)
-        doc.add_paragraph("Ce document n'a pas pu être converti correctement.")
-        doc.add_paragraph(f"Nom du fichier original: {filename}")
-        doc.add_paragraph("Veuillez essayer d'ouvrir ce fichier directement avec votre traitement de texte.")
-        doc.save(docx_path)
+        fragment = text_fragment(docx_path, title, [
+            ('paragraph', "Ce document n'a pas pu être converti correctement."),
+            ('paragraph', f"Nom du fichier original: {filename}"),
+            ('paragraph', "Veuillez essayer d'ouvrir ce fichier directement avec votre traitement de texte."),
+        ])
         
         print(f"Document de substitution créé pour {doc_path}")
-        return docx_path
+        return fragment
         
     except Exception as e:
         print(f"Échec de la création d'un document de substitution: {str(e)}")
         return None
 
-def merge_docx_files(docx_files, output_path, status_dir):
+def ensure_docx(doc_path, output_dir, file_format=None):
+    """
+    Return a .docx path (or a fragment, see convert_doc_to_docx) for an
+    extracted file, converting it when it is not a Word 2007+ package
+    whatever its extension (None if conversion failed)
+    """
+    if not doc_path.lower().endswith(('.doc', '.docx')):
+        return None
+    if file_format is None:
+        file_format = sniff_file(doc_path)
+    
+    if doc_path.lower().endswith('.docx'):
+        if file_format == 'ooxml':
+            # Déjà au format .docx
+            return doc_path
+        # Autre format enregistré avec l'extension .docx: renommer avant
+        # conversion pour que le résultat n'écrase pas le fichier source
+        # (une archive ZIP n'est jamais présentée comme un .doc)
+        renamed_path = os.path.splitext(doc_path)[0] + ('.zip' if file_format == 'zip' else '.doc')
+        os.replace(doc_path, renamed_path)
+        doc_path = renamed_path
+    
+    return convert_doc_to_docx(doc_path, output_dir, file_format=file_format)
+
+def ensure_docx_batch(doc_paths, output_dir, file_formats=None):
+    """
+    Return the .docx paths (or fragments) for a group of extracted files, in the same order
+
+    Without a LibreOffice pool, all the .doc files of the group that need
+    LibreOffice (see formats.CONVERSION_ROUTES) are converted by a single
+    soffice invocation; the other files and the ones it failed to convert go
+    through ensure_docx one by one. Failed files map to None. Files already
+    in the conversion cache are not sent to LibreOffice. ZipMember sources
+    are returned as is.
+    """
+    if file_formats is None:
+        file_formats = [sniff_file(path) for path in doc_paths]
+    formats_by_path = dict(zip(doc_paths, file_formats))
+    doc_files = [path for path in doc_paths
+                 if isinstance(path, str) and path.lower().endswith('.doc')
+                 and conversion_route(formats_by_path[path])[0] == 'libreoffice']
+    converted = {}
+    looked_up = set()
+    
+    if len(doc_files) > 1 and not get_libreoffice_pool():
+        libreoffice_cmd = tool_path('libreoffice')
+        if libreoffice_cmd:
+            pending = {}
+            for doc_path in doc_files:
+                cache, cache_key = cached_conversion_key(doc_path)
+                if not cache:
+                    pending[doc_path] = None
+                    continue
+                looked_up.add(doc_path)
+                docx_path = os.path.splitext(doc_path)[0] + '.docx'
+                if cache.fetch(cache_key, docx_path):
+                    converted[doc_path] = docx_path
+                else:
+                    pending[doc_path] = (cache, cache_key)
+            
+            if converted:
+                print(f"Cache de conversion: {len(converted)}/{len(doc_files)} fichiers déjà convertis")
+            if pending:
+                batch_dir = tempfile.mkdtemp(prefix='batch_', dir=output_dir)
+                batch_results = batch_convert(libreoffice_cmd, list(pending), batch_dir)
+                print(f"Conversion groupée LibreOffice: {sum(1 for path in batch_results.values() if path)}/{len(pending)} fichiers convertis")
+                for doc_path, docx_path in batch_results.items():
+                    if docx_path and pending[doc_path]:
+                        cache, cache_key = pending[doc_path]
+                        cache.store(cache_key, docx_path)
+                converted.update(batch_results)
+    
+    results = []
+    for doc_path in doc_paths:
+        docx_path = converted.get(doc_path)
+        if isinstance(doc_path, ZipMember):
+            # Lu directement depuis l'archive au moment de la fusion
+            results.append(doc_path)
+        elif docx_path:
+            results.append(docx_path)
+        elif doc_path in looked_up:
+            # Cache déjà consulté pour ce fichier
+            results.append(convert_doc_to_docx(doc_path, output_dir, use_cache=False,
+                                               file_format=formats_by_path[doc_path]))
+        else:
+            results.append(ensure_docx(doc_path, output_dir, formats_by_path[doc_path]))
+    return results
+
+class RebuildMergeTarget:
+    """
+    Original merge engine: every paragraph is rebuilt run by run in a
+    python-docx master document kept in memory until close(). Tables are
+    transplanted as native w:tbl XML.
+    """
+
+    def __init__(self, output_path):
+        self.output_path = output_path
+        self.master_doc = Document()
+        self._relate = document_relater(self.master_doc)
+
+    def add_heading(self, text):
+        separator = self.master_doc.add_paragraph(text)
+        separator.style = 'Heading 2'
+
+    def add_error(self, text):
+        error_paragraph = self.master_doc.add_paragraph()
+        error_run = error_paragraph.add_run(text)
+        error_run.bold = True
+        error_run.font.color.rgb = docx.shared.RGBColor(255, 0, 0)  # Rouge
+
+    def append_document(self, doc_path):
+        doc = Document(open_source(doc_path))
+        self._append_elements(doc.element.body, doc)
+
+    def append_fragment(self, fragment):
+        # Les tableaux d'un fragment sont déjà portables: aucun document source
+        self._append_elements(fragment_elements(fragment, self._relate), None)
+
+    def _append_elements(self, elements, doc):
+        master_doc = self.master_doc
+        rel_mapping = {}
+
+        # Ajouter tous les paragraphes et tables du document à fusionner
+        for element in elements:
+            if element.tag.endswith('}p'):  # Paragraphe
+                new_p = master_doc.add_paragraph()
+                for run in element.findall('.//{http://schemas.openxmlformats.org/wordprocessingml/2006/main}r'):
+                    new_run = new_p.add_run()
+                    for text in run.findall('.//{http://schemas.openxmlformats.org/wordprocessingml/2006/main}t'):
+                        new_run.add_text(text.text)
+                    # Préserver le formatage
+                    if run.find('.//{http://schemas.openxmlformats.org/wordprocessingml/2006/main}b') is not None:
+                        new_run.bold = True
+                    if run.find('.//{http://schemas.openxmlformats.org/wordprocessingml/2006/main}i') is not None:
+                        new_run.italic = True
+                    if run.find('.//{http://schemas.openxmlformats.org/wordprocessingml/2006/main}u') is not None:
+                        new_run.underline = True
+
+            elif element.tag.endswith('}tbl'):  # Tableau
+                # Copier le tableau natif (cellules fusionnées, largeurs et bordures conservées)
+                if doc is None:
+                    append_body_elements(master_doc, [element])
+                else:
+                    transplant_table(element, doc, master_doc, mapping=rel_mapping)
+
+    def close(self):
+        self.master_doc.save(self.output_path)
+
+    def abort(self):
+        self.master_doc = None
+
+def open_merge_target(output_path, mode=None):
+    """
+    Create the merge target for the requested mode
+
+    - 'stream': body elements are copied as XML and streamed to the output package
+    - 'copy': body elements are appended in bulk to an in-memory python-docx document
+    - 'rebuild': original run-by-run rebuild in an in-memory python-docx document
+    The default mode is read from the MERGE_MODE environment variable.
+    """
+    mode = (mode or os.environ.get('MERGE_MODE', 'stream')).lower()
+
+    if mode == 'stream':
+        return StreamingDocxWriter(output_path)
+    if mode == 'copy':
+        return CopyMergeTarget(output_path)
+    if mode == 'rebuild':
+        return RebuildMergeTarget(output_path)
+
+    raise ValueError(f"Mode de fusion inconnu: {mode}")
+
+def merge_docx_files(docx_files, output_path, status_dir, mode=None, workers=None, total=None, status_extra=None):
     """
     Merge multiple .docx files into a single document
     
+    docx_files holds .docx paths, ZipMember sources read straight from the
+    archive, or fragments (see convert_doc_to_docx).
     Before each file's content, a header line with the filename is added.
-    Updates status periodically.
+    Updates status periodically. See open_merge_target for the available modes.
+    With several workers (see merge_engine.merge_workers), source documents are
+    parsed in a process pool and appended in their original order.
+    docx_files may be any iterable (e.g. fed by the processing pipeline), in
+    which case total gives the expected number of files for the progress.
+    status_extra() may return more fields for the status file, such as the
+    progress of the stages feeding docx_files.
     """
+    target = None
     try:
-        # Créer un nouveau document pour la fusion
-        master_doc = Document()
+        # Créer la cible de fusion
+        target = open_merge_target(output_path, mode)
+        workers = merge_workers(workers)
         
         # Initialisation des variables de status
-        total_files = len(docx_files)
+        total_files = total if total is not None else len(docx_files)
         processed = 0
         last_status_update = time.time()
         
+        # Analyse des documents en parallèle si la cible accepte des fragments
+        if workers > 1 and total_files > 1 and hasattr(target, 'append_fragment'):
+            sources = parallel_fragments(docx_files, workers)
+        else:
+            # Les conversions en texte arrivent déjà sous forme de fragment
+            sources = ((item['name'], item, None) if isinstance(item, dict) else (item, None, None)
+                       for item in docx_files)
+        
         # Sauvegarder le statut initial
         save_status(status_dir, {
             "current_step": "merge",
@@ -342,7 +610,7 @@ def merge_docx_files(docx_files, output_path, status_dir):
         })
         
         # Fusionner les documents
-        for doc_path in docx_files:
+        for doc_path, fragment, parse_error in sources:
             try:
                 # Mettre à jour le compteur de traitement
                 processed += 1
@@ -350,7 +618,7 @@ def merge_docx_files(docx_files, output_path, status_dir):
                 # Mettre à jour périodiquement le statut (pas à chaque fichier pour améliorer les performances)
                 current_time = time.time()
                 if current_time - last_status_update > 1.0:  # Mise à jour toutes les secondes max
-                    progress_percent = 50 + int((processed / total_files) * 30)  # 50-80% de la progression totale
+                    progress_percent = 50 + int((processed / max(total_files, processed)) * 30)  # 50-80% de la progression totale
                     save_status(status_dir, {
                         "current_step": "merge",
                         "complete": False,
@@ -358,71 +626,30 @@ def merge_docx_files(docx_files, output_path, status_dir):
                         "processed": processed,
                         "total": total_files,
                         "percent": progress_percent,
-                        "status_text": f"Fusion du document {processed}/{total_files}..."
+                        "status_text": f"Fusion du document {processed}/{total_files}...",
+                        **(status_extra() if status_extra else {})
                     })
                     last_status_update = current_time
                 
                 # Extraire le nom du fichier
-                filename = os.path.basename(doc_path)
+                filename = source_name(doc_path)
                 
                 # Ajouter une ligne de séparation avec le nom du fichier
-                separator_text = f"{filename}{'.' * 100}"
-                separator = master_doc.add_paragraph(separator_text)
-                separator.style = 'Heading 2'
+                target.add_heading(f"{filename}{'.' * 100}")
                 
-                # Ouvrir le document à fusionner
+                # Ajouter le contenu du document à fusionner
                 try:
-                    doc = Document(doc_path)
-                    
-                    # Ajouter tous les paragraphes et tables du document à fusionner
-                    for element in doc.element.body:
-                        if element.tag.endswith('}p'):  # Paragraphe
-                            new_p = master_doc.add_paragraph()
-                            for run in element.findall('.//{http://schemas.openxmlformats.org/wordprocessingml/2006/main}r'):
-                                new_run = new_p.add_run()
-                                for text in run.findall('.//{http://schemas.openxmlformats.org/wordprocessingml/2006/main}t'):
-                                    new_run.add_text(text.text)
-                                # Préserver le formatage
-                                if run.find('.//{http://schemas.openxmlformats.org/wordprocessingml/2006/main}b') is not None:
-                                    new_run.bold = True
-                                if run.find('.//{http://schemas.openxmlformats.org/wordprocessingml/2006/main}i') is not None:
-                                    new_run.italic = True
-                                if run.find('.//{http://schemas.openxmlformats.org/wordprocessingml/2006/main}u') is not None:
-                                    new_run.underline = True
-                        
-                        elif element.tag.endswith('}tbl'):  # Tableau
-                            # Déterminer les dimensions du tableau
-                            rows = element.findall('.//{http://schemas.openxmlformats.org/wordprocessingml/2006/main}tr')
-                            row_count = len(rows)
-                            col_count = 0
-                            for row in rows:
-                                cells = row.findall('.//{http://schemas.openxmlformats.org/wordprocessingml/2006/main}tc')
-                                col_count = max(col_count, len(cells))
-                            
-                            # Créer un nouveau tableau dans le document fusionné
-                            if row_count > 0 and col_count > 0:
-                                table = master_doc.add_table(rows=row_count, cols=col_count)
-                                table.style = 'Table Grid'
-                                
-                                # Remplir le tableau avec les données
-                                for i, row in enumerate(rows):
-                                    cells = row.findall('.//{http://schemas.openxmlformats.org/wordprocessingml/2006/main}tc')
-                                    for j, cell in enumerate(cells):
-                                        if j < col_count:  # Éviter l'index out of range
-                                            # Extraire le texte de la cellule
-                                            cell_text = ''
-                                            for text in cell.findall('.//{http://schemas.openxmlformats.org/wordprocessingml/2006/main}t'):
-                                                cell_text += text.text
-                                            # Affecter le texte à la cellule du nouveau tableau
-                                            table.cell(i, j).text = cell_text
+                    if parse_error is not None:
+                        raise parse_error
+                    if fragment is not None:
+                        target.append_fragment(fragment)
+                    else:
+                        target.append_document(doc_path)
                 
                 except Exception as doc_error:
                     # En cas d'erreur dans un document spécifique, ajouter un message d'erreur
                     # et continuer avec les autres documents
-                    error_paragraph = master_doc.add_paragraph()
-                    error_run = error_paragraph.add_run(f"Erreur lors de la fusion du document {filename}: {str(doc_error)}")
-                    error_run.bold = True
-                    error_run.font.color.rgb = docx.shared.RGBColor(255, 0, 0)  # Rouge
+                    target.add_error(f"Erreur lors de la fusion du document {filename}: {str(doc_error)}")
                     print(f"Erreur lors de la fusion de {doc_path}: {str(doc_error)}")
             
             except Exception as e:
@@ -439,7 +666,7 @@ def merge_docx_files(docx_files, output_path, status_dir):
         })
         
         # Enregistrer le document fusionné
-        master_doc.save(output_path)
+        target.close()
         
         return output_path
         
@@ -447,6 +674,12 @@ def merge_docx_files(docx_files, output_path, status_dir):
         print(f"Erreur lors de la fusion des documents: {str(e)}")
         traceback.print_exc()
         
+        if target is not None:
+            try:
+                target.abort()
+            except Exception:
+                pass
+        
         save_status(status_dir, {
             "current_step": "error",
             "complete": False,
@@ -464,7 +697,8 @@ def convert_docx_to_pdf(docx_path, pdf_path, status_dir):
     This function attempts multiple methods to convert the document:
     1. libreoffice (if available)
     2. docx2pdf library (if installed)
-    3. Basic fallback message if conversion is not possible
+    3. Text and tables rendered with reportlab (see pdf_fallback)
+    4. Basic fallback message if conversion is not possible
     """
     save_status(status_dir, {
         "current_step": "converting_to_pdf",
@@ -475,33 +709,21 @@ def convert_docx_to_pdf(docx_path, pdf_path, status_dir):
     
     # Méthode 1: Utiliser LibreOffice
     try:
-        # Chemin complet vers LibreOffice (plusieurs possibilités)
-        libreoffice_paths = [
-            'libreoffice',
-            '/nix/store/i0x2skvhs1wbr5vffhhc53kd9jg2bp5q-libreoffice-7.6.4/bin/libreoffice', 
-            '/usr/bin/libreoffice',
-            '/usr/local/bin/libreoffice',
-            '/opt/libreoffice/program/soffice'
-        ]
-        
-        libreoffice_cmd = None
-        for path in libreoffice_paths:
-            try:
-                subprocess.run([path, '--version'], stdout=subprocess.PIPE, stderr=subprocess.PIPE, check=False)
-                libreoffice_cmd = path
-                break
-            except (FileNotFoundError, subprocess.SubprocessError):
-                continue
-                
-        if libreoffice_cmd:
-            output_dir = os.path.dirname(pdf_path)
-            cmd = [
-                libreoffice_cmd, '--headless', '--convert-to', 'pdf', 
+        output_dir = os.path.dirname(pdf_path)
+        
+        # Instances LibreOffice résidentes si le pool est disponible
+        pool = get_libreoffice_pool()
+        libreoffice_cmd = None if pool else tool_path('libreoffice')
+        
+        if pool:
+            pool.convert(docx_path, output_dir, 'pdf', timeout=120)
+        elif libreoffice_cmd:
+            run_soffice(libreoffice_cmd, [
+                '--headless', '--convert-to', 'pdf', 
                 '--outdir', output_dir, docx_path
-            ]
-            
-            process = subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, check=True, timeout=120)
-            
+            ], timeout=120)
+        
+        if pool or libreoffice_cmd:
             # Si le nom du fichier a changé, renommer le fichier PDF
             docx_basename = os.path.basename(docx_path)
             expected_pdf_name = os.path.splitext(docx_basename)[0] + '.pdf'
@@ -519,11 +741,13 @@ def convert_docx_to_pdf(docx_path, pdf_path, status_dir):
                 })
                 return pdf_path
         
-    except (subprocess.SubprocessError, FileNotFoundError) as e:
+    except (subprocess.SubprocessError, FileNotFoundError, RuntimeError) as e:
         print(f"Échec de la conversion PDF via LibreOffice: {str(e)}")
     
     # Méthode 2: Essayer avec docx2pdf
     try:
+        if not has_tool('docx2pdf'):
+            raise ImportError("docx2pdf")
         import docx2pdf
         docx2pdf.convert(docx_path, pdf_path)
         
@@ -537,53 +761,17 @@ def convert_docx_to_pdf(docx_path, pdf_path, status_dir):
             return pdf_path
             
     except ImportError:
-        print("Bibliothèque docx2pdf non installée.")
+        print("Bibliothèque docx2pdf non installée ou inutilisable sur ce système.")
     except Exception as e:
         print(f"Échec de la conversion PDF via docx2pdf: {str(e)}")
     
-    # Méthode 3: Utiliser PyPDF2 et reportlab pour créer un PDF simple
+    # Méthode 3: Rendu de secours du texte et des tableaux avec reportlab,
+    # écrit page par page (mémoire bornée quelle que soit la taille)
     try:
-        import io
-        from reportlab.lib.pagesizes import letter
-        from reportlab.pdfgen import canvas
-        from PyPDF2 import PdfWriter
-        
-        # Lire le document DOCX et extraire le texte
-        doc = Document(docx_path)
-        text_content = []
-        
-        for para in doc.paragraphs:
-            text_content.append(para.text)
-        
-        # Créer un PDF avec reportlab
-        packet = io.BytesIO()
-        c = canvas.Canvas(packet, pagesize=letter)
-        c.setFont("Helvetica", 12)
-        
-        y = 750  # Position verticale de départ
-        line_height = 14
-        
-        for line in text_content:
-            if y < 50:  # Si on est près du bas de la page
-                c.showPage()
-                c.setFont("Helvetica", 12)
-                y = 750
-            
-            c.drawString(50, y, line)
-            y -= line_height
-        
-        c.save()
-        
-        # Déplacer le pointeur au début
-        packet.seek(0)
-        
-        # Créer un nouveau PDF avec PyPDF2
-        writer = PdfWriter()
-        writer.add_page(PdfWriter().append_pages_from_reader(packet).pages[0])
+        from pdf_fallback import render_docx_pdf
         
-        # Écrire le fichier de sortie
-        with open(pdf_path, 'wb') as outfile:
-            writer.write(outfile)
+        page_count = render_docx_pdf(docx_path, pdf_path)
+        print(f"PDF de secours créé: {page_count} page(s)")
         
         if os.path.exists(pdf_path):
             save_status(status_dir, {
@@ -595,9 +783,9 @@ def convert_docx_to_pdf(docx_path, pdf_path, status_dir):
             return pdf_path
         
     except ImportError:
-        print("Bibliothèques PyPDF2 ou reportlab non installées.")
+        print("Bibliothèque reportlab non installée.")
     except Exception as e:
-        print(f"Échec de la création d'un PDF via PyPDF2: {str(e)}")
+        print(f"Échec du rendu PDF de secours: {str(e)}")
     
     # Méthode 4: Créer un PDF basique avec reportlab seul
     try:
@@ -680,15 +868,255 @@ def convert_docx_to_pdf(docx_path, pdf_path, status_dir):
         
         return None
 
-def process_zip_file(zip_path, output_dir, status_dir=None, job_id=None):
+def write_pdf_part(source, parts_dir):
+    """
+    Write the single-document .docx of a merge source, to render it to PDF on its own
+
+    The document gets the same filename heading as in merged.docx. Returns
+    (name, key, docx_path), docx_path being None when the document could not
+    be written; documents already rendered on a previous run are not
+    written again (see pdf_tools.part_key).
+    """
+    name = source_name(source)
+    try:
+        key = part_key(source)
+        docx_path = os.path.join(parts_dir, f"{key}.docx")
+        if not os.path.exists(os.path.join(parts_dir, f"{key}.pdf")) and not os.path.exists(docx_path):
+            os.makedirs(parts_dir, exist_ok=True)
+            temp_path = os.path.join(parts_dir, f"{key}.tmp.docx")
+            if not merge_docx_files([source], temp_path, None, workers=1):
+                return name, key, None
+            os.replace(temp_path, docx_path)
+        return name, key, docx_path
+    except Exception as e:
+        print(f"Impossible de préparer le PDF de {name}: {str(e)}")
+        return name, None, None
+
+def render_pdf_parts(parts, parts_dir, pdf_path, status_dir):
+    """
+    Render (name, key, docx_path) parts to PDF in parallel and concatenate them into pdf_path
+
+    Conversions run on conversion_workers() threads (the LibreOffice pool
+    or profile slots bound the soffice processes). A part whose PDF exists
+    from an earlier run is reused. Returns pdf_path, or None when any part
+    could not be rendered so that the caller can convert merged.docx instead.
+    The per-document .docx files are removed in any case; when the
+    concatenation fails, so is parts_dir, whose PDFs are only kept for reuse
+    after a complete run.
+    """
+    concatenated = False
+    try:
+        if not parts or any(docx_path is None for _, _, docx_path in parts):
+            return None
+        
+        # Un document présent plusieurs fois n'est rendu qu'une fois
+        pending = {}
+        for _, key, docx_path in parts:
+            if not os.path.exists(os.path.join(parts_dir, f"{key}.pdf")):
+                pending[key] = docx_path
+        reused = len({key for _, key, _ in parts}) - len(pending)
+        if reused:
+            print(f"{reused} PDF de document(s) réutilisé(s) d'un traitement précédent")
+        
+        done = [0]
+        lock = threading.Lock()
+        
+        def render(item):
+            key, docx_path = item
+            work_dir = tempfile.mkdtemp(dir=parts_dir)
+            try:
+                output = convert_file(docx_path, work_dir, 'pdf', timeout=pdf_part_timeout())
+                if not output:
+                    raise RuntimeError("LibreOffice n'a produit aucun PDF")
+                os.replace(output, os.path.join(parts_dir, f"{key}.pdf"))
+            finally:
+                shutil.rmtree(work_dir, ignore_errors=True)
+            with lock:
+                done[0] += 1
+                save_status(status_dir, {
+                    "current_step": "converting_to_pdf",
+                    "complete": False,
+                    "percent": 85 + int(done[0] / len(pending) * 10),
+                    "status_text": f"Conversion PDF du document {done[0]}/{len(pending)}..."
+                })
+        
+        save_status(status_dir, {
+            "current_step": "converting_to_pdf",
+            "complete": False,
+            "percent": 85,
+            "status_text": "Conversion des documents en PDF..."
+        })
+        try:
+            if pending:
+                with ThreadPoolExecutor(conversion_workers(), thread_name_prefix='pdf') as executor:
+                    list(executor.map(render, pending.items()))
+            concatenate_pdfs([(name, os.path.join(parts_dir, f"{key}.pdf")) for name, key, _ in parts], pdf_path)
+            concatenated = True
+        except Exception as e:
+            print(f"Échec de la conversion PDF par document, conversion du document fusionné: {str(e)}")
+            return None
+        
+        save_status(status_dir, {
+            "current_step": "pdf_conversion_complete",
+            "complete": False,
+            "percent": 95,
+            "status_text": "Conversion PDF terminée. Finalisation..."
+        })
+        return pdf_path
+    finally:
+        # Fichiers intermédiaires: .docx par document, et PDF d'un rendu incomplet
+        if concatenated:
+            for _, _, docx_path in parts:
+                if docx_path and os.path.exists(docx_path):
+                    os.remove(docx_path)
+        else:
+            shutil.rmtree(parts_dir, ignore_errors=True)
+
+# Modes de génération du PDF fusionné
+PDF_GENERATION_MODES = ('eager', 'lazy', 'background')
+# Documents d'un traitement à rendre en PDF un par un (mode PDF parts)
+PARTS_FILE = 'pdf_parts.json'
+# Statistiques du PDF fusionné (taille, temps d'affichage de la première page)
+PDF_STATS_FILE = 'pdf_stats.json'
+
+def pdf_generation(mode=None):
+    """
+    When merged.pdf is produced (PDF_GENERATION)
+
+    - 'eager': during the job, which completes once the PDF exists
+    - 'lazy': on the first download of the PDF; the job completes as soon
+      as merged.docx exists
+    - 'background': like 'lazy', but a low-priority background worker also
+      generates it after the job
+    """
+    mode = (mode or os.environ.get('PDF_GENERATION', 'eager')).lower()
+    if mode not in PDF_GENERATION_MODES:
+        raise ValueError(f"Mode de génération PDF inconnu: {mode}")
+    return mode
+
+def generate_pdf(job_dir, status_dir=None):
+    """
+    Produce merged.pdf next to the merged.docx of a job
+
+    The documents are rendered one by one when the job recorded them (see
+    PARTS_FILE), otherwise merged.docx is converted. The PDF is written in a
+    temporary folder and moved into place once complete, so a partial file
+    is never served. It then goes through pdf_tools.optimize_pdf, whose
+    stats are kept in PDF_STATS_FILE (see pdf_stats).
+    """
+    pdf_path = os.path.join(job_dir, "merged.pdf")
+    # Hors du dossier de sortie: un merged.pdf incomplet ne doit pas être trouvé par /download
+    work_dir = tempfile.mkdtemp(prefix='pdf_')
+    try:
+        output_pdf = os.path.join(work_dir, "merged.pdf")
+        result = None
+        parts_file = os.path.join(job_dir, PARTS_FILE)
+        if os.path.exists(parts_file):
+            with open(parts_file) as f:
+                recorded = json.load(f)
+            result = render_pdf_parts([tuple(part) for part in recorded["parts"]], recorded["parts_dir"],
+                                      output_pdf, status_dir)
+            # Les .docx par document ont été supprimés: une nouvelle génération convertit merged.docx
+            os.remove(parts_file)
+        if not result:
+            result = convert_docx_to_pdf(os.path.join(job_dir, "merged.docx"), output_pdf, status_dir)
+        if not result or not os.path.exists(result):
+            return None
+        
+        # Post-traitement: linéarisation et compression (statistiques conservées avec le PDF)
+        stats = optimize_pdf(result)
+        print(f"PDF prêt: {stats['size']} octets (avant optimisation: {stats['original_size']}), "
+              f"première page après {stats['first_page_bytes']} octets")
+        with open(os.path.join(job_dir, PDF_STATS_FILE), 'w') as f:
+            json.dump(stats, f)
+        # Copie sous un nom temporaire (le dossier de travail peut être sur un autre disque), puis renommage
+        temp_path = f"{pdf_path}.tmp"
+        shutil.move(result, temp_path)
+        os.replace(temp_path, pdf_path)
+        return pdf_path
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+def pdf_stats(job_dir):
+    """Size and time-to-first-page of the merged.pdf of a job, None before it is generated"""
+    try:
+        with open(os.path.join(job_dir, PDF_STATS_FILE)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+# Générations PDF en cours, par dossier de traitement
+_pdf_tasks = {}
+_pdf_lock = threading.Lock()
+
+def ensure_pdf(job_dir, status_dir=None):
+    """
+    Return the path of the merged.pdf of a job, generating it if needed
+
+    Concurrent calls for the same job wait for a single generation; the
+    result is kept next to merged.docx for the next requests. Returns None
+    when no PDF could be produced.
+    """
+    pdf_path = os.path.join(job_dir, "merged.pdf")
+    with _pdf_lock:
+        task = _pdf_tasks.get(job_dir)
+        owner = task is None and not os.path.exists(pdf_path)
+        if owner:
+            task = _pdf_tasks[job_dir] = Future()
+    
+    if task is None:
+        return pdf_path
+    if owner:
+        try:
+            task.set_result(generate_pdf(job_dir, status_dir))
+        except Exception as e:
+            print(f"Erreur lors de la génération du PDF de {job_dir}: {str(e)}")
+            task.set_result(None)
+        finally:
+            with _pdf_lock:
+                _pdf_tasks.pop(job_dir, None)
+    return task.result()
+
+_pdf_queue = None
+
+def _pdf_worker(jobs):
+    # Priorité basse pour ce thread et les soffice qu'il lance (sous Linux,
+    # la priorité est propre à chaque thread et héritée par ses processus)
+    try:
+        os.setpriority(os.PRIO_PROCESS, threading.get_native_id(), 10)
+    except (AttributeError, OSError):
+        pass
+    while True:
+        job_dir = jobs.get()
+        if os.path.exists(os.path.join(job_dir, "merged.docx")):
+            ensure_pdf(job_dir)
+
+def schedule_pdf(job_dir):
+    """Queue the PDF generation of a job for the background worker (one conversion at a time)"""
+    global _pdf_queue
+    with _pdf_lock:
+        if _pdf_queue is None:
+            _pdf_queue = queue.Queue()
+            threading.Thread(target=_pdf_worker, args=(_pdf_queue,), name='pdf-background', daemon=True).start()
+    _pdf_queue.put(job_dir)
+
+def process_zip_file(zip_path, output_dir, status_dir=None, job_id=None, background=True):
     """
     Process a zip file containing .doc/.docx files:
     1. Extract all .doc and .docx files
     2. Convert .doc to .docx if needed
     3. Merge all into a single .docx
-    4. Convert the merged file to PDF
+    4. Convert the merged file to PDF, or render each document to PDF and
+       concatenate them (see pdf_tools.pdf_mode); with PDF_GENERATION set to
+       lazy or background, the job completes without it (see ensure_pdf)
     
-    This function operates asynchronously and updates a status file.
+    Steps 1 to 3 run as a pipeline (see pipeline.run_pipeline): each document
+    is converted as soon as it is extracted and merged as soon as it is
+    converted, in archive order.
+    
+    This function operates asynchronously and updates a status file; with
+    background=False it runs in the calling thread (e.g. a scheduler
+    worker, see scheduler.JobScheduler) and returns the result.
     If job_id is provided, it will update the database with processing status.
     """
     # Importer les modèles pour mettre à jour la base de données
@@ -720,71 +1148,116 @@ def process_zip_file(zip_path, output_dir, status_dir=None, job_id=None):
                 "percent": 10
             })
             
-            # Étape 1: Extraire les fichiers .doc et .docx
-            extracted_files = extract_doc_files(zip_path, extract_dir)
-            file_count = len(extracted_files)
-            
-            if file_count == 0:
-                error_msg = "Aucun fichier .doc ou .docx trouvé dans l'archive ZIP."
-                save_status(status_dir, {
-                    "current_step": "error",
-                    "complete": False,
-                    "error": error_msg,
-                    "status_text": error_msg,
-                    "percent": 0
-                })
-                return None
-            
-            # Mise à jour du statut avec le nombre de fichiers
-            save_status(status_dir, {
-                "current_step": "convert",
-                "complete": False,
-                "file_count": file_count,
-                "status_text": "Conversion des fichiers DOC en DOCX...",
-                "percent": 30
-            })
-            
-            # Étape 2: Convertir les .doc en .docx si nécessaire
-            docx_files = []
-            converted = 0
-            
-            for doc_path in extracted_files:
-                # Mise à jour périodique du statut
-                if file_count > 10 and converted % 10 == 0:
-                    progress_percent = 30 + int((converted / file_count) * 20)  # 30-50% de la progression totale
+            zip_ref = zipfile.ZipFile(zip_path, 'r')
+            members = []
+            extractor = None
+            try:
+                # Étape 1: Lister les fichiers .doc et .docx de l'archive et des
+                # archives imbriquées (lues sur place, sans extraction)
+                members = archive_documents(zip_ref, max_bytes=manifest_limits()['max_uncompressed'])
+                
+                # Les documents identiques ne sont extraits et convertis qu'une fois
+                policy = duplicate_policy()
+                duplicates = find_duplicate_members(members) if policy != 'all' else {}
+                positions = [index for index in range(len(members)) if index not in duplicates]
+                if duplicates:
+                    print(f"{len(duplicates)} doublon(s) détecté(s) dans l'archive (politique: {policy})")
+                
+                # Nombre de documents à fusionner
+                file_count = len(members) if policy == 'once' else len(positions)
+                
+                if file_count == 0:
+                    error_msg = "Aucun fichier .doc ou .docx trouvé dans l'archive ZIP."
                     save_status(status_dir, {
-                        "current_step": "convert",
+                        "current_step": "error",
                         "complete": False,
-                        "file_count": file_count,
-                        "converted": converted,
-                        "total_files": file_count,
-                        "progress_percent": progress_percent,
-                        "status_text": f"Conversion des fichiers ({converted}/{file_count})...",
-                        "percent": progress_percent
+                        "error": error_msg,
+                        "status_text": error_msg,
+                        "percent": 0
                     })
+                    return None
+                
+                # Mise à jour du statut avec le nombre de fichiers
+                save_status(status_dir, {
+                    "current_step": "convert",
+                    "complete": False,
+                    "file_count": file_count,
+                    "status_text": "Extraction et conversion des documents...",
+                    "percent": 30
+                })
+                
+                # Étapes 2 et 3: extraction, conversion et fusion en pipeline.
+                # Chaque document passe à la conversion dès qu'il est extrait, puis
+                # à la fusion dès qu'il est converti, dans l'ordre de l'archive.
+                # Les documents circulent par groupes pour permettre la conversion
+                # groupée des .doc en une seule invocation de LibreOffice.
+                group_size = batch_size()
+                groups = [[members[index] for index in positions[i:i + group_size]]
+                          for i in range(0, len(positions), group_size)]
+                # Nombre de documents par format détecté (octets de tête)
+                format_counts = {}
+                
+                # Extraction parallèle, chaque thread avec ses propres descripteurs d'archive
+                def extraction_progress(done, file_info):
+                    print(f"Document prêt ({done}/{len(positions)}): {file_info.filename}")
+                
+                extractor = MemberExtractor(progress=extraction_progress)
+                
+                def extract_group(group):
+                    extracted = extractor.map(lambda archive, file_info: prepare_member(archive, file_info, extract_dir),
+                                              group)
+                    for _, file_format in extracted:
+                        format_counts[file_format] = format_counts.get(file_format, 0) + 1
+                    return extracted
+                
+                stages = [
+                    (extract_group, 1),
+                    (lambda extracted: ensure_docx_batch([path for path, _ in extracted], extract_dir,
+                                                         [file_format for _, file_format in extracted]),
+                     conversion_workers()),
+                ]
+                merged_count = [0]
+                
+                def converted_members():
+                    # (position dans l'archive, document converti ou None)
+                    for index, docx_paths, error in run_pipeline(groups, stages):
+                        if error is not None:
+                            print(f"Erreur lors de la préparation du groupe {index + 1}: {str(error)}")
+                            docx_paths = [None] * len(groups[index])
+                        for offset, docx_path in enumerate(docx_paths):
+                            yield positions[index * group_size + offset], docx_path
+                
+                # Mode PDF par document: chaque source est aussi écrite seule, tant que
+                # l'archive est ouverte, pour être rendue en PDF après la fusion
+                render_parts = pdf_mode() == 'parts'
+                parts_dir = os.path.join(output_dir, PARTS_DIR)
+                pdf_parts = []
                 
-                if doc_path.lower().endswith('.doc'):
-                    # Convertir le .doc en .docx
-                    docx_path = convert_doc_to_docx(doc_path, extract_dir)
-                    if docx_path:
-                        docx_files.append(docx_path)
-                elif doc_path.lower().endswith('.docx'):
-                    # Déjà au format .docx
-                    docx_files.append(doc_path)
+                def converted_files():
+                    results = converted_members()
+                    if policy == 'once':
+                        results = replay_duplicates(results, duplicates)
+                    for _, docx_path in results:
+                        if docx_path:
+                            merged_count[0] += 1
+                            if render_parts:
+                                pdf_parts.append(write_pdf_part(docx_path, parts_dir))
+                            yield docx_path
                 
-                converted += 1
+                output_docx = os.path.join(job_dir, "merged.docx")
+                merged_docx = merge_docx_files(converted_files(), output_docx, status_dir, total=file_count,
+                                               status_extra=lambda: {"extracted": extractor.done})
+            finally:
+                if extractor:
+                    extractor.close()
+                close_archives(members)
+                zip_ref.close()
             
-            # Mise à jour du statut pour la fusion
-            save_status(status_dir, {
-                "current_step": "merge",
-                "complete": False,
-                "file_count": file_count,
-                "status_text": "Fusion des documents en un seul fichier...",
-                "percent": 50
-            })
+            print(f"Formats détectés: {', '.join(f'{name}={count}' for name, count in sorted(format_counts.items()))}")
             
-            # Vérifier qu'il y a des fichiers à fusionner
-            if not docx_files:
+            # Vérifier qu'au moins un fichier a pu être converti
+            if merged_docx and merged_count[0] == 0:
+                os.remove(merged_docx)
                 error_msg = "Aucun fichier n'a pu être converti correctement."
                 save_status(status_dir, {
                     "current_step": "error",
@@ -811,10 +1284,6 @@ def process_zip_file(zip_path, output_dir, status_dir=None, job_id=None):
                 
                 return None
             
-            # Étape 3: Fusionner tous les fichiers .docx
-            output_docx = os.path.join(job_dir, "merged.docx")
-            merged_docx = merge_docx_files(docx_files, output_docx, status_dir)
-            
             if not merged_docx or not os.path.exists(merged_docx):
                 error_msg = "Échec de la fusion des documents."
                 save_status(status_dir, {
@@ -842,9 +1311,17 @@ def process_zip_file(zip_path, output_dir, status_dir=None, job_id=None):
                 
                 return None
             
-            # Étape 4: Convertir le fichier fusionné en PDF
-            output_pdf = os.path.join(job_dir, "merged.pdf")
-            pdf_path = convert_docx_to_pdf(merged_docx, output_pdf, status_dir)
+            # Étape 4: Convertir le fichier fusionné en PDF, maintenant ou plus tard
+            if render_parts:
+                with open(os.path.join(job_dir, PARTS_FILE), 'w') as f:
+                    json.dump({"parts_dir": parts_dir, "parts": pdf_parts}, f)
+            
+            generation = pdf_generation()
+            pdf_path = None
+            if generation == 'eager':
+                pdf_path = ensure_pdf(job_dir, status_dir)
+            elif generation == 'background':
+                schedule_pdf(job_dir)
             
             # Finaliser le traitement
             end_time = time.time()
@@ -856,13 +1333,17 @@ def process_zip_file(zip_path, output_dir, status_dir=None, job_id=None):
                 "complete": True,
                 "file_count": file_count,
                 "output_docx": "merged.docx",
-                "output_pdf": "merged.pdf" if pdf_path else None,
+                "output_pdf": "merged.pdf" if pdf_path or generation != 'eager' else None,
+                "pdf_pending": generation != 'eager',
                 "start_time": int(start_time),
                 "end_time": int(end_time),
                 "processing_time": processing_time,
                 "stats": {
                     "processing_time": processing_time,
-                    "file_count": file_count
+                    "file_count": file_count,
+                    "formats": format_counts,
+                    "duplicates": len(duplicates),
+                    "pdf": pdf_stats(job_dir)
                 },
                 "status_text": "Traitement terminé avec succès.",
                 "percent": 100
@@ -914,7 +1395,10 @@ def process_zip_file(zip_path, output_dir, status_dir=None, job_id=None):
                 "docx_path": merged_docx,
                 "pdf_path": pdf_path,
                 "file_count": file_count,
-                "processing_time": processing_time
+                "processing_time": processing_time,
+                "formats": format_counts,
+                "duplicates": len(duplicates),
+                "pdf": pdf_stats(job_dir)
             }
             
         except Exception as e:
@@ -948,6 +1432,9 @@ def process_zip_file(zip_path, output_dir, status_dir=None, job_id=None):
             print(f"Erreur détectée: {error_msg}")
             return None
     
+    if not background:
+        return process_thread()
+    
     # Démarrer le traitement dans un thread séparé
     thread = threading.Thread(target=process_thread)
     thread.daemon = True